@@ -8,7 +8,7 @@ from itsdangerous import URLSafeTimedSerializer
 from flask_talisman import Talisman
 from app.config import Config
 from app.auth import Usuario
-from app.database import get_connection
+from app.database import cerrar_conexion_request
 from datetime import timedelta
 from flask import send_from_directory
 
@@ -45,6 +45,13 @@ CORS(app, supports_credentials=True, origins=[
     "http://localhost:4173"    # Vite Preview
 ])
 
+# -------------------------
+# Conexión a la base por request
+# -------------------------
+# Todos los helpers (rutas, auth, load_user) comparten una sola conexión por
+# request; al terminar el app context se devuelve al pool.
+app.teardown_appcontext(cerrar_conexion_request)
+
 # -------------------------
 # Configuración Login
 # -------------------------
@@ -54,25 +61,7 @@ login_manager.login_view = None
 
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM usuarios WHERE id = %s", (user_id,))
-    data = cursor.fetchone()
-    conn.close()
-
-    if data:
-        return Usuario(
-            id=data["id"],
-            nombre=data["nombre"],
-            username=data["username"],
-            email=data["email"],
-            password_hash=data["password_hash"],
-            rol=data["rol"],
-            duracion_turno = data.get("duracion_turno"),
-            foto=data.get("foto")
-
-        )
-    return None
+    return Usuario.obtener_por_id(user_id)
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -110,6 +99,78 @@ app.register_blueprint(bp_grupos)
 app.register_blueprint(bp_blockchain)
 app.register_blueprint(bp_health)
 
+# -------------------------
+# Comandos de mantenimiento (flask <comando>)
+# -------------------------
+@app.cli.command("reindexar-pacientes")
+def reindexar_pacientes():
+    """Reconstruye el índice de búsqueda de pacientes (pacientes_tokens)."""
+    from app.database import get_connection
+    from app.utils.busqueda import reindexar_todos
+
+    conn = get_connection()
+    try:
+        total = reindexar_todos(conn)
+    finally:
+        conn.close()
+    print(f"✅ Índice de búsqueda regenerado para {total} pacientes")
+
+
+@app.cli.command("anclar-historias")
+def anclar_historias():
+    """Publica en la BFA la raíz Merkle de las historias pendientes de anclar."""
+    from app.database import get_connection
+    from app.utils.anclaje_bfa import anclar_pendientes
+
+    conn = get_connection()
+    try:
+        anclaje = anclar_pendientes(conn)
+    finally:
+        conn.close()
+    if anclaje:
+        print(f"✅ {anclaje['cantidad']} historias ancladas (tx {anclaje['tx_hash']})")
+    else:
+        print("ℹ️ No hay historias pendientes de anclar")
+
+@app.cli.command("barrido-integridad")
+def barrido_integridad():
+    """Verifica contra la BFA todas las historias con transacción registrada."""
+    from app.database import get_connection
+    from app.utils.barrido_integridad import iniciar_barrido, ejecutar_barrido, estado_barrido
+
+    conn = get_connection()
+    try:
+        barrido_id = iniciar_barrido(conn, "cli")
+    finally:
+        conn.close()
+    if barrido_id is None:
+        print("ℹ️ Ya hay un barrido de integridad en curso")
+        return
+
+    ejecutar_barrido(barrido_id)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    barrido = estado_barrido(cursor, barrido_id)
+    cursor.close()
+    conn.close()
+    print(f"🧹 Barrido {barrido_id}: {barrido['estado']} — {barrido['validas']} válidas, "
+          f"{barrido['modificadas']} modificadas, {barrido['tx_no_encontradas']} sin tx en BFA")
+
+@app.cli.command("reconciliar-contadores")
+def reconciliar_contadores():
+    """Recalcula los contadores del dashboard desde las tablas y corrige los desvíos."""
+    from app.database import get_connection
+    from app.utils.contadores import reconciliar
+
+    conn = get_connection()
+    try:
+        correcciones = reconciliar(conn)
+    finally:
+        conn.close()
+    for nombre, antes, ahora in correcciones:
+        print(f"🔢 {nombre}: {antes} → {ahora}")
+    print(f"✅ Contadores reconciliados ({len(correcciones)} corregidos)")
+
 # -------------------------
 # Servir fotos de usuario
 # -------------------------
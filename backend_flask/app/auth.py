@@ -1,7 +1,19 @@
+import os
+import time
+import threading
 from flask_login import UserMixin
 from werkzeug.security import check_password_hash
 from .database import get_connection
 
+# Cache en memoria (por worker) de los usuarios de sesión
+USUARIO_CACHE_TTL = int(os.getenv("USUARIO_CACHE_TTL", "30"))  # segundos
+_cache_usuarios = {}   # id -> (expira_en, Usuario)
+_cache_lock = threading.Lock()
+
+# Columnas que necesita la sesión (sin password_hash)
+COLUMNAS_SESION = "id, nombre, username, email, rol, duracion_turno, foto"
+
+
 class Usuario(UserMixin):
     def __init__(self, id, nombre, username, email, password_hash, rol, duracion_turno, foto=None):
         self.id = id
@@ -26,7 +38,7 @@ class Usuario(UserMixin):
                 id=data['id'],
                 nombre=data['nombre'],
                 username=data['username'],
-                email=data['email'],                
+                email=data['email'],
                 password_hash=data['password_hash'],
                 rol=data['rol'],
                 duracion_turno=data.get('duracion_turno'),
@@ -34,5 +46,63 @@ class Usuario(UserMixin):
             )
         return None
 
+    @staticmethod
+    def obtener_por_id(user_id):
+        """
+        Usuario de sesión (sin password_hash), cacheado USUARIO_CACHE_TTL segundos.
+        Lo usa el user_loader en cada request autenticado.
+        """
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        ahora = time.monotonic()
+        with _cache_lock:
+            entrada = _cache_usuarios.get(user_id)
+            if entrada and entrada[0] > ahora:
+                return entrada[1]
+
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT {COLUMNAS_SESION} FROM usuarios WHERE id = %s", (user_id,))
+        data = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        if not data:
+            invalidar_usuario_cache(user_id)
+            return None
+
+        usuario = Usuario(
+            id=data["id"],
+            nombre=data["nombre"],
+            username=data["username"],
+            email=data["email"],
+            password_hash=None,
+            rol=data["rol"],
+            duracion_turno=data.get("duracion_turno"),
+            foto=data.get("foto")
+        )
+        with _cache_lock:
+            _cache_usuarios[user_id] = (ahora + USUARIO_CACHE_TTL, usuario)
+        return usuario
+
     def verificar_password(self, password):
         return check_password_hash(self.password_hash, password)
+
+
+def invalidar_usuario_cache(user_id=None):
+    """
+    Quita un usuario del cache (o todos si no se indica id).
+    Nota: cada worker tiene su propio cache; en los demás la entrada
+    vence sola al cumplirse el TTL.
+    """
+    with _cache_lock:
+        if user_id is None:
+            _cache_usuarios.clear()
+        else:
+            try:
+                _cache_usuarios.pop(int(user_id), None)
+            except (TypeError, ValueError):
+                pass
@@ -0,0 +1,312 @@
+# app/benchmarks/bfa.py
+"""
+Benchmarks del camino blockchain (registro, anclaje Merkle y verificación).
+
+Con BFA_BACKEND=eth-tester corre contra una cadena en memoria, sin red ni
+nodo BFA, y los números son reproducibles en cualquier máquina. Con el
+backend http mide contra el nodo configurado en BFA_URL.
+
+Con --historias también mide el camino completo de la app contra MySQL:
+anclar_pendientes (árbol Merkle + tx + pruebas guardadas) y
+verificar_historias (cadenas + lectura de tx, con y sin bfa_tx_cache) sobre
+una base aparte (BENCH_BFA_DB_NAME, por defecto hc_bench_bfa) que se crea
+con la estructura de la base de la app. Necesita permisos de DDL
+(MIGRAR_DB_USER/MIGRAR_DB_PASSWORD, igual que app.migrar).
+
+Uso:
+    BFA_BACKEND=eth-tester python -m app.benchmarks.bfa
+    BFA_BACKEND=eth-tester python -m app.benchmarks.bfa --n 500 --hilos 8 --json
+    BFA_BACKEND=eth-tester python -m app.benchmarks.bfa --historias 2000
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from app.utils import bfa_client
+from app.utils.bfa_client import registrar_hash_en_bfa, obtener_input_tx, obtener_transacciones_lote
+from app.utils.merkle import construir_arbol, raiz, prueba_inclusion, verificar_prueba
+from app.utils.cadena_hash import GENESIS, hash_evolucion, encadenar, resumen_cadena
+from app.utils.anclaje_bfa import anclar_pendientes
+from app.utils.verificacion_bfa import verificar_historias, VERIFICACION_LOTE_MAX
+
+BENCH_DB_NAME = os.getenv("BENCH_BFA_DB_NAME", "hc_bench_bfa")
+_TABLAS_BASE = ("usuarios", "pacientes", "evoluciones", "historias",
+                "historia_cadena", "anclajes_bfa", "bfa_tx_cache")
+
+
+def _hash_prueba(i):
+    return hashlib.sha256(f"benchmark-{os.getpid()}-{time.time_ns()}-{i}".encode()).hexdigest()
+
+
+def _resumen(nombre, tiempos, total=None, operaciones=None):
+    """Latencias en ms (p50/p95/máx) y throughput en operaciones por segundo."""
+    total = total if total is not None else sum(tiempos)
+    operaciones = operaciones if operaciones is not None else len(tiempos)
+    ordenados = sorted(tiempos)
+    return {
+        "prueba": nombre,
+        "operaciones": operaciones,
+        "total_s": round(total, 3),
+        "por_segundo": round(operaciones / total, 1) if total else None,
+        "p50_ms": round(statistics.median(ordenados) * 1000, 2) if ordenados else None,
+        "p95_ms": round(ordenados[int(0.95 * (len(ordenados) - 1))] * 1000, 2) if ordenados else None,
+        "max_ms": round(ordenados[-1] * 1000, 2) if ordenados else None,
+    }
+
+
+def _cronometrar(fn, *args):
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+# ==============================================================
+# 🧱 Registro de hashes
+# ==============================================================
+def bench_registro_individual(n):
+    tiempos, tx_hashes = [], []
+    for i in range(n):
+        t, tx = _cronometrar(registrar_hash_en_bfa, _hash_prueba(i))
+        tiempos.append(t)
+        tx_hashes.append(tx)
+    return _resumen("registro individual", tiempos), tx_hashes
+
+
+def bench_registro_concurrente(n, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        medidas = list(pool.map(lambda i: _cronometrar(registrar_hash_en_bfa, _hash_prueba(i)), range(n)))
+    total = time.perf_counter() - inicio
+    return _resumen(f"registro concurrente ({hilos} hilos)", [t for t, _ in medidas], total=total)
+
+
+# ==============================================================
+# 🌳 Anclaje en lote (Merkle)
+# ==============================================================
+def bench_anclaje(tamanio):
+    hojas = [_hash_prueba(i) for i in range(tamanio)]
+    inicio = time.perf_counter()
+    niveles = construir_arbol(hojas)
+    pruebas = [prueba_inclusion(niveles, i) for i in range(tamanio)]
+    t_arbol = time.perf_counter() - inicio
+
+    t_tx, tx_hash = _cronometrar(registrar_hash_en_bfa, raiz(niveles))
+    total = t_arbol + t_tx
+    resultado = _resumen(f"anclaje Merkle de {tamanio} historias", [total], total=total, operaciones=tamanio)
+    resultado["arbol_ms"] = round(t_arbol * 1000, 2)
+    resultado["tx_ms"] = round(t_tx * 1000, 2)
+    return resultado, (hojas, pruebas, raiz(niveles), tx_hash)
+
+
+# ==============================================================
+# 🔎 Verificación
+# ==============================================================
+def bench_verificacion_individual(tx_hashes):
+    tiempos = [_cronometrar(obtener_input_tx, tx)[0] for tx in tx_hashes]
+    return _resumen("lectura de tx individual", tiempos)
+
+
+def bench_verificacion_lote(tx_hashes, lote):
+    tiempos = []
+    for i in range(0, len(tx_hashes), lote):
+        tiempos.append(_cronometrar(obtener_transacciones_lote, tx_hashes[i:i + lote])[0])
+    return _resumen(f"lectura de tx en batch ({lote} por llamada)", tiempos,
+                    operaciones=len(tx_hashes))
+
+
+def bench_verificacion_concurrente(tx_hashes, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        tiempos = list(pool.map(lambda tx: _cronometrar(obtener_input_tx, tx)[0], tx_hashes))
+    total = time.perf_counter() - inicio
+    return _resumen(f"lectura de tx concurrente ({hilos} hilos)", tiempos, total=total)
+
+
+def bench_pruebas_merkle(anclaje):
+    hojas, pruebas, raiz_hex, _ = anclaje
+    tiempos = [_cronometrar(verificar_prueba, h, p, raiz_hex)[0] for h, p in zip(hojas, pruebas)]
+    return _resumen("verificación de prueba Merkle (local)", tiempos)
+
+
+# ==============================================================
+# 🗄️ Camino completo de la app (MySQL + BFA)
+# ==============================================================
+def conectar_base():
+    import mysql.connector
+    from app.migrar import MIGRAR_DB_CONFIG
+    config = {k: v for k, v in MIGRAR_DB_CONFIG.items() if k != "database"}
+    return mysql.connector.connect(**config), MIGRAR_DB_CONFIG["database"]
+
+
+def preparar_base(conn, origen):
+    """Recrea BENCH_DB_NAME con la estructura de las tablas del camino BFA."""
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB_NAME}`")
+    cursor.execute(f"CREATE DATABASE `{BENCH_DB_NAME}`")
+    cursor.execute(f"USE `{BENCH_DB_NAME}`")
+    for tabla in _TABLAS_BASE:
+        cursor.execute(f"CREATE TABLE `{tabla}` LIKE `{origen}`.`{tabla}`")
+    cursor.close()
+
+
+def sembrar_historias(conn, historias, evoluciones):
+    """
+    Carga `historias` pacientes con `evoluciones` evoluciones cada uno, su
+    cadena de hashes y la historia consolidada (pendiente de anclar).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO usuarios (id, nombre, username, email, password_hash, rol)
+        VALUES (1, 'Bench', 'bench', 'bench@bench.local', 'x', 'profesional')
+    """)
+    cursor.executemany("""
+        INSERT INTO pacientes (id, nro_hc, dni, nombre, apellido)
+        VALUES (%s, %s, %s, %s, %s)
+    """, [(p, f"HC{p}", f"{10000000 + p}", f"Nombre{p}", f"Apellido{p}") for p in range(1, historias + 1)])
+
+    evo_id = 0
+    hoy = date.today()
+    for p in range(1, historias + 1):
+        evos, cadena = [], []
+        hash_cadena = GENESIS
+        for posicion in range(1, evoluciones + 1):
+            evo_id += 1
+            evo = {"id": evo_id, "paciente_id": p, "fecha": hoy - timedelta(days=evoluciones - posicion),
+                   "contenido": f"Evolución {posicion} del paciente {p}. " * 8, "usuario_id": 1}
+            h_evo = hash_evolucion(evo)
+            hash_cadena = encadenar(hash_cadena, h_evo)
+            evos.append((evo["id"], p, evo["fecha"], evo["contenido"]))
+            cadena.append((p, posicion, evo["id"], h_evo, hash_cadena))
+        cursor.executemany("""
+            INSERT INTO evoluciones (id, paciente_id, fecha, contenido, usuario_id)
+            VALUES (%s, %s, %s, %s, 1)
+        """, evos)
+        cursor.executemany("""
+            INSERT INTO historia_cadena (paciente_id, posicion, evolucion_id, hash_evolucion, hash_cadena)
+            VALUES (%s, %s, %s, %s, %s)
+        """, cadena)
+        cursor.execute("""
+            INSERT INTO historias (paciente_id, usuario_id, resumen, hash_local)
+            VALUES (%s, 1, %s, %s)
+        """, (p, resumen_cadena(evoluciones, evo_id, hash_cadena), hash_cadena))
+    conn.commit()
+    cursor.close()
+
+
+def bench_anclar_pendientes(conn, historias):
+    t, anclaje = _cronometrar(anclar_pendientes, conn, historias)
+    return _resumen(f"anclar_pendientes ({historias} historias)", [t], operaciones=historias), anclaje
+
+
+def bench_verificar_historias(conn, nombre):
+    """verificar_historias en tramos de VERIFICACION_LOTE_MAX, como el barrido."""
+    cursor = conn.cursor(dictionary=True)
+    tiempos, ultimo_id, total, validas = [], 0, 0, 0
+    while True:
+        cursor.execute("""
+            SELECT id, paciente_id, resumen, tx_hash, anclaje_id, prueba_merkle, hash_anclado
+            FROM historias
+            WHERE id > %s AND tx_hash IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+        """, (ultimo_id, VERIFICACION_LOTE_MAX))
+        historias = cursor.fetchall()
+        if not historias:
+            break
+        t, resultados = _cronometrar(verificar_historias, conn, historias)
+        tiempos.append(t)
+        total += len(resultados)
+        validas += sum(1 for r in resultados if r["valido"])
+        ultimo_id = historias[-1]["id"]
+    cursor.close()
+    if validas != total:
+        raise RuntimeError(f"❌ Verificación inconsistente: {validas} de {total} historias válidas")
+    return _resumen(f"verificar_historias {nombre} (lotes de {VERIFICACION_LOTE_MAX})", tiempos,
+                    operaciones=total)
+
+
+def ejecutar_base(historias=1000, evoluciones=5, conservar=False):
+    """Anclaje y verificación de `historias` historias reales sobre BENCH_DB_NAME."""
+    conn, origen = conectar_base()
+    resultados = []
+    try:
+        preparar_base(conn, origen)
+        inicio = time.perf_counter()
+        sembrar_historias(conn, historias, evoluciones)
+        print(f"🧱 {historias} historias × {evoluciones} evoluciones cargadas "
+              f"({time.perf_counter() - inicio:.1f}s)")
+
+        resumen, _ = bench_anclar_pendientes(conn, historias)
+        resultados.append(resumen)
+        # Primera pasada: las tx se piden al nodo; segunda: salen de bfa_tx_cache
+        resultados.append(bench_verificar_historias(conn, "sin caché"))
+        resultados.append(bench_verificar_historias(conn, "con caché"))
+    finally:
+        if not conservar:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB_NAME}`")
+            cursor.close()
+        conn.close()
+    return resultados
+
+
+def ejecutar(n=200, hilos=4, lote=100, tamanios_anclaje=(100, 1000, 10000)):
+    bfa_client.conectar()
+    resultados = []
+
+    resumen, tx_hashes = bench_registro_individual(n)
+    resultados.append(resumen)
+    resultados.append(bench_registro_concurrente(n, hilos))
+
+    ultimo_anclaje = None
+    for tamanio in tamanios_anclaje:
+        resumen, ultimo_anclaje = bench_anclaje(tamanio)
+        resultados.append(resumen)
+
+    resultados.append(bench_verificacion_individual(tx_hashes))
+    resultados.append(bench_verificacion_lote(tx_hashes, lote))
+    resultados.append(bench_verificacion_concurrente(tx_hashes, hilos))
+    if ultimo_anclaje:
+        resultados.append(bench_pruebas_merkle(ultimo_anclaje))
+    return resultados
+
+
+def _imprimir(resultados):
+    columnas = ("operaciones", "total_s", "por_segundo", "p50_ms", "p95_ms", "max_ms")
+    print(f"{'prueba':45} " + " ".join(f"{c:>11}" for c in columnas))
+    for r in resultados:
+        print(f"{r['prueba']:45} " + " ".join(f"{str(r[c]):>11}" for c in columnas))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del camino blockchain")
+    parser.add_argument("--n", type=int, default=200, help="transacciones a registrar/leer")
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--lote", type=int, default=100, help="transacciones por batch RPC")
+    parser.add_argument("--anclajes", default="100,1000,10000", help="tamaños de lote Merkle")
+    parser.add_argument("--historias", type=int, default=0,
+                        help="historias para anclar_pendientes/verificar_historias en MySQL (0 = no medir)")
+    parser.add_argument("--evoluciones", type=int, default=5, help="evoluciones por historia")
+    parser.add_argument("--conservar", action="store_true", help="no borrar la base de prueba al terminar")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    print(f"⏱️ Benchmark BFA (backend {bfa_client.BFA_BACKEND})")
+    resultados = ejecutar(
+        n=args.n, hilos=args.hilos, lote=args.lote,
+        tamanios_anclaje=[int(t) for t in args.anclajes.split(",") if t],
+    )
+    if args.historias:
+        resultados += ejecutar_base(args.historias, args.evoluciones, conservar=args.conservar)
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        _imprimir(resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# app/benchmarks/dashboard.py
+"""
+Benchmark de regresión del dashboard: latencia de sus consultas a medida que
+crece la tabla de turnos.
+
+Crea una base aparte (BENCH_DB_NAME, por defecto hc_bench) con la misma
+estructura e índices que la base de la app (CREATE TABLE … LIKE) y la llena
+por tramos hasta cada tamaño pedido. Los turnos se agregan hacia el pasado con
+densidad fija (--por-dia), como crece la agenda real: el día y la semana
+actuales tienen siempre la misma cantidad de filas, así que con filtros por
+rango sobre fecha_inicio la latencia tiene que quedar plana. Los totales del
+director se leen de los contadores materializados (contadores y
+contadores_turnos_dia). Con --comparar también mide la forma vieja
+(DATE(fecha_inicio) = …), que recorre la tabla.
+
+Necesita permisos de DDL (usa MIGRAR_DB_USER/MIGRAR_DB_PASSWORD, igual que
+app.migrar). Sale con código 1 si alguna consulta empeora más de --umbral
+veces entre el tamaño menor y el mayor.
+
+Uso:
+    python -m app.benchmarks.dashboard
+    python -m app.benchmarks.dashboard --tamanios 10000,100000,1000000,3000000 --comparar --json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+import mysql.connector
+from app.migrar import MIGRAR_DB_CONFIG
+
+BENCH_DB_NAME = os.getenv("BENCH_DB_NAME", "hc_bench")
+_LOTE_INSERT = 5000
+_PROFESIONALES = 50
+_PACIENTES = 2000
+_TURNOS_POR_AUSENCIA = 200
+_DIAS_FUTUROS = 7           # el primer tramo ya completa la semana que mira el dashboard
+
+
+# ==============================================================
+# 🔎 Consultas (las mismas de routes/dashboard_routes.py)
+# ==============================================================
+def _inicio_dia(dia):
+    return datetime.combine(dia, datetime.min.time())
+
+
+def _ventanas():
+    hoy = _inicio_dia(date.today())
+    return hoy, hoy + timedelta(days=1), hoy + timedelta(days=7)
+
+
+def consultas(usuario_id=1):
+    """{nombre: (sql, params)} con los filtros por rango de las rutas."""
+    hoy, manana, semana = _ventanas()
+    return {
+        "turnos del día (profesional)": ("""
+            SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo, p.id AS paciente_id,
+                   p.nombre AS paciente, p.apellido, u.nombre AS profesional
+            FROM turnos t
+            JOIN pacientes p ON p.id = t.paciente_id
+            JOIN usuarios u ON u.id = t.usuario_id
+            WHERE t.usuario_id = %s
+            AND t.fecha_inicio >= %s AND t.fecha_inicio < %s
+            ORDER BY t.fecha_inicio ASC
+        """, (usuario_id, hoy, manana)),
+        "contadores (director)": ("""
+            SELECT nombre, valor FROM contadores
+            UNION ALL
+            SELECT 'turnos_hoy', total FROM contadores_turnos_dia WHERE dia = %s
+        """, (hoy.date(),)),
+        "turnos del día (listado global)": ("""
+            SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo, p.id AS paciente_id,
+                   p.nombre AS paciente, p.apellido, u.nombre AS profesional
+            FROM turnos t
+            JOIN pacientes p ON p.id = t.paciente_id
+            JOIN usuarios u ON u.id = t.usuario_id
+            WHERE t.fecha_inicio >= %s AND t.fecha_inicio < %s
+            ORDER BY t.fecha_inicio ASC
+        """, (hoy, manana)),
+        "semana: turnos (profesional)": ("""
+            SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total FROM turnos
+            WHERE usuario_id = %s AND fecha_inicio >= %s AND fecha_inicio < %s
+            GROUP BY DATE(fecha_inicio) ORDER BY dia ASC
+        """, (usuario_id, hoy, semana)),
+        "semana: turnos (todos)": ("""
+            SELECT dia, total FROM contadores_turnos_dia
+            WHERE dia >= %s AND dia < %s AND total <> 0
+            ORDER BY dia ASC
+        """, (hoy.date(), semana.date())),
+        "semana: ausencias (todos)": ("""
+            SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total FROM ausencias
+            WHERE fecha_inicio >= %s AND fecha_inicio < %s
+            GROUP BY DATE(fecha_inicio) ORDER BY dia ASC
+        """, (hoy, semana)),
+    }
+
+
+def consultas_anteriores(usuario_id=1):
+    """La forma previa con DATE(columna): solo para comparar (--comparar)."""
+    hoy = date.today()
+    return {
+        "[antes] turnos del día (total)": ("""
+            SELECT COUNT(*) AS total FROM turnos WHERE DATE(fecha_inicio) = %s
+        """, (hoy,)),
+        "[antes] semana: turnos (profesional)": ("""
+            SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total FROM turnos
+            WHERE usuario_id = %s AND DATE(fecha_inicio) BETWEEN %s AND %s
+            GROUP BY DATE(fecha_inicio) ORDER BY dia ASC
+        """, (usuario_id, hoy, hoy + timedelta(days=6))),
+    }
+
+
+# ==============================================================
+# 🧱 Base de prueba
+# ==============================================================
+def conectar():
+    config = {k: v for k, v in MIGRAR_DB_CONFIG.items() if k != "database"}
+    return mysql.connector.connect(**config)
+
+
+def preparar(conn):
+    """Recrea BENCH_DB_NAME con la estructura de la base de la app y carga usuarios y pacientes."""
+    origen = MIGRAR_DB_CONFIG["database"]
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB_NAME}`")
+    cursor.execute(f"CREATE DATABASE `{BENCH_DB_NAME}`")
+    cursor.execute(f"USE `{BENCH_DB_NAME}`")
+    for tabla in ("usuarios", "pacientes", "turnos", "ausencias", "contadores", "contadores_turnos_dia"):
+        cursor.execute(f"CREATE TABLE `{tabla}` LIKE `{origen}`.`{tabla}`")
+
+    cursor.executemany("""
+        INSERT INTO usuarios (id, nombre, username, email, password_hash, rol)
+        VALUES (%s, %s, %s, %s, 'x', 'profesional')
+    """, [(i, f"Profesional {i}", f"prof{i}", f"prof{i}@bench.local") for i in range(1, _PROFESIONALES + 1)])
+    cursor.executemany("""
+        INSERT INTO pacientes (id, nro_hc, dni, nombre, apellido)
+        VALUES (%s, %s, %s, %s, %s)
+    """, [(i, f"HC{i}", f"{10000000 + i}", f"Nombre{i}", f"Apellido{i}") for i in range(1, _PACIENTES + 1)])
+    conn.commit()
+    cursor.close()
+
+
+def sembrar(conn, desde, hasta, por_dia):
+    """Agrega los turnos [desde, hasta) (y sus ausencias) con `por_dia` turnos por día hacia el pasado."""
+    cursor = conn.cursor()
+    ultimo_dia = _inicio_dia(date.today()) + timedelta(days=_DIAS_FUTUROS)
+    minutos_por_turno = max(1, 11 * 60 // por_dia)
+
+    for inicio_lote in range(desde, hasta, _LOTE_INSERT):
+        turnos, ausencias = [], []
+        for i in range(inicio_lote, min(inicio_lote + _LOTE_INSERT, hasta)):
+            dia = ultimo_dia - timedelta(days=i // por_dia)
+            inicio = dia + timedelta(hours=8, minutes=(i % por_dia) * minutos_por_turno)
+            turnos.append((1 + i % _PACIENTES, 1 + i % _PROFESIONALES, inicio, inicio + timedelta(minutes=30)))
+            if i % _TURNOS_POR_AUSENCIA == 0:
+                usuario = 1 + (i // _TURNOS_POR_AUSENCIA) % _PROFESIONALES
+                ausencias.append((usuario, dia + timedelta(hours=8), dia + timedelta(days=1, hours=8)))
+        cursor.executemany("""
+            INSERT INTO turnos (paciente_id, usuario_id, fecha_inicio, fecha_fin, motivo)
+            VALUES (%s, %s, %s, %s, 'bench')
+        """, turnos)
+        if ausencias:
+            cursor.executemany("""
+                INSERT INTO ausencias (usuario_id, fecha_inicio, fecha_fin, motivo, creado_por)
+                VALUES (%s, %s, %s, 'bench', 1)
+            """, ausencias)
+        conn.commit()
+
+    # Los contadores se cargan como los deja la migración 0004
+    cursor.execute("""
+        INSERT INTO contadores_turnos_dia (dia, total)
+        SELECT DATE(fecha_inicio), COUNT(*) FROM turnos
+        GROUP BY DATE(fecha_inicio)
+        ON DUPLICATE KEY UPDATE total = VALUES(total)
+    """)
+    cursor.execute("""
+        INSERT INTO contadores (nombre, valor)
+        SELECT * FROM (
+            SELECT 'pacientes' AS nombre, COUNT(*) AS valor FROM pacientes
+            UNION ALL SELECT 'usuarios', COUNT(*) FROM usuarios
+        ) AS reales
+        ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+    """)
+    conn.commit()
+    cursor.execute("ANALYZE TABLE turnos, ausencias")
+    cursor.fetchall()
+    cursor.close()
+
+
+# ==============================================================
+# ⏱️ Medición
+# ==============================================================
+def medir(conn, sql, params, repeticiones):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)          # calienta el buffer pool
+    cursor.fetchall()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        tiempos.append(time.perf_counter() - inicio)
+    cursor.close()
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados) * 1000, 2),
+        "p95_ms": round(ordenados[int(0.95 * (len(ordenados) - 1))] * 1000, 2),
+    }
+
+
+def ejecutar(tamanios=(10000, 100000, 1000000), por_dia=400, repeticiones=20, comparar=False, conservar=False,
+             salida=None):
+    """Mide las consultas en cada tamaño; el avance va a `salida` (por defecto stdout)."""
+    minimo = (_DIAS_FUTUROS + 1) * por_dia
+    if min(tamanios) < minimo:
+        raise ValueError(f"El tamaño menor debe ser al menos {minimo} turnos (semana completa)")
+
+    conn = conectar()
+    resultados = []
+    try:
+        preparar(conn)
+        cargadas = 0
+        for tamanio in sorted(tamanios):
+            inicio = time.perf_counter()
+            sembrar(conn, cargadas, tamanio, por_dia)
+            print(f"🧱 {tamanio} turnos cargados ({time.perf_counter() - inicio:.1f}s)", file=salida)
+            cargadas = tamanio
+
+            medidas = dict(consultas())
+            if comparar:
+                medidas.update(consultas_anteriores())
+            for nombre, (sql, params) in medidas.items():
+                resultados.append({"turnos": tamanio, "consulta": nombre, **medir(conn, sql, params, repeticiones)})
+    finally:
+        if not conservar:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB_NAME}`")
+            cursor.close()
+        conn.close()
+    return resultados
+
+
+def regresiones(resultados, umbral):
+    """Consultas (sin las [antes]) cuyo p50 en el tamaño mayor supera `umbral` veces al del menor."""
+    por_consulta = {}
+    for r in resultados:
+        if not r["consulta"].startswith("[antes]"):
+            por_consulta.setdefault(r["consulta"], []).append(r)
+
+    lentas = []
+    for nombre, filas in por_consulta.items():
+        filas.sort(key=lambda r: r["turnos"])
+        base = max(filas[0]["p50_ms"], 0.5)   # por debajo de medio ms manda el ruido
+        factor = filas[-1]["p50_ms"] / base
+        if factor > umbral:
+            lentas.append((nombre, round(factor, 1)))
+    return lentas
+
+
+def _imprimir(resultados):
+    print(f"{'consulta':40} {'turnos':>10} {'p50_ms':>9} {'p95_ms':>9}")
+    for r in sorted(resultados, key=lambda r: (r["consulta"], r["turnos"])):
+        print(f"{r['consulta']:40} {r['turnos']:>10} {r['p50_ms']:>9} {r['p95_ms']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de regresión del dashboard")
+    parser.add_argument("--tamanios", default="10000,100000,1000000", help="cantidades de turnos a medir")
+    parser.add_argument("--por-dia", type=int, default=400, help="turnos por día en la agenda sintética")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--umbral", type=float, default=3.0, help="empeoramiento máximo aceptado (veces)")
+    parser.add_argument("--comparar", action="store_true", help="medir también la forma con DATE(columna)")
+    parser.add_argument("--conservar", action="store_true", help="no borrar la base de prueba al terminar")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    # Con --json stdout queda solo para el JSON: el avance va a stderr
+    salida = sys.stderr if args.json else sys.stdout
+    print(f"⏱️ Benchmark del dashboard (base {BENCH_DB_NAME})", file=salida)
+    resultados = ejecutar(
+        tamanios=[int(t) for t in args.tamanios.split(",") if t],
+        por_dia=args.por_dia, repeticiones=args.repeticiones,
+        comparar=args.comparar, conservar=args.conservar, salida=salida,
+    )
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        _imprimir(resultados)
+
+    lentas = regresiones(resultados, args.umbral)
+    for nombre, factor in lentas:
+        print(f"❌ {nombre}: {factor}x más lenta con la tabla grande", file=salida)
+    if not lentas:
+        print("✅ Latencia del dashboard estable al crecer turnos", file=salida)
+    return 1 if lentas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,11 @@
 
 import os
 import time
+import threading
+from collections import deque
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
 
 DB_CONFIG = {
     'host': os.getenv("DB_HOST", "db"),
@@ -12,13 +15,293 @@ DB_CONFIG = {
     'database': os.getenv("DB_NAME", "hc_bfa")
 }
 
-def get_connection(retries=5, delay=3):
-    for attempt in range(retries):
+# Pool de conexiones (uno por worker de Gunicorn)
+DB_POOL_CONFIG = {
+    'size': int(os.getenv("DB_POOL_SIZE", "5")),                  # conexiones que se mantienen abiertas
+    'max_overflow': int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")), # conexiones extra en picos (se cierran al devolverse)
+    'recycle': int(os.getenv("DB_POOL_RECYCLE", "1800")),         # segundos antes de reabrir una conexión
+    'timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),         # espera máxima cuando el pool está agotado
+}
+
+
+# ==========================================================
+#  Conexión prestada por el pool
+# ==========================================================
+class ConexionPooled:
+    """
+    Envuelve una conexión de mysql.connector. Se usa igual que la original,
+    pero close() la devuelve al pool en lugar de cerrar el socket.
+    """
+
+    def __init__(self, pool, raw, creada_en):
+        self._pool = pool
+        self._raw = raw
+        self._creada_en = creada_en
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.devolver(raw, self._creada_en)
+
+    def __getattr__(self, nombre):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise Error(msg="La conexión ya fue devuelta al pool")
+        return getattr(raw, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Red de seguridad: si un handler se olvida de cerrar, la conexión vuelve igual
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# ==========================================================
+#  Pool de conexiones
+# ==========================================================
+class PoolConexiones:
+    def __init__(self, config, size, max_overflow, recycle, timeout):
+        self._config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+
+        self._libres = deque()   # (conexion, creada_en)
+        self._cond = threading.Condition(threading.Lock())
+        self._abiertas = 0
+        self._stats = {
+            "checkouts": 0,
+            "creadas": 0,
+            "recicladas": 0,
+            "descartadas": 0,
+            "esperas": 0,
+            "timeouts": 0,
+        }
+
+    def _crear(self, retries, delay):
+        for attempt in range(retries):
+            try:
+                # consume_results: varias funciones comparten la conexión del request,
+                # así un cursor con filas sin leer no bloquea al siguiente
+                conn = mysql.connector.connect(**self._config, consume_results=True)
+                if conn.is_connected():
+                    return conn
+            except Error as e:
+                print(f"⚠️ Intento {attempt+1}/{retries} - No se pudo conectar a MySQL ({e})")
+                time.sleep(delay)
+        raise Exception("❌ No se pudo conectar a MySQL después de varios intentos.")
+
+    def _descartar(self, raw):
         try:
-            conn = mysql.connector.connect(**DB_CONFIG)
-            if conn.is_connected():
-                return conn
-        except Error as e:
-            print(f"⚠️ Intento {attempt+1}/{retries} - No se pudo conectar a MySQL ({e})")
-            time.sleep(delay)
-    raise Exception("❌ No se pudo conectar a MySQL después de varios intentos.")
+            raw.close()
+        except Exception:
+            pass
+
+    def obtener(self, retries=5, delay=3):
+        limite = time.monotonic() + self.timeout
+
+        while True:
+            raw = None
+            crear = False
+
+            with self._cond:
+                while not self._libres and self._abiertas >= self.size + self.max_overflow:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats["timeouts"] += 1
+                        raise Exception("❌ Pool de conexiones agotado: no hay conexiones libres.")
+                    self._stats["esperas"] += 1
+                    self._cond.wait(restante)
+
+                if self._libres:
+                    # LIFO: se reutiliza la más reciente y las ociosas envejecen hasta reciclarse
+                    raw, creada_en = self._libres.pop()
+                else:
+                    self._abiertas += 1
+                    crear = True
+
+            if crear:
+                try:
+                    raw = self._crear(retries, delay)
+                except Exception:
+                    with self._cond:
+                        self._abiertas -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["creadas"] += 1
+                    self._stats["checkouts"] += 1
+                return ConexionPooled(self, raw, time.monotonic())
+
+            # Validar antes de entregar: reciclar si es vieja, descartar si está caída
+            motivo = None
+            if self.recycle and time.monotonic() - creada_en > self.recycle:
+                motivo = "recicladas"
+            elif not raw.is_connected():
+                motivo = "descartadas"
+
+            if motivo:
+                self._descartar(raw)
+                with self._cond:
+                    self._abiertas -= 1
+                    self._stats[motivo] += 1
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+            return ConexionPooled(self, raw, creada_en)
+
+    def devolver(self, raw, creada_en):
+        reutilizable = True
+        try:
+            # Descarta cualquier transacción o snapshot que haya quedado abierto
+            raw.rollback()
+        except Exception:
+            reutilizable = False
+
+        cerrar = False
+        with self._cond:
+            # Se decide por las libres, no por las abiertas: con overflow en uso
+            # la conexión que vuelve primero (sea núcleo u overflow) se guarda y
+            # las que sobran por encima de `size` libres son las que se cierran
+            if reutilizable and len(self._libres) < self.size:
+                self._libres.append((raw, creada_en))
+            else:
+                # Sobra (overflow) o está rota: se cierra en lugar de volver al pool
+                cerrar = True
+                self._abiertas -= 1
+                if not reutilizable:
+                    self._stats["descartadas"] += 1
+            self._cond.notify()
+
+        if cerrar:
+            self._descartar(raw)
+
+    def estadisticas(self):
+        with self._cond:
+            libres = len(self._libres)
+            return {
+                "pid": os.getpid(),
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "recycle": self.recycle,
+                "abiertas": self._abiertas,
+                "libres": libres,
+                "en_uso": self._abiertas - libres,
+                **self._stats,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Devuelve el pool del proceso actual (se crea de nuevo tras un fork)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = PoolConexiones(DB_CONFIG, **DB_POOL_CONFIG)
+                _pool_pid = pid
+    return _pool
+
+
+# ==========================================================
+#  Conexión compartida por todo el request
+# ==========================================================
+class ConexionRequest:
+    """
+    Conexión única del request (guardada en flask.g). Los handlers y helpers
+    la usan como siempre: commit()/rollback() actúan sobre ella, pero close()
+    no hace nada; se devuelve al pool en el teardown del app context.
+    """
+
+    def __init__(self, pooled):
+        self._pooled = pooled
+        self.consultas = 0
+
+    def cursor(self, *args, **kwargs):
+        return CursorContado(self, self._pooled.cursor(*args, **kwargs))
+
+    def close(self):
+        pass
+
+    def liberar(self):
+        self._pooled.close()
+
+    def __getattr__(self, nombre):
+        return getattr(self.__dict__["_pooled"], nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class CursorContado:
+    """Cursor que suma cada execute/executemany al contador del request."""
+
+    def __init__(self, conexion, cursor):
+        self._conexion = conexion
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        self._conexion.consultas += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._conexion.consultas += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self.__dict__["_cursor"], nombre)
+
+
+def get_connection(retries=5, delay=3):
+    """
+    Dentro de un request devuelve siempre la misma conexión (una por request).
+    Fuera de Flask (scripts, workers) entrega una conexión del pool.
+    """
+    if not has_app_context():
+        return get_pool().obtener(retries=retries, delay=delay)
+
+    conn = g.get("_db_conn")
+    if conn is None:
+        conn = ConexionRequest(get_pool().obtener(retries=retries, delay=delay))
+        g._db_conn = conn
+    return conn
+
+
+def cerrar_conexion_request(exc=None):
+    """Teardown: descarta lo no confirmado y devuelve la conexión al pool."""
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        conn.liberar()
+
+
+def consultas_del_request():
+    """Cantidad de consultas ejecutadas en el request actual (0 si no usó la base)."""
+    if not has_app_context():
+        return 0
+    conn = g.get("_db_conn")
+    return conn.consultas if conn is not None else 0
+
+
+def pool_stats():
+    return get_pool().estadisticas()
@@ -0,0 +1,13 @@
+# app/generacion_pdf/__init__.py
+
+# ==============================================================
+# 📄 Generación de PDFs sin la app Flask
+# ==============================================================
+# Este paquete no importa nada de `app` (solo reportlab/PIL e imports
+# relativos). Las rutas lo usan como app.generacion_pdf, y el pool de
+# procesos de trabajos_pdf lo importa como paquete de primer nivel
+# (generacion_pdf), así cada proceso hijo no arma la app Flask, los
+# blueprints, el mail ni el pool de MySQL solo para renderizar.
+
+from .historia import generar_pdf_historia, dibujar_marca_agua, PLANTILLA_VERSION
+from .imagenes import es_imagen, crear_derivada, imagen_para_pdf
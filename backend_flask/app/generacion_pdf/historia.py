@@ -0,0 +1,243 @@
+# app/generacion_pdf/historia.py
+import os
+from io import BytesIO
+from datetime import datetime
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.colors import Color
+from reportlab.lib import colors
+from .imagenes import imagen_para_pdf, es_imagen
+
+# ==============================================================
+# 📄 PDF de la historia clínica completa
+# ==============================================================
+# Armado independiente de Flask: recibe los datos ya leídos de la base y
+# devuelve los bytes del PDF. Subir PLANTILLA_VERSION cada vez que cambie
+# el diseño, así se invalidan los PDFs cacheados (ver utils/cache_pdf.py).
+
+PLANTILLA_VERSION = "3"
+
+
+def dibujar_marca_agua(canvas, doc):
+    """
+    Dibuja una marca de agua diagonal suave en cada página.
+    """
+    canvas.saveState()
+
+    canvas.setFont("Helvetica-Bold", 50)
+    canvas.setFillColor(Color(0.6, 0.6, 0.6, alpha=0.12))  # gris suave transparente
+
+    # Mover al centro de página
+    width, height = A4
+    canvas.translate(width / 2, height / 2)
+
+    # Rotar texto 45 grados
+    canvas.rotate(35)
+
+    # Dibujar texto centrado
+    texto = "DOCUMENTO CONFIDENCIAL – CAU UNSAM"
+    canvas.drawCentredString(0, 0, texto)
+
+    canvas.restoreState()
+
+
+def generar_pdf_historia(paciente, evoluciones, archivos_evoluciones, logo_path, base_url, uploads_dir):
+    """
+    Genera el PDF con toda la historia clínica del paciente, incluyendo
+    adjuntos (imágenes y enlaces).
+    - evoluciones: filas con id, fecha, contenido, indicaciones, creado_en, medico, especialidad
+    - archivos_evoluciones: {evolucion_id: [filename, ...]}
+    - uploads_dir: carpeta base de los adjuntos (uploads/evoluciones)
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=2*cm,
+        rightMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="Right", alignment=TA_RIGHT, fontSize=9, textColor="#666666"))
+
+    style_box = TableStyle([
+        ('BOX', (0,0), (-1,-1), 0.6, colors.lightgrey),
+        ('INNERGRID', (0,0), (-1,-1), 0.3, colors.lightgrey),
+        ('BACKGROUND', (0,0), (-1,-1), colors.whitesmoke),
+        ('LEFTPADDING', (0,0), (-1,-1), 6),
+        ('RIGHTPADDING', (0,0), (-1,-1), 6),
+        ('TOPPADDING', (0,0), (-1,-1), 4),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+    ])
+
+    elements = []
+    # -------------------------------------------------------
+    # 🔹 ENCABEZADO con logo y título
+    # -------------------------------------------------------
+    if os.path.exists(logo_path):
+        # 🔸 Logo apenas más grande
+        logo = Image(logo_path, width=5*cm, height=2*cm)
+    else:
+        logo = Paragraph("<b>CAU UNSAM</b>", styles["Normal"])
+
+    titulo = Paragraph("<b>Centro Asistencial Universitario </b>", styles["Title"])
+
+    # Tabla de dos columnas: título (izquierda) y logo (derecha)
+    encabezado = Table([[titulo, logo]], colWidths=[11*cm, 5*cm])
+    encabezado.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+    ]))
+    elements.append(encabezado)
+    elements.append(Spacer(1, 0.1*cm))
+
+    # -------------------------------------------------------
+    # 🔹 TÍTULO PRINCIPAL Y DATOS DEL PACIENTE
+    # -------------------------------------------------------
+    elements.append(Paragraph("<b>Historia Clínica</b>", styles["Heading1"]))
+    elements.append(Spacer(1, 0.3*cm))
+
+    datos_paciente = f"""
+        <b>Paciente:</b> {paciente['apellido'].upper()} {paciente['nombre'].upper()}<br/>
+        <b>DNI:</b> {paciente['dni']}<br/>
+        <b>Cobertura:</b> {paciente.get('cobertura', '-')}<br/>
+        <b>N° HC:</b> {paciente['nro_hc']}<br/>
+        <b>Fecha de nacimiento:</b> {paciente.get('fecha_nacimiento', '-') or '-'}<br/>
+        <b>Sexo:</b> {paciente.get('sexo', '-') or '-'}
+    """
+    elements.append(Paragraph(datos_paciente, styles["Normal"]))
+    elements.append(Spacer(1, 0.5*cm))
+    elements.append(Paragraph("<b>Evoluciones:</b>", styles["Heading2"]))
+    elements.append(Spacer(1, 0.3*cm))
+
+    # -------------------------------------------------------
+    # 🔹 EVOLUCIONES CON ARCHIVOS ADJUNTOS
+    # -------------------------------------------------------
+    if not evoluciones:
+        elements.append(Paragraph("No hay evoluciones registradas.", styles["Normal"]))
+    else:
+        for n, evo in enumerate(evoluciones):
+            fecha_str = evo["fecha"].strftime("%d/%m/%Y") if hasattr(evo["fecha"], "strftime") else str(evo["fecha"])
+            medico = evo["medico"]
+            especialidad = "Director" if evo["especialidad"] == "director" else evo["especialidad"].capitalize()
+
+            fecha_registro = evo["creado_en"].strftime("%d/%m/%Y %H:%M")
+
+            fila_superior = Table([
+                [
+                    Paragraph(f"<b>Fecha:</b> {fecha_str}", styles["Normal"]),
+                    Paragraph(f"<font size='9' color='gray'>Registrado: {fecha_registro}</font>", styles["Right"])
+                ]
+            ], colWidths=[8*cm, 8*cm])
+
+            fila_superior.setStyle(TableStyle([
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ]))
+
+            fila_medico = Paragraph(f"<b>Médico:</b> {medico} ({especialidad})", styles["Normal"])
+
+            fila_contenido = Paragraph(evo["contenido"].replace("\n", "<br/>"), styles["Normal"])
+
+            # --- ARMADO DEL BLOQUE FINAL ---
+            filas = [
+                [fila_superior],
+                [fila_medico],
+                [fila_contenido],
+            ]
+
+            if evo.get("indicaciones"):
+                indicaciones = evo["indicaciones"].replace("\n", "<br/>")
+                filas.append([Paragraph(f"<b>Indicaciones:</b> {indicaciones}", styles["Normal"])])
+
+            bloque = Table(filas, colWidths=[16.5*cm])
+            bloque.setStyle(style_box)
+
+            elements.append(bloque)
+            elements.append(Spacer(1, 0.4*cm))
+            elements.append(Spacer(1, 0.1*cm))
+
+            # 🔸 Archivos adjuntos
+            archivos = archivos_evoluciones.get(evo["id"], [])
+
+            if archivos:
+                elements.append(Paragraph("<b>Archivos adjuntos:</b>", styles["Heading3"]))
+                for filename in archivos:
+                    file_path = os.path.join(uploads_dir, str(evo["id"]), filename)
+
+                    if os.path.exists(file_path):
+                        if es_imagen(filename):
+                            try:
+                                # Versión reducida (ver imagenes.py), no el original
+                                ruta, width, height = imagen_para_pdf(file_path)
+                                aspect = height / float(width)
+                                new_width = 12 * cm
+                                new_height = new_width * aspect
+                                img = Image(ruta, width=new_width, height=new_height)
+                                img.hAlign = 'CENTER'
+                                elements.append(img)
+                                elements.append(Spacer(1, 0.3*cm))
+                            except Exception:
+                                elements.append(Paragraph(f"⚠️ No se pudo mostrar {filename}", styles["Normal"]))
+                        else:
+                            url = f"{base_url}/api/uploads/evoluciones/{evo['id']}/{filename}"
+
+                            elements.append(Paragraph(
+                                f"• <b>{filename}</b> — "
+                                f"<a href='{url}' color='blue'>Haga clic aquí para descargar</a>",
+                                styles['Normal']
+                            ))
+
+                            elements.append(Spacer(1, 0.5*cm))
+
+                        # Salto de página cada 4 evoluciones aprox.
+                        if n % 4 == 3:
+                            elements.append(PageBreak())
+
+    # -------------------------------------------------------
+    # 🔹 PIE DE PÁGINA
+    # -------------------------------------------------------
+    # El PDF se cachea y se sirve igual mientras la historia no cambie: la
+    # fecha es la de esta versión del documento, no la de cada descarga
+    fecha_hora = datetime.now().strftime("%d/%m/%Y - %H:%M")
+
+    def footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColorRGB(0.4, 0.4, 0.4)
+
+        # Texto institucional
+        texto = "Documento emitido por el Sistema de Historia Clínica – Centro Asistencial Universitario UNSAM"
+        canvas.drawString(2 * cm, 1.4 * cm, texto)
+
+        # Fecha y hora en que se generó esta versión
+        canvas.drawRightString(19 * cm, 1.4 * cm, f"Versión generada: {fecha_hora}")
+
+        # Número de página
+        numero_pagina = canvas.getPageNumber()
+        canvas.drawRightString(19 * cm, 1.0 * cm, f"Página {numero_pagina}")
+
+        canvas.restoreState()
+
+    # -------------------------------------------------------
+    # 🔹 Páginas con marca de agua + footer
+    # -------------------------------------------------------
+    def first_page(canvas, doc):
+        dibujar_marca_agua(canvas, doc)
+        footer(canvas, doc)
+
+    def later_pages(canvas, doc):
+        dibujar_marca_agua(canvas, doc)
+        footer(canvas, doc)
+
+    # -------------------------------------------------------
+    # 🔹 CONSTRUCCIÓN FINAL
+    # -------------------------------------------------------
+    doc.build(elements, onFirstPage=first_page, onLaterPages=later_pages)
+    return buffer.getvalue()
@@ -0,0 +1,79 @@
+# app/generacion_pdf/imagenes.py
+import os
+import tempfile
+
+# ==============================================================
+# 🖼️ Imágenes reducidas para embeber en PDFs
+# ==============================================================
+# Los PDFs muestran los adjuntos a 12 cm de ancho; embeber la foto original
+# (varios MB) solo agranda el archivo y el tiempo de armado. Para cada
+# imagen se guarda una copia reducida y recomprimida en una subcarpeta
+# junto al original (uploads/evoluciones/<id>/_pdf<ancho>/). Se crea al
+# subir la evolución o, para adjuntos viejos, la primera vez que se usa.
+
+PDF_IMAGEN_ANCHO_PX = int(os.getenv("PDF_IMAGEN_ANCHO_PX", "1000"))   # ~200 dpi a 12 cm
+PDF_IMAGEN_CALIDAD = int(os.getenv("PDF_IMAGEN_CALIDAD", "80"))
+
+EXTENSIONES = ("jpg", "jpeg", "png")
+
+
+def es_imagen(filename):
+    return filename.lower().rsplit(".", 1)[-1] in EXTENSIONES
+
+
+def ruta_derivada(file_path):
+    carpeta, nombre = os.path.split(file_path)
+    return os.path.join(carpeta, f"_pdf{PDF_IMAGEN_ANCHO_PX}", nombre)
+
+
+def crear_derivada(file_path):
+    """Genera (o regenera) la versión reducida de una imagen. Devuelve su ruta."""
+    from PIL import Image as PILImage, ImageOps
+
+    destino = ruta_derivada(file_path)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    es_png = file_path.lower().endswith(".png")
+
+    with PILImage.open(file_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width > PDF_IMAGEN_ANCHO_PX:
+            alto = max(1, round(im.height * PDF_IMAGEN_ANCHO_PX / im.width))
+            im = im.resize((PDF_IMAGEN_ANCHO_PX, alto), PILImage.LANCZOS)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if es_png:
+                    im.save(f, format="PNG", optimize=True)
+                else:
+                    if im.mode not in ("RGB", "L"):
+                        im = im.convert("RGB")
+                    im.save(f, format="JPEG", quality=PDF_IMAGEN_CALIDAD, optimize=True, progressive=True)
+            os.replace(tmp, destino)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return destino
+
+
+def imagen_para_pdf(file_path):
+    """
+    (ruta, ancho_px, alto_px) de la imagen a embeber: la derivada si existe
+    y está al día (la crea si hace falta); si no se puede, el original.
+    """
+    from PIL import Image as PILImage
+
+    destino = ruta_derivada(file_path)
+    try:
+        if not os.path.exists(destino) or os.path.getmtime(destino) < os.path.getmtime(file_path):
+            crear_derivada(file_path)
+        ruta = destino
+    except Exception as e:
+        print(f"⚠️ No se pudo reducir {file_path}: {e}")
+        ruta = file_path
+
+    # Solo lee el encabezado, no decodifica la imagen
+    with PILImage.open(ruta) as im:
+        ancho, alto = im.size
+    return ruta, ancho, alto
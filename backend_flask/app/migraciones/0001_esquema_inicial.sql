@@ -0,0 +1,112 @@
+-- 0001 · Esquema de una base creada con el init.sql original
+-- Tablas, columnas e índices que se agregaron después a db/init.sql.
+-- En una base nueva (init.sql actual) todo ya existe y se omite.
+-- Después de aplicarla: `flask reindexar-pacientes` llena pacientes_tokens.
+
+-- ==============================================
+-- TABLAS NUEVAS
+-- ==============================================
+CREATE TABLE IF NOT EXISTS pacientes_tokens (
+    token VARCHAR(40) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    paciente_id INT NOT NULL,
+    PRIMARY KEY (token, paciente_id),
+    KEY idx_pacientes_tokens_paciente (paciente_id),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS anclajes_bfa (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    raiz CHAR(64) NOT NULL,
+    cantidad INT NOT NULL,
+    estado ENUM('pendiente', 'publicado', 'error') NOT NULL DEFAULT 'pendiente',
+    tx_hash VARCHAR(100) DEFAULT NULL,
+    error VARCHAR(500) DEFAULT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS bfa_outbox (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    historia_id INT NOT NULL,
+    hash CHAR(64) NOT NULL,
+    usuario_id INT DEFAULT NULL,
+    estado ENUM('pendiente', 'procesando', 'publicado', 'error') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    tx_hash VARCHAR(100) DEFAULT NULL,
+    error VARCHAR(500) DEFAULT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_outbox_estado (estado, proximo_intento),
+    KEY idx_outbox_historia (historia_id),
+    FOREIGN KEY (historia_id) REFERENCES historias(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS bfa_tx_cache (
+    tx_hash CHAR(66) PRIMARY KEY,
+    input_hex TEXT NOT NULL,
+    bloque BIGINT NOT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS historia_cadena (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    paciente_id INT NOT NULL,
+    posicion INT NOT NULL,
+    evolucion_id INT NOT NULL,
+    hash_evolucion CHAR(64) NOT NULL,
+    hash_cadena CHAR(64) NOT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY idx_cadena_paciente_posicion (paciente_id, posicion),
+    UNIQUE KEY idx_cadena_evolucion (evolucion_id),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS barridos_integridad (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    estado ENUM('en_curso', 'completado', 'error') NOT NULL DEFAULT 'en_curso',
+    origen ENUM('manual', 'programado') NOT NULL DEFAULT 'manual',
+    usuario VARCHAR(100) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    procesadas INT NOT NULL DEFAULT 0,
+    validas INT NOT NULL DEFAULT 0,
+    modificadas INT NOT NULL DEFAULT 0,
+    sin_tx INT NOT NULL DEFAULT 0,
+    tx_no_encontradas INT NOT NULL DEFAULT 0,
+    ultimo_id INT NOT NULL DEFAULT 0,
+    error VARCHAR(500) DEFAULT NULL,
+    iniciado_en DATETIME NOT NULL,
+    finalizado_en DATETIME DEFAULT NULL,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+-- ==============================================
+-- HISTORIAS: anclaje en lote (Merkle)
+-- ==============================================
+ALTER TABLE historias ADD COLUMN hash_anclado CHAR(64) DEFAULT NULL AFTER tx_hash;
+ALTER TABLE historias ADD COLUMN anclaje_id INT DEFAULT NULL AFTER hash_anclado;
+ALTER TABLE historias ADD COLUMN prueba_merkle TEXT DEFAULT NULL AFTER anclaje_id;
+
+-- Lo que ya tenía tx individual cuenta como anclado (si no, el próximo lote lo republica)
+UPDATE historias SET hash_anclado = hash_local
+WHERE tx_hash IS NOT NULL AND hash_anclado IS NULL;
+
+-- ==============================================
+-- ÍNDICES
+-- ==============================================
+CREATE INDEX idx_evoluciones_paciente_fecha ON evoluciones (paciente_id, fecha, id);
+CREATE INDEX idx_pacientes_apellido_nombre ON pacientes (apellido, nombre);
+DROP INDEX idx_pacientes_apellido ON pacientes;
+CREATE INDEX idx_turnos_usuario_inicio ON turnos (usuario_id, fecha_inicio);
+CREATE INDEX idx_turnos_inicio ON turnos (fecha_inicio);
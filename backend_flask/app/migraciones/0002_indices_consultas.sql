@@ -0,0 +1,43 @@
+-- 0002 · Índices para los WHERE / ORDER BY de las rutas
+-- Cada índice compuesto empieza por la columna de igualdad y sigue por la
+-- de rango u orden; varios cubren la consulta entera (no leen la fila).
+-- Las claves foráneas quedan cubiertas por el prefijo: MySQL descarta solo
+-- el índice implícito que había creado para cada FK.
+-- `python -m app.migrar --explain` comprueba que los planes los usen.
+
+-- ==============================================
+-- TURNOS
+-- ==============================================
+-- Calendario de un profesional por ventana y motor de disponibilidad
+-- (usuario_id IN … AND fecha_inicio < hasta AND fecha_fin > desde): cubriente.
+CREATE INDEX idx_turnos_usuario_inicio_fin ON turnos (usuario_id, fecha_inicio, fecha_fin);
+DROP INDEX idx_turnos_usuario_inicio ON turnos;
+
+-- ==============================================
+-- AUSENCIAS
+-- ==============================================
+-- Listado por profesional ORDER BY fecha_inicio, ausencias vigentes del
+-- dashboard y ausencias que tocan una ventana (motor de disponibilidad).
+CREATE INDEX idx_ausencias_usuario_inicio_fin ON ausencias (usuario_id, fecha_inicio, fecha_fin);
+-- Ausencias vigentes de todos (dashboard del director).
+CREATE INDEX idx_ausencias_fin ON ausencias (fecha_fin);
+
+-- ==============================================
+-- DISPONIBILIDADES
+-- ==============================================
+-- Plantilla semanal activa de uno o varios profesionales: cubriente.
+CREATE INDEX idx_disponibilidades_usuario_dia ON disponibilidades (usuario_id, dia_semana, activo, hora_inicio, hora_fin);
+
+-- ==============================================
+-- GRUPOS
+-- ==============================================
+-- Grupos de un profesional (el UNIQUE existente empieza por grupo_id).
+CREATE INDEX idx_grupo_miembros_usuario ON grupo_miembros (usuario_id, grupo_id);
+
+-- ==============================================
+-- AUDITORÍAS BLOCKCHAIN
+-- ==============================================
+-- Auditorías de una historia ORDER BY fecha DESC, sin filesort.
+CREATE INDEX idx_auditorias_historia_fecha ON auditorias_blockchain (historia_id, fecha);
+-- Listado general ORDER BY fecha DESC.
+CREATE INDEX idx_auditorias_fecha ON auditorias_blockchain (fecha);
@@ -0,0 +1,6 @@
+-- 0003 · Índice para la semana de ausencias del dashboard
+-- GET /api/dashboard/semanal (director) filtra ausencias por
+-- fecha_inicio >= hoy AND fecha_inicio < hoy + 7 días, sin profesional.
+-- Turnos ya lo tiene (idx_turnos_inicio) y el filtro por profesional usa
+-- los índices (usuario_id, fecha_inicio, …) de la 0002.
+CREATE INDEX idx_ausencias_inicio ON ausencias (fecha_inicio);
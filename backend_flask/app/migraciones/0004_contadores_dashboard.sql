@@ -0,0 +1,32 @@
+-- 0004 · Contadores materializados del dashboard
+-- Los ajustan las rutas de alta/baja (app/utils/contadores.py) y los
+-- corrige la tarea `contadores` del programador. Acá se cargan con los
+-- valores reales del momento.
+
+CREATE TABLE IF NOT EXISTS contadores (
+    nombre VARCHAR(40) PRIMARY KEY,
+    valor BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS contadores_turnos_dia (
+    dia DATE PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO contadores (nombre, valor)
+SELECT * FROM (
+    SELECT 'pacientes' AS nombre, COUNT(*) AS valor FROM pacientes
+    UNION ALL SELECT 'usuarios', COUNT(*) FROM usuarios
+    UNION ALL SELECT 'evoluciones', COUNT(*) FROM evoluciones
+) AS reales
+ON DUPLICATE KEY UPDATE valor = VALUES(valor);
+
+INSERT INTO contadores_turnos_dia (dia, total)
+SELECT DATE(fecha_inicio), COUNT(*) FROM turnos
+GROUP BY DATE(fecha_inicio)
+ON DUPLICATE KEY UPDATE total = VALUES(total);
@@ -0,0 +1,8 @@
+-- 0005 · Anclajes en lote encolados para el worker BFA
+-- POST /api/blockchain/anclar ya no publica dentro del request: deja un
+-- anclaje 'solicitado' (sin raíz todavía) que toma app/worker_bfa.py.
+ALTER TABLE anclajes_bfa MODIFY raiz CHAR(64) DEFAULT NULL;
+ALTER TABLE anclajes_bfa MODIFY cantidad INT NOT NULL DEFAULT 0;
+ALTER TABLE anclajes_bfa MODIFY estado ENUM('solicitado', 'pendiente', 'publicado', 'error') NOT NULL DEFAULT 'pendiente';
+ALTER TABLE anclajes_bfa ADD COLUMN usuario_id INT DEFAULT NULL AFTER error;
+CREATE INDEX idx_anclajes_estado ON anclajes_bfa (estado);
@@ -0,0 +1,4 @@
+-- 0006 · Barridos de integridad solicitados desde la API
+-- POST /api/blockchain/barridos ya no lanza un hilo en el worker web: deja
+-- el barrido 'solicitado' y lo ejecuta app/programador.py.
+ALTER TABLE barridos_integridad MODIFY estado ENUM('solicitado', 'en_curso', 'completado', 'error') NOT NULL DEFAULT 'en_curso';
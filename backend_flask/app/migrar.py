@@ -0,0 +1,327 @@
+# app/migrar.py
+"""
+Migraciones versionadas del esquema (app/migraciones/NNNN_nombre.sql).
+
+db/init.sql solo corre al crear el volumen de MySQL; las bases existentes se
+actualizan aplicando en orden las migraciones que falten. Cada versión
+aplicada queda en schema_migraciones con el checksum del archivo.
+
+Los errores de "ya existe" (tabla, columna, índice) y de "no existe" al
+borrar se omiten: una base creada con el init.sql actual ya tiene esos
+cambios y la migración solo se registra.
+
+Necesita permisos de DDL (ALTER, CREATE, INDEX): el usuario de la app
+(hc_app) no los tiene, por eso se conecta con MIGRAR_DB_USER/MIGRAR_DB_PASSWORD.
+
+Uso:
+    python -m app.migrar              # aplica las pendientes
+    python -m app.migrar --estado     # lista aplicadas y pendientes
+    python -m app.migrar --explain    # falla (exit 1) si una consulta caliente no usa índice
+"""
+import hashlib
+import os
+import sys
+from datetime import date, datetime, timedelta
+import mysql.connector
+from mysql.connector import Error
+from app.database import DB_CONFIG
+
+MIGRACIONES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+MIGRAR_DB_CONFIG = {
+    **DB_CONFIG,
+    "user": os.getenv("MIGRAR_DB_USER", DB_CONFIG["user"]),
+    "password": os.getenv("MIGRAR_DB_PASSWORD", DB_CONFIG["password"]),
+}
+# Tablas con menos filas que esto pueden recorrerse enteras sin que sea un problema
+EXPLAIN_MIN_FILAS = int(os.getenv("EXPLAIN_MIN_FILAS", "1000"))
+_LOCK_NOMBRE = "hc_migraciones"
+
+# Errores que significan "este cambio ya está hecho"
+ERRORES_YA_APLICADO = {
+    1050: "la tabla ya existe",
+    1060: "la columna ya existe",
+    1061: "el índice ya existe",
+    1091: "no existe lo que se quiere borrar",
+}
+
+
+# ==============================================================
+# 📜 Archivos de migración
+# ==============================================================
+def listar_migraciones():
+    """[(version, nombre, ruta)] ordenadas por versión."""
+    migraciones = []
+    for archivo in sorted(os.listdir(MIGRACIONES_DIR)):
+        if not archivo.endswith(".sql"):
+            continue
+        version, _, nombre = archivo[:-4].partition("_")
+        migraciones.append((int(version), nombre, os.path.join(MIGRACIONES_DIR, archivo)))
+    return migraciones
+
+
+def sentencias(texto):
+    """Sentencias de un archivo .sql (una por ';', sin comentarios de línea)."""
+    lineas = [l for l in texto.splitlines() if not l.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lineas).split(";") if s.strip()]
+
+
+def _checksum(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+# ==============================================================
+# 🗄️ Registro de versiones
+# ==============================================================
+def conectar():
+    return mysql.connector.connect(**MIGRAR_DB_CONFIG)
+
+
+def _asegurar_registro(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version INT PRIMARY KEY,
+            nombre VARCHAR(200) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """)
+
+
+def aplicadas(cursor):
+    """{version: checksum} de las migraciones ya registradas."""
+    _asegurar_registro(cursor)
+    cursor.execute("SELECT version, checksum FROM schema_migraciones")
+    return {version: checksum for version, checksum in cursor.fetchall()}
+
+
+def aplicar_pendientes(conn):
+    """Aplica en orden las migraciones que falten. Devuelve las versiones aplicadas."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, 60)", (_LOCK_NOMBRE,))
+    if not cursor.fetchone()[0]:
+        cursor.close()
+        raise Exception("❌ Otra instancia está aplicando migraciones")
+
+    nuevas = []
+    try:
+        hechas = aplicadas(cursor)
+        for version, nombre, ruta in listar_migraciones():
+            with open(ruta, encoding="utf-8") as f:
+                texto = f.read()
+            if version in hechas:
+                if hechas[version] != _checksum(texto):
+                    print(f"⚠️ {os.path.basename(ruta)} cambió después de aplicarse (no se vuelve a correr)")
+                continue
+
+            print(f"▶️ Aplicando {os.path.basename(ruta)}")
+            for sentencia in sentencias(texto):
+                try:
+                    cursor.execute(sentencia)
+                except Error as e:
+                    if e.errno not in ERRORES_YA_APLICADO:
+                        raise
+                    print(f"   ℹ️ Omitida ({ERRORES_YA_APLICADO[e.errno]}): {sentencia.splitlines()[0][:80]}")
+            cursor.execute("""
+                INSERT INTO schema_migraciones (version, nombre, checksum)
+                VALUES (%s, %s, %s)
+            """, (version, nombre, _checksum(texto)))
+            conn.commit()
+            nuevas.append(version)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NOMBRE,))
+        cursor.fetchall()
+        cursor.close()
+    return nuevas
+
+
+def estado(conn):
+    """[(version, nombre, aplicada_en o None)] de todas las migraciones conocidas."""
+    cursor = conn.cursor()
+    _asegurar_registro(cursor)
+    cursor.execute("SELECT version, aplicada_en FROM schema_migraciones")
+    fechas = dict(cursor.fetchall())
+    cursor.close()
+    return [(version, nombre, fechas.get(version)) for version, nombre, _ in listar_migraciones()]
+
+
+# ==============================================================
+# 🔥 Consultas calientes: sus planes tienen que usar índice
+# ==============================================================
+# Una entrada por WHERE / ORDER BY frecuente de las rutas. `alias` es la
+# tabla del plan que debe resolverse por índice (las demás se unen por PK).
+# El SQL sale de las constantes y helpers que usan las rutas: si una ruta
+# cambia su consulta, el EXPLAIN revisa la consulta nueva.
+def consultas_calientes():
+    # Import diferido: las rutas cargan Flask, reportlab y web3, que el resto
+    # de las migraciones no necesita
+    from app.routes import dashboard_routes, turnos_routes
+    from app.routes.blockchain_routes import SQL_AUDITORIAS_PACIENTE
+    from app.routes.pacientes_routes import SQL_LISTADO_PACIENTES, SQL_TIMELINE_EVOLUCIONES
+    from app.utils import disponibilidad
+    from app.utils.busqueda import consulta_coincidencias
+
+    hoy = date.today()
+    desde = datetime.combine(hoy, datetime.min.time())
+    hasta = desde + timedelta(days=7)
+    rango, rango_params = turnos_routes.filtro_calendario(desde, hasta)
+    dos_ids = ", ".join(["%s"] * 2)
+    busqueda_sql, busqueda_params = consulta_coincidencias("garcia")
+    return [
+        {
+            "nombre": "calendario de un profesional",
+            "tabla": "turnos", "alias": "t",
+            "sql": turnos_routes.SQL_CALENDARIO_PROFESIONAL.format(rango=rango),
+            "params": [1] + rango_params,
+        },
+        {
+            "nombre": "calendario general",
+            "tabla": "turnos", "alias": "t",
+            "sql": turnos_routes.SQL_CALENDARIO_GENERAL.format(rango=rango),
+            "params": rango_params,
+        },
+        {
+            "nombre": "próximo turno del profesional",
+            "tabla": "turnos", "alias": "t",
+            "sql": dashboard_routes.SQL_PROXIMO_TURNO,
+            "params": (1,),
+        },
+        {
+            "nombre": "dashboard: turnos del día de un profesional",
+            "tabla": "turnos", "alias": "t",
+            "sql": dashboard_routes.SQL_TURNOS_DIA_PROFESIONAL,
+            "params": (1, desde, desde + timedelta(days=1)),
+        },
+        {
+            "nombre": "dashboard: ausencias de la semana por día",
+            "tabla": "ausencias", "alias": "ausencias",
+            "sql": dashboard_routes.SQL_AUSENCIAS_SEMANA,
+            "params": (desde, hasta),
+        },
+        {
+            "nombre": "agenda: turnos que tocan la ventana",
+            "tabla": "turnos", "alias": "turnos",
+            "sql": disponibilidad.SQL_TURNOS_VENTANA.format(marcadores=dos_ids),
+            "params": (1, 2, hasta, desde),
+        },
+        {
+            "nombre": "agenda: ausencias que tocan la ventana",
+            "tabla": "ausencias", "alias": "ausencias",
+            "sql": disponibilidad.SQL_AUSENCIAS_VENTANA.format(marcadores=dos_ids),
+            "params": (1, 2, hasta, desde),
+        },
+        {
+            "nombre": "agenda: plantilla semanal",
+            "tabla": "disponibilidades", "alias": "disponibilidades",
+            "sql": disponibilidad.SQL_PLANTILLA.format(marcadores=dos_ids),
+            "params": (1, 2),
+        },
+        {
+            "nombre": "ausencias vigentes de un profesional",
+            "tabla": "ausencias", "alias": "ausencias",
+            "sql": dashboard_routes.SQL_AUSENCIAS_VIGENTES_PROFESIONAL,
+            "params": (1, hoy),
+        },
+        {
+            "nombre": "ausencias vigentes (todas)",
+            "tabla": "ausencias", "alias": "a",
+            "sql": dashboard_routes.SQL_AUSENCIAS_VIGENTES,
+            "params": (hoy,),
+        },
+        {
+            "nombre": "evoluciones de un paciente",
+            "tabla": "evoluciones", "alias": "e",
+            "sql": SQL_TIMELINE_EVOLUCIONES.format(filtro=""),
+            "params": (300, 300, 300, 300, 1, 21),
+        },
+        {
+            "nombre": "listado de pacientes",
+            "tabla": "pacientes", "alias": "pacientes",
+            "sql": SQL_LISTADO_PACIENTES.format(filtro=""),
+            "params": (51,),
+        },
+        {
+            "nombre": "búsqueda de pacientes por palabra",
+            "tabla": "pacientes_tokens", "alias": "pacientes_tokens",
+            "sql": busqueda_sql,
+            "params": busqueda_params,
+        },
+        {
+            "nombre": "grupos de un profesional",
+            "tabla": "grupo_miembros", "alias": "grupo_miembros",
+            "sql": turnos_routes.SQL_GRUPOS_DEL_PROFESIONAL,
+            "params": (1,),
+        },
+        {
+            "nombre": "auditorías de un paciente",
+            "tabla": "auditorias_blockchain", "alias": "a",
+            "sql": SQL_AUDITORIAS_PACIENTE,
+            "params": (1,),
+        },
+    ]
+
+
+def _filas_por_tabla(cursor):
+    cursor.execute("""
+        SELECT TABLE_NAME AS tabla, TABLE_ROWS AS filas
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    return {f["tabla"]: f["filas"] or 0 for f in cursor.fetchall()}
+
+
+def verificar_planes(conn):
+    """
+    EXPLAIN de cada consulta caliente. Devuelve [(nombre, problema, fila del plan)]:
+    sin índice utilizable (en cualquier tamaño de tabla) o recorrido completo
+    (type = ALL) sobre una tabla de EXPLAIN_MIN_FILAS filas o más.
+    """
+    cursor = conn.cursor(dictionary=True)
+    filas = _filas_por_tabla(cursor)
+    problemas = []
+    for consulta in consultas_calientes():
+        cursor.execute("EXPLAIN " + consulta["sql"], consulta["params"])
+        plan = [p for p in cursor.fetchall() if p["table"] == consulta["alias"]]
+        if not plan:
+            problemas.append((consulta["nombre"], "la tabla no aparece en el plan", None))
+            continue
+        p = plan[0]
+        if p["key"] is None and p["possible_keys"] is None:
+            problemas.append((consulta["nombre"], "sin índice utilizable", p))
+        elif p["type"] == "ALL" and filas.get(consulta["tabla"], 0) >= EXPLAIN_MIN_FILAS:
+            problemas.append((consulta["nombre"], "recorre la tabla completa", p))
+    cursor.close()
+    return problemas
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    conn = conectar()
+    try:
+        if "--estado" in argv:
+            for version, nombre, aplicada_en in estado(conn):
+                marca = f"✅ {aplicada_en:%Y-%m-%d %H:%M}" if aplicada_en else "⏳ pendiente"
+                print(f"{version:04d}_{nombre:40} {marca}")
+            return 0
+
+        if "--explain" in argv:
+            problemas = verificar_planes(conn)
+            for nombre, problema, p in problemas:
+                detalle = f" (type={p['type']}, key={p['key']}, rows={p['rows']})" if p else ""
+                print(f"❌ {nombre}: {problema}{detalle}")
+            if problemas:
+                return 1
+            print(f"✅ {len(consultas_calientes())} consultas calientes usan índice")
+            return 0
+
+        nuevas = aplicar_pendientes(conn)
+        if nuevas:
+            print(f"✅ Migraciones aplicadas: {', '.join(f'{v:04d}' for v in nuevas)}")
+        else:
+            print("ℹ️ El esquema ya está al día")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# app/programador.py
+"""
+Programador de tareas fuera de horario.
+
+Corre cada tarea una vez por día a la hora configurada (hora local del
+contenedor): el barrido de integridad contra la BFA y la reconciliación de
+los contadores del dashboard. En cada vuelta además ejecuta los barridos
+solicitados desde la API (POST /api/blockchain/barridos).
+
+Uso:
+    python -m app.programador                    # loop continuo
+    python -m app.programador --ahora barrido    # ejecuta la tarea ya y termina
+    python -m app.programador --ahora contadores
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from app.database import get_connection
+from app.utils.barrido_integridad import iniciar_barrido, ejecutar_barrido, tomar_solicitado
+from app.utils.contadores import reconciliar
+
+BARRIDO_HORA = os.getenv("BARRIDO_HORA", "03:00")       # HH:MM, vacío = deshabilitado
+CONTADORES_HORA = os.getenv("CONTADORES_HORA", "04:00")
+PROGRAMADOR_INTERVALO = 30                               # segundos entre chequeos
+
+
+def barrido():
+    conn = get_connection()
+    try:
+        barrido_id = iniciar_barrido(conn, "programador", origen="programado")
+    finally:
+        conn.close()
+    if barrido_id is None:
+        print("ℹ️ Barrido omitido: ya hay uno en curso")
+        return
+    ejecutar_barrido(barrido_id)
+
+
+def barrido_solicitado():
+    """Ejecuta el barrido pedido desde la API, si hay uno esperando."""
+    conn = get_connection()
+    try:
+        barrido_id = tomar_solicitado(conn)
+    finally:
+        conn.close()
+    if barrido_id is not None:
+        print(f"▶️ Ejecutando barrido solicitado {barrido_id}")
+        ejecutar_barrido(barrido_id)
+
+
+def contadores():
+    conn = get_connection()
+    try:
+        correcciones = reconciliar(conn)
+    finally:
+        conn.close()
+    for nombre, antes, ahora in correcciones:
+        print(f"🔢 Contador {nombre} corregido: {antes} → {ahora}")
+    print(f"✅ Contadores reconciliados ({len(correcciones)} corregidos)")
+
+
+TAREAS = {
+    "barrido": (BARRIDO_HORA, barrido),
+    "contadores": (CONTADORES_HORA, contadores),
+}
+
+
+def proxima_ejecucion(hora, desde):
+    """Próximo datetime (hoy o mañana) con la hora HH:MM indicada, posterior a `desde`."""
+    hh, mm = (int(x) for x in hora.split(":"))
+    candidata = desde.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    return candidata if candidata > desde else candidata + timedelta(days=1)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--ahora" in argv:
+        nombre = argv[argv.index("--ahora") + 1]
+        TAREAS[nombre][1]()
+        return
+
+    ahora = datetime.now()
+    agenda = {
+        nombre: proxima_ejecucion(hora, ahora)
+        for nombre, (hora, _) in TAREAS.items() if hora
+    }
+    print(f"🕒 Programador iniciado (pid {os.getpid()}): "
+          + ", ".join(f"{n} → {f:%Y-%m-%d %H:%M}" for n, f in agenda.items()))
+
+    while True:
+        for nombre, cuando in agenda.items():
+            if datetime.now() < cuando:
+                continue
+            print(f"▶️ Ejecutando tarea programada: {nombre}")
+            try:
+                TAREAS[nombre][1]()
+            except Exception as e:
+                print(f"❌ Error en la tarea {nombre}: {e}")
+            agenda[nombre] = proxima_ejecucion(TAREAS[nombre][0], datetime.now())
+        try:
+            barrido_solicitado()
+        except Exception as e:
+            print(f"❌ Error en el barrido solicitado: {e}")
+        time.sleep(PROGRAMADOR_INTERVALO)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, session, url_for, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from app.auth import Usuario
+from app.auth import Usuario, invalidar_usuario_cache
 from werkzeug.security import generate_password_hash
 import secrets
 from app import mail
@@ -144,5 +144,7 @@ def api_reset_password(token):
     cursor.execute("UPDATE usuarios SET password_hash = %s WHERE email = %s", (password_hash, email))
     conn.commit()
     conn.close()
+    # El cache está indexado por id; el reseteo llega por email
+    invalidar_usuario_cache()
 
     return jsonify({'message': 'Contraseña actualizada correctamente ✅'}), 200
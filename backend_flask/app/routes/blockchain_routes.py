@@ -3,6 +3,13 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from app.utils.hashing import generar_hash
 from app.utils.bfa_client import registrar_hash_en_bfa
+from app.utils.cadena_hash import es_resumen_legado
+from app.utils.anclaje_bfa import solicitar_anclaje, verificar_inclusion
+from app.utils.verificacion_bfa import (
+    inputs_de_tx, verificar_historias, guardar_auditorias, VERIFICACION_LOTE_MAX
+)
+from app.utils.barrido_integridad import solicitar_barrido, estado_barrido
+from app.utils.permisos import requiere_rol
 from app.database import get_connection
 from web3 import Web3
 import hashlib
@@ -10,6 +17,15 @@ import json
 
 bp_blockchain = Blueprint("blockchain", __name__)
 
+# Auditorías de un paciente; app.migrar --explain la verifica contra los índices
+SQL_AUDITORIAS_PACIENTE = """
+    SELECT a.*, h.paciente_id
+    FROM auditorias_blockchain a
+    JOIN historias h ON a.historia_id = h.id
+    WHERE h.paciente_id = %s
+    ORDER BY a.fecha DESC
+"""
+
 # =============================================================
 # 1️⃣ REGISTRAR HISTORIA EN LA BLOCKCHAIN BFA
 # =============================================================
@@ -17,8 +33,9 @@ bp_blockchain = Blueprint("blockchain", __name__)
 @login_required
 def registrar_en_bfa(historia_id):
     """
-    Genera el hash de una historia clínica consolidada y lo publica en la Blockchain BFA.
-    Guarda el hash y el tx_hash en la base de datos.
+    Encola la publicación del hash de una historia clínica consolidada en la
+    Blockchain BFA (tabla bfa_outbox). La publica el worker (app/worker_bfa.py);
+    el estado se consulta en /api/blockchain/registros/<id>.
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
@@ -47,33 +64,73 @@ def registrar_en_bfa(historia_id):
         conn.close()
         return jsonify({"error": "Historia no encontrada"}), 404
 
-    # 🔹 Usamos el resumen (JSON con todas las evoluciones)
-    contenido = historia.get("resumen") or ""
-    hash_local = generar_hash(contenido)
-
-    try:
-        tx_hash = registrar_hash_en_bfa(hash_local)
-    except Exception as e:
+    # 🔹 Publicamos el hash de la cadena de evoluciones (o el del resumen viejo)
+    resumen = historia.get("resumen") or ""
+    hash_local = generar_hash(resumen) if es_resumen_legado(resumen) else historia.get("hash_local")
+    if not hash_local:
         cursor.close()
         conn.close()
-        return jsonify({"error": f"No se pudo publicar en la BFA: {str(e)}"}), 500
+        return jsonify({"error": "La historia no tiene hash calculado"}), 400
 
-    # 🔹 Guardar en DB
+    # 🔹 Si ya hay una publicación en curso del mismo hash, se reutiliza
     cursor.execute("""
-        UPDATE historias
-        SET hash_local = %s, tx_hash = %s, fecha = NOW()
-        WHERE id = %s
-    """, (hash_local, tx_hash, historia_id))
-    conn.commit()
+        SELECT * FROM bfa_outbox
+        WHERE historia_id = %s AND hash = %s AND estado IN ('pendiente', 'procesando')
+        ORDER BY id DESC
+        LIMIT 1
+    """, (historia_id, hash_local))
+    registro = cursor.fetchone()
+
+    if not registro:
+        cursor.execute("""
+            INSERT INTO bfa_outbox (historia_id, hash, usuario_id)
+            VALUES (%s, %s, %s)
+        """, (historia_id, hash_local, current_user.id))
+        conn.commit()
+        cursor.execute("SELECT * FROM bfa_outbox WHERE id = %s", (cursor.lastrowid,))
+        registro = cursor.fetchone()
+
     cursor.close()
     conn.close()
 
-    return jsonify({
-        "historia_id": historia_id,
-        "hash": hash_local,
-        "tx_hash": tx_hash,
-        "mensaje": "✅ Hash publicado correctamente en la Blockchain BFA"
-    }), 201
+    respuesta = _respuesta_outbox(registro)
+    respuesta["mensaje"] = "⏳ Publicación en la Blockchain BFA en curso"
+    return jsonify(respuesta), 202
+
+
+def _respuesta_outbox(registro):
+    return {
+        "registro_id": registro["id"],
+        "historia_id": registro["historia_id"],
+        "hash": registro["hash"],
+        "estado": registro["estado"],
+        "tx_hash": registro.get("tx_hash"),
+        "intentos": registro["intentos"],
+        "error": registro.get("error"),
+        "url_estado": f"/api/blockchain/registros/{registro['id']}",
+    }
+
+
+@bp_blockchain.route("/api/blockchain/registros/<int:registro_id>", methods=["GET"])
+@login_required
+def estado_registro_bfa(registro_id):
+    """Estado de una publicación encolada: pendiente, procesando, publicado o error."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM bfa_outbox WHERE id = %s", (registro_id,))
+    registro = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    if not registro:
+        return jsonify({"error": "Registro no encontrado"}), 404
+
+    respuesta = _respuesta_outbox(registro)
+    if registro["estado"] == "publicado":
+        respuesta["mensaje"] = "✅ Hash publicado correctamente en la Blockchain BFA"
+    elif registro["estado"] == "error":
+        respuesta["mensaje"] = "❌ No se pudo publicar en la BFA"
+    return jsonify(respuesta)
 
 
 # =============================================================
@@ -86,46 +143,36 @@ def verificar_historia(historia_id):
     Verifica que el hash almacenado en la base de datos
     coincida con el registrado en la Blockchain BFA.
     """
-    from app.utils.bfa_client import BFA_URL
-    web3 = Web3(Web3.HTTPProvider(BFA_URL))
-
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT * FROM historias WHERE id = %s", (historia_id,))
     historia = cursor.fetchone()
-    cursor.close()
-    conn.close()
 
     if not historia:
+        cursor.close()
+        conn.close()
         return jsonify({"error": "Historia no encontrada"}), 404
 
     if not historia.get("tx_hash"):
+        cursor.close()
+        conn.close()
         return jsonify({"error": "La historia no tiene transacción registrada en BFA"}), 400
 
-    # 🔹 Recalcular hash local desde resumen
-    contenido = historia.get("resumen") or ""
-    hash_local = generar_hash(contenido)
-
-    # 🔹 Obtener hash publicado en BFA
+    # 🔹 Recalcular hash local y leer el hash publicado (caché de tx o nodo BFA)
     try:
-        tx = web3.eth.get_transaction(historia["tx_hash"])
-        input_data = tx["input"]
-        # Convertimos a string hexadecimal limpio
-        if isinstance(input_data, bytes):
-            hash_bfa = input_data.hex()
-        elif hasattr(input_data, "hex"):
-            hash_bfa = input_data.hex()
-        else:
-            hash_bfa = str(input_data)
-
-        # Limpiar prefijo '0x' si lo tiene
-        if hash_bfa.startswith("0x"):
-            hash_bfa = hash_bfa[2:]
-
+        resultado = verificar_historias(conn, [historia])[0]
     except Exception as e:
         return jsonify({"error": f"No se pudo obtener transacción: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
 
-    valido = (hash_local == hash_bfa)
+    if resultado["estado"] == "tx_no_encontrada":
+        return jsonify({"error": "La transacción no existe en el nodo BFA"}), 500
+
+    hash_local = resultado["hash_local"]
+    hash_bfa = resultado["hash_bfa"]
+    valido = resultado["valido"]
 
     # 🔹 Registrar auditoría
     _registrar_auditoria(historia_id, hash_local, hash_bfa, valido, current_user.username)
@@ -135,11 +182,207 @@ def verificar_historia(historia_id):
         "hash_local": hash_local,
         "hash_bfa": hash_bfa,
         "tx_hash": historia["tx_hash"],
+        "anclaje_id": historia.get("anclaje_id"),
         "valido": valido,
         "mensaje": "✅ Integridad verificada" if valido else "❌ La historia fue modificada"
     })
 
 
+# =============================================================
+# 📦 VERIFICACIÓN EN LOTE
+# =============================================================
+@bp_blockchain.route("/api/blockchain/verificar/lote", methods=["POST"])
+@login_required
+def verificar_historias_lote():
+    """
+    Verifica varias historias en una llamada.
+    Body: {"historia_ids": [...]} o, para recorrer toda la base,
+    {"despues_id": <último id de la página anterior>, "limite": N}.
+    Las transacciones se leen de bfa_tx_cache y las que faltan se piden al
+    nodo en batch JSON-RPC. Registra una auditoría por historia verificada.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("historia_ids")
+
+    try:
+        limite = max(1, min(int(data.get("limite", VERIFICACION_LOTE_MAX)), VERIFICACION_LOTE_MAX))
+        despues_id = int(data.get("despues_id", 0))
+        if ids is not None:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parámetros inválidos"}), 400
+
+    if ids is not None and not ids:
+        return jsonify({"error": "historia_ids está vacío"}), 400
+    if ids is not None and len(ids) > VERIFICACION_LOTE_MAX:
+        return jsonify({"error": f"Máximo {VERIFICACION_LOTE_MAX} historias por llamada"}), 400
+
+    columnas = "id, paciente_id, resumen, tx_hash, anclaje_id, prueba_merkle, hash_anclado"
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    if ids is not None:
+        marcadores = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"SELECT {columnas} FROM historias WHERE id IN ({marcadores}) ORDER BY id", ids)
+    else:
+        cursor.execute(f"""
+            SELECT {columnas} FROM historias
+            WHERE id > %s AND tx_hash IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+        """, (despues_id, limite))
+    historias = cursor.fetchall()
+    cursor.close()
+
+    try:
+        resultados = verificar_historias(conn, historias)
+        guardar_auditorias(conn, resultados, current_user.username)
+    except Exception as e:
+        return jsonify({"error": f"No se pudo verificar en BFA: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    encontrados = {r["historia_id"] for r in resultados}
+    resumen = {}
+    for r in resultados:
+        resumen[r["estado"]] = resumen.get(r["estado"], 0) + 1
+
+    respuesta = {
+        "resultados": resultados,
+        "resumen": resumen,
+        "no_encontradas": [i for i in (ids or []) if i not in encontrados],
+    }
+    if ids is None:
+        respuesta["siguiente_despues_id"] = historias[-1]["id"] if len(historias) == limite else None
+    return jsonify(respuesta)
+
+
+# =============================================================
+# 🧹 BARRIDO DE INTEGRIDAD DE TODA LA BASE
+# =============================================================
+@bp_blockchain.route("/api/blockchain/barridos", methods=["POST"])
+@login_required
+@requiere_rol("director")
+def iniciar_barrido_integridad():
+    """
+    Solicita la verificación de todas las historias con tx en BFA.
+    No corre en el worker web: el servicio programador la toma en su próxima vuelta.
+    """
+    conn = get_connection()
+    barrido_id, creado = solicitar_barrido(conn, current_user.username)
+    conn.close()
+
+    if not creado:
+        return jsonify({
+            "error": "Ya hay un barrido de integridad solicitado o en curso",
+            "barrido_id": barrido_id,
+            "url_estado": f"/api/blockchain/barridos/{barrido_id}",
+        }), 409
+
+    return jsonify({
+        "barrido_id": barrido_id,
+        "url_estado": f"/api/blockchain/barridos/{barrido_id}",
+        "mensaje": "🧹 Barrido de integridad solicitado (lo ejecuta el programador)"
+    }), 202
+
+
+@bp_blockchain.route("/api/blockchain/barridos", methods=["GET"])
+@login_required
+def listar_barridos_integridad():
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    barridos = estado_barrido(cursor)
+    cursor.close()
+    conn.close()
+    return jsonify(barridos)
+
+
+@bp_blockchain.route("/api/blockchain/barridos/<int:barrido_id>", methods=["GET"])
+@login_required
+def estado_barrido_integridad(barrido_id):
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    barrido = estado_barrido(cursor, barrido_id)
+    cursor.close()
+    conn.close()
+
+    if not barrido:
+        return jsonify({"error": "Barrido no encontrado"}), 404
+    return jsonify(barrido)
+
+
+# =============================================================
+# ⛓️ ANCLAJE EN LOTE (ÁRBOL DE MERKLE)
+# =============================================================
+@bp_blockchain.route("/api/blockchain/anclar", methods=["POST"])
+@login_required
+@requiere_rol("director")
+def anclar_historias():
+    """
+    Encola el anclaje en lote (raíz Merkle de todas las historias con hash
+    pendiente). Lo publica el worker (app/worker_bfa.py); el estado se
+    consulta en /api/blockchain/anclajes/<id>.
+    """
+    conn = get_connection()
+    try:
+        anclaje = solicitar_anclaje(conn, current_user.id)
+    finally:
+        conn.close()
+
+    if anclaje is None:
+        return jsonify({"mensaje": "No hay historias pendientes de anclar"}), 200
+
+    respuesta = _respuesta_anclaje(anclaje)
+    respuesta["mensaje"] = "⏳ Anclaje en la Blockchain BFA en curso"
+    return jsonify(respuesta), 202
+
+
+def _respuesta_anclaje(anclaje):
+    return {
+        "anclaje_id": anclaje["id"],
+        "estado": anclaje["estado"],
+        "raiz": anclaje.get("raiz"),
+        "cantidad": anclaje["cantidad"],
+        "tx_hash": anclaje.get("tx_hash"),
+        "error": anclaje.get("error"),
+        "url_estado": f"/api/blockchain/anclajes/{anclaje['id']}",
+    }
+
+
+@bp_blockchain.route("/api/blockchain/anclajes/<int:anclaje_id>", methods=["GET"])
+@login_required
+def estado_anclaje(anclaje_id):
+    """Estado de un anclaje: solicitado, pendiente, publicado o error."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM anclajes_bfa WHERE id = %s", (anclaje_id,))
+    anclaje = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    if not anclaje:
+        return jsonify({"error": "Anclaje no encontrado"}), 404
+
+    respuesta = _respuesta_anclaje(anclaje)
+    if anclaje["estado"] == "publicado":
+        respuesta["mensaje"] = (f"✅ {anclaje['cantidad']} historias ancladas en una transacción"
+                                if anclaje["cantidad"] else "No había historias pendientes de anclar")
+    elif anclaje["estado"] == "error":
+        respuesta["mensaje"] = "❌ No se pudo publicar en la BFA"
+    return jsonify(respuesta)
+
+
+@bp_blockchain.route("/api/blockchain/anclajes", methods=["GET"])
+@login_required
+def listar_anclajes():
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM anclajes_bfa ORDER BY id DESC LIMIT 100")
+    registros = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return jsonify(registros)
+
+
 # =============================================================
 # 3️⃣ LISTAR AUDITORÍAS
 # =============================================================
@@ -244,7 +487,7 @@ def verificar_historia_blockchain(paciente_id):
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("""
-        SELECT id, hash_local, tx_hash, fecha
+        SELECT id, hash_local, tx_hash, fecha, anclaje_id, prueba_merkle, hash_anclado
         FROM historias
         WHERE paciente_id = %s
         ORDER BY fecha DESC
@@ -252,29 +495,29 @@ def verificar_historia_blockchain(paciente_id):
     """, (paciente_id,))
     historia = cursor.fetchone()
     cursor.close()
-    conn.close()
 
     if not historia:
+        conn.close()
         return jsonify({"error": "No existe historia consolidada para este paciente"}), 404
 
     if not historia.get("tx_hash"):
+        conn.close()
         return jsonify({"error": "La historia no tiene transacción registrada en BFA"}), 400
 
-    from app.utils.bfa_client import BFA_URL
-    web3 = Web3(Web3.HTTPProvider(BFA_URL))
-
     try:
-        tx = web3.eth.get_transaction(historia["tx_hash"])
-        input_data = tx["input"]
-        if isinstance(input_data, bytes):
-            input_data = input_data.hex()
-        elif hasattr(input_data, "hex"):
-            input_data = input_data.hex()
-        hash_bfa = str(input_data)[2:] if input_data.startswith("0x") else str(input_data)
+        hash_bfa = inputs_de_tx(conn, [historia["tx_hash"]]).get(historia["tx_hash"])
     except Exception as e:
         return jsonify({"error": f"No se pudo obtener transacción: {str(e)}"}), 500
+    finally:
+        conn.close()
 
-    valido = (historia["hash_local"] == hash_bfa)
+    if hash_bfa is None:
+        return jsonify({"error": "La transacción no existe en el nodo BFA"}), 500
+
+    if historia.get("anclaje_id"):
+        valido = verificar_inclusion(historia, historia["hash_local"], hash_bfa)
+    else:
+        valido = (historia["hash_local"] == hash_bfa)
     _registrar_auditoria(historia["id"], historia["hash_local"], hash_bfa, valido, current_user.username)
 
     return jsonify({
@@ -282,6 +525,7 @@ def verificar_historia_blockchain(paciente_id):
         "hash_local": historia["hash_local"],
         "hash_bfa": hash_bfa,
         "tx_hash": historia["tx_hash"],
+        "anclaje_id": historia.get("anclaje_id"),
         "valido": valido,
         "mensaje": "✅ Integridad verificada" if valido else "❌ La historia fue modificada",
         "fecha": str(historia["fecha"])
@@ -339,13 +583,7 @@ def verificar_evolucion_blockchain(evolucion_id):
 def listar_auditorias_paciente(paciente_id):
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT a.*, h.paciente_id
-        FROM auditorias_blockchain a
-        JOIN historias h ON a.historia_id = h.id
-        WHERE h.paciente_id = %s
-        ORDER BY a.fecha DESC
-    """, (paciente_id,))
+    cursor.execute(SQL_AUDITORIAS_PACIENTE, (paciente_id,))
     registros = cursor.fetchall()
     cursor.close()
     conn.close()
@@ -1,10 +1,66 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required, current_user
 from app.database import get_connection
-from datetime import date, timedelta
+from app.utils import contadores
+from datetime import date, datetime, time, timedelta
 
 bp_dashboard = Blueprint("dashboard", __name__)
 
+# Consultas del dashboard que app.migrar --explain verifica contra los índices
+SQL_TURNOS_DIA_PROFESIONAL = """
+    SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
+           p.id AS paciente_id,
+           p.nombre AS paciente, p.apellido,
+           u.nombre AS profesional
+    FROM turnos t
+    JOIN pacientes p ON p.id = t.paciente_id
+    JOIN usuarios u ON u.id = t.usuario_id
+    WHERE t.usuario_id = %s
+    AND t.fecha_inicio >= %s AND t.fecha_inicio < %s
+    ORDER BY t.fecha_inicio ASC
+"""
+
+SQL_PROXIMO_TURNO = """
+    SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
+           p.id AS paciente_id,
+           p.nombre AS paciente, p.apellido
+    FROM turnos t
+    JOIN pacientes p ON p.id = t.paciente_id
+    WHERE t.usuario_id = %s
+    AND t.fecha_inicio > NOW()
+    ORDER BY t.fecha_inicio ASC
+    LIMIT 1
+"""
+
+SQL_AUSENCIAS_VIGENTES_PROFESIONAL = """
+    SELECT id, fecha_inicio, fecha_fin, motivo
+    FROM ausencias
+    WHERE usuario_id = %s AND fecha_fin >= %s
+    ORDER BY fecha_inicio ASC
+"""
+
+SQL_AUSENCIAS_VIGENTES = """
+    SELECT a.id, a.fecha_inicio, a.fecha_fin, a.motivo,
+           u.nombre AS profesional
+    FROM ausencias a
+    JOIN usuarios u ON u.id = a.usuario_id
+    WHERE a.fecha_fin >= %s
+    ORDER BY a.fecha_inicio ASC
+"""
+
+SQL_AUSENCIAS_SEMANA = """
+    SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
+    FROM ausencias
+    WHERE fecha_inicio >= %s AND fecha_inicio < %s
+    GROUP BY DATE(fecha_inicio)
+    ORDER BY dia ASC
+"""
+
+
+def _inicio_dia(dia):
+    """00:00 del día. Los filtros usan [inicio, fin) sobre la columna para que MySQL use el índice."""
+    return datetime.combine(dia, time.min)
+
 # ============================================================
 # 📊 ENDPOINT PRINCIPAL DEL DASHBOARD
 # ============================================================
@@ -17,6 +73,8 @@ def get_dashboard():
     rol = current_user.rol
     user_id = current_user.id
     hoy = date.today()
+    inicio_hoy = _inicio_dia(hoy)
+    inicio_manana = inicio_hoy + timedelta(days=1)
 
     data = {
         "rol": rol,
@@ -35,35 +93,14 @@ def get_dashboard():
         if rol in ["profesional", "area"]:
 
             # Turnos del día (filtrados por fecha_inicio)
-            cursor.execute("""
-                SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
-                       p.id AS paciente_id,
-                       p.nombre AS paciente, p.apellido,
-                       u.nombre AS profesional
-                FROM turnos t
-                JOIN pacientes p ON p.id = t.paciente_id
-                JOIN usuarios u ON u.id = t.usuario_id
-                WHERE DATE(t.fecha_inicio) = %s
-                AND t.usuario_id = %s
-                ORDER BY t.fecha_inicio ASC
-            """, (hoy, user_id))
+            cursor.execute(SQL_TURNOS_DIA_PROFESIONAL, (user_id, inicio_hoy, inicio_manana))
 
             turnos_hoy = cursor.fetchall()
             data["turnos_hoy"] = len(turnos_hoy)
             data["turnos"] = turnos_hoy
 
             # Próximo turno (fecha futura)
-            cursor.execute("""
-                SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
-                       p.id AS paciente_id,
-                       p.nombre AS paciente, p.apellido
-                FROM turnos t
-                JOIN pacientes p ON p.id = t.paciente_id
-                WHERE t.usuario_id = %s
-                AND t.fecha_inicio > NOW()
-                ORDER BY t.fecha_inicio ASC
-                LIMIT 1
-            """, (user_id,))
+            cursor.execute(SQL_PROXIMO_TURNO, (user_id,))
 
             proximo = cursor.fetchone()
             if proximo:
@@ -72,12 +109,7 @@ def get_dashboard():
             data["proximo_turno"] = proximo
 
             # Ausencias personales
-            cursor.execute("""
-                SELECT id, fecha_inicio, fecha_fin, motivo
-                FROM ausencias
-                WHERE usuario_id = %s AND fecha_fin >= %s
-                ORDER BY fecha_inicio ASC
-            """, (user_id, hoy))
+            cursor.execute(SQL_AUSENCIAS_VIGENTES_PROFESIONAL, (user_id, hoy))
 
             data["ausencias"] = cursor.fetchall()
 
@@ -86,22 +118,8 @@ def get_dashboard():
         # ======================================================
         elif rol in ("director", "administrativo"):
 
-            cursor.execute("SELECT COUNT(*) AS total FROM pacientes")
-            data["estadisticas"]["pacientes"] = cursor.fetchone()["total"]
-
-            cursor.execute("SELECT COUNT(*) AS total FROM usuarios")
-            data["estadisticas"]["usuarios"] = cursor.fetchone()["total"]
-
-            # Turnos de hoy (Totales)
-            cursor.execute("""
-                SELECT COUNT(*) AS total
-                FROM turnos
-                WHERE DATE(fecha_inicio) = %s
-            """, (hoy,))
-            data["estadisticas"]["turnos_hoy"] = cursor.fetchone()["total"]
-
-            cursor.execute("SELECT COUNT(*) AS total FROM evoluciones")
-            data["estadisticas"]["evoluciones"] = cursor.fetchone()["total"]
+            # Totales y turnos de hoy: contadores materializados (sin COUNT(*))
+            data["estadisticas"].update(contadores.leer(cursor, hoy))
 
             # Listado de turnos del día (Global)
             cursor.execute("""
@@ -112,20 +130,13 @@ def get_dashboard():
                 FROM turnos t
                 JOIN pacientes p ON p.id = t.paciente_id
                 JOIN usuarios u ON u.id = t.usuario_id
-                WHERE DATE(t.fecha_inicio) = %s
+                WHERE t.fecha_inicio >= %s AND t.fecha_inicio < %s
                 ORDER BY t.fecha_inicio ASC
-            """, (hoy,))
+            """, (inicio_hoy, inicio_manana))
             data["turnos"] = cursor.fetchall()
 
             # Ausencias globales
-            cursor.execute("""
-                SELECT a.id, a.fecha_inicio, a.fecha_fin, a.motivo,
-                       u.nombre AS profesional
-                FROM ausencias a
-                JOIN usuarios u ON u.id = a.usuario_id
-                WHERE a.fecha_fin >= %s
-                ORDER BY a.fecha_inicio ASC
-            """, (hoy,))
+            cursor.execute(SQL_AUSENCIAS_VIGENTES, (hoy,))
             data["ausencias"] = cursor.fetchall()
 
         else:
@@ -155,7 +166,9 @@ def get_dashboard_semanal():
     user_id = current_user.id
 
     hoy = date.today()
-    hasta_7_dias = hoy + timedelta(days=6)
+    # Semana [hoy 00:00, hoy + 7 días 00:00)
+    desde = _inicio_dia(hoy)
+    hasta = desde + timedelta(days=7)
 
     try:
         # ===========================
@@ -167,20 +180,14 @@ def get_dashboard_semanal():
                 SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
                 FROM turnos
                 WHERE usuario_id = %s
-                AND DATE(fecha_inicio) BETWEEN %s AND %s
+                AND fecha_inicio >= %s AND fecha_inicio < %s
                 GROUP BY DATE(fecha_inicio)
                 ORDER BY dia ASC
-            """, (user_id, hoy, hasta_7_dias))
+            """, (user_id, desde, hasta))
+            turnos = cursor.fetchall()
         else:
-            cursor.execute("""
-                SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
-                FROM turnos
-                WHERE DATE(fecha_inicio) BETWEEN %s AND %s
-                GROUP BY DATE(fecha_inicio)
-                ORDER BY dia ASC
-            """, (hoy, hasta_7_dias))
-
-        turnos = cursor.fetchall()
+            # Todos los profesionales: contador de turnos por día
+            turnos = contadores.turnos_por_dia(cursor, hoy, hoy + timedelta(days=7))
 
         # ===========================
         # AUSENCIAS
@@ -191,18 +198,12 @@ def get_dashboard_semanal():
                 SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
                 FROM ausencias
                 WHERE usuario_id = %s
-                AND DATE(fecha_inicio) BETWEEN %s AND %s
+                AND fecha_inicio >= %s AND fecha_inicio < %s
                 GROUP BY DATE(fecha_inicio)
                 ORDER BY dia ASC
-            """, (user_id, hoy, hasta_7_dias))
+            """, (user_id, desde, hasta))
         else:
-            cursor.execute("""
-                SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
-                FROM ausencias
-                WHERE DATE(fecha_inicio) BETWEEN %s AND %s
-                GROUP BY DATE(fecha_inicio)
-                ORDER BY dia ASC
-            """, (hoy, hasta_7_dias))
+            cursor.execute(SQL_AUSENCIAS_SEMANA, (desde, hasta))
 
         ausencias = cursor.fetchall()
 
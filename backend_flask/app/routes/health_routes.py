@@ -5,6 +5,7 @@ import smtplib
 import requests
 from flask_login import current_user, login_required
 from app.config import Config
+from app.database import pool_stats
 
 bp_health = Blueprint("bp_health", __name__, url_prefix="/api/health")
 
@@ -53,6 +54,9 @@ def secure_health():
         status["database"] = f"error: {str(e)}"
         status["status"] = "degraded"
 
+    # 📊 Estado del pool de conexiones de este worker
+    status["db_pool"] = pool_stats()
+
     # ✅ Verificar nodo BFA (Geth)
     try:
         bfa_url = "http://bfa-node:8545"
@@ -6,6 +6,7 @@ from app.database import get_connection
 from app.utils.hashing import generar_hash
 from app.utils.bfa_client import registrar_hash_en_bfa, verificar_hash_en_bfa
 from app.utils.permisos import requiere_rol
+from app.utils.cadena_hash import extender_cadena, resumen_cadena
 from web3 import Web3
 import hashlib, json
 
@@ -16,49 +17,39 @@ bp_historias = Blueprint("historias", __name__)
 # =========================================================
 def actualizar_historia(paciente_id, usuario_id):
     """
-    Genera o actualiza la historia consolidada del paciente
-    sumando todas sus evoluciones y recalculando el hash local.
+    Genera o actualiza la historia consolidada del paciente.
+    Encadena solo las evoluciones nuevas (ver utils/cadena_hash.py), así que
+    el costo no crece con el tamaño de la historia. Devuelve el hash local.
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
-    # 1️⃣ Obtener todas las evoluciones del paciente
-    cursor.execute("""
-        SELECT id, fecha, contenido, usuario_id
-        FROM evoluciones
-        WHERE paciente_id = %s
-        ORDER BY fecha ASC
-    """, (paciente_id,))
-    evoluciones = cursor.fetchall()
+    try:
+        # 1️⃣ Encadenar las evoluciones que falten
+        resultado = extender_cadena(cursor, paciente_id)
+        if resultado is None:
+            conn.rollback()
+            return None  # no hay evoluciones todavía
+        hash_local, cantidad, ultima_evolucion = resultado
+
+        # 2️⃣ Insertar o actualizar historia consolidada
+        cursor.execute("""
+            INSERT INTO historias (paciente_id, usuario_id, resumen, hash_local)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                usuario_id = VALUES(usuario_id),
+                resumen = VALUES(resumen),
+                hash_local = VALUES(hash_local),
+                fecha = NOW();
+        """, (paciente_id, usuario_id, resumen_cadena(cantidad, ultima_evolucion, hash_local), hash_local))
 
-    if not evoluciones:
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         cursor.close()
         conn.close()
-        return None  # no hay evoluciones todavía
-
-    # 🧩 Convertir fechas a string (date o datetime) para evitar error JSON
-    for evo in evoluciones:
-        fecha_val = evo.get("fecha")
-        evo["fecha"] = fecha_val.isoformat() if hasattr(fecha_val, "isoformat") else str(fecha_val)
-
-    # 2️⃣ Generar resumen y hash
-    resumen_json = json.dumps(evoluciones, sort_keys=True, ensure_ascii=False)
-    hash_local = hashlib.sha256(resumen_json.encode()).hexdigest()
-
-    # 3️⃣ Insertar o actualizar historia consolidada
-    cursor.execute("""
-        INSERT INTO historias (paciente_id, usuario_id, resumen, hash_local)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            usuario_id = VALUES(usuario_id),
-            resumen = VALUES(resumen),
-            hash_local = VALUES(hash_local),
-            fecha = NOW();
-    """, (paciente_id, usuario_id, resumen_json, hash_local))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
     return hash_local
 
 
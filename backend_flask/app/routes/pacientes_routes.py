@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, send_from_directory, send_file, current_app
 from flask_login import login_required, current_user
 from app.database import get_connection
+from app.utils.consultas import limitar_consultas
 from werkzeug.utils import secure_filename
 from io import BytesIO
 from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle)
@@ -12,8 +13,16 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 from datetime import datetime
 from app.routes.historias_routes import actualizar_historia
+from app.utils.busqueda import (indexar_paciente, buscar_pacientes as buscar_pacientes_indexado,
+                                buscar_pacientes_keyset, consulta_coincidencias)
+from app.utils.paginacion import (decodificar_cursor, leer_limite, condicion_despues,
+                                  parametros_despues, pagina, total_cacheado,
+                                  TOTAL_CACHE_TTL)
+from app.utils.indice_pacientes import indice_pacientes
+from app.generacion_pdf import (generar_pdf_historia, dibujar_marca_agua, PLANTILLA_VERSION,
+                                es_imagen, crear_derivada, imagen_para_pdf)
+from app.utils import cache_pdf, trabajos_pdf, contadores
 import os
-from reportlab.lib.colors import Color
 from reportlab.lib import colors
 
 # Registrar fuente compatible con UTF-8 (caracteres acentuados, español)
@@ -21,6 +30,44 @@ pdfmetrics.registerFont(UnicodeCIDFont('HeiseiMin-W3'))
 
 bp_pacientes = Blueprint("pacientes", __name__)
 
+# Listado y línea de tiempo paginados por cursor; {filtro} es la condición
+# de condicion_despues (vacía en la primera página).
+# app.migrar --explain verifica estas mismas consultas contra los índices.
+SQL_LISTADO_PACIENTES = """
+    SELECT id, dni, nombre, apellido, fecha_nacimiento, sexo, telefono, email
+    FROM pacientes{filtro}
+    ORDER BY apellido, nombre, id
+    LIMIT %s
+"""
+
+SQL_TIMELINE_EVOLUCIONES = """
+    SELECT
+        e.id,
+        e.fecha,
+        e.creado_en,
+        e.usuario_id,
+        LEFT(e.contenido, %s) AS contenido,
+        LEFT(e.indicaciones, %s) AS indicaciones,
+        (CHAR_LENGTH(e.contenido) > %s OR CHAR_LENGTH(e.indicaciones) > %s) AS truncado,
+        u.nombre AS nombre_usuario,
+        CASE
+            WHEN u.rol = 'director' THEN 'Director'
+            ELSE COALESCE(u.especialidad, 'Sin especificar')
+        END AS especialidad_usuario,
+        (SELECT COUNT(*) FROM evolucion_archivos a WHERE a.evolucion_id = e.id) AS cantidad_archivos
+    FROM evoluciones e
+    JOIN usuarios u ON e.usuario_id = u.id
+    WHERE e.paciente_id = %s {filtro}
+    ORDER BY e.fecha DESC, e.id DESC
+    LIMIT %s
+"""
+
+
+@bp_pacientes.before_app_request
+def _preparar_indice_pacientes():
+    # Construye el índice en memoria al arrancar el worker y lo refresca al vencer el TTL
+    indice_pacientes.refrescar_si_vencido()
+
 # ==========================================================
 # 📁 CRUD de Pacientes
 # ==========================================================
@@ -92,8 +139,18 @@ def api_crear_paciente():
         usuario_id
     ))
 
+    # Índice de búsqueda (misma transacción que el alta)
+    paciente_id = cursor.lastrowid
+    indexar_paciente(cursor, paciente_id, data.get('nombre'), data.get('apellido'))
+    contadores.sumar(cursor, "pacientes")
+
     conn.commit()
     cursor.close(); conn.close()
+
+    indice_pacientes.guardar(
+        paciente_id, data.get('nro_hc'), data.get('dni'),
+        data.get('nombre', '').upper(), data.get('apellido', '').upper()
+    )
     return jsonify({'message': 'Paciente registrado correctamente ✅'})
 
 @bp_pacientes.route('/api/pacientes/<int:id>', methods=['PUT'])
@@ -149,25 +206,69 @@ def api_modificar_paciente(id):
     query = f"UPDATE pacientes SET {set_clause}, modificado_por=%s WHERE id=%s"
     cursor.execute(query, values)
 
+    # Si cambiaron datos buscables, actualizar los índices de búsqueda
+    fila = None
+    if campos_no_vacios.keys() & {'nro_hc', 'dni', 'nombre', 'apellido'}:
+        cursor.execute("SELECT nro_hc, dni, nombre, apellido FROM pacientes WHERE id = %s", (id,))
+        fila = cursor.fetchone()
+        if fila and ('nombre' in campos_no_vacios or 'apellido' in campos_no_vacios):
+            indexar_paciente(cursor, id, fila[2], fila[3])
+
     conn.commit()
     cursor.close(); conn.close()
+
+    if fila:
+        indice_pacientes.guardar(id, *fila)
     return jsonify({'message': 'Paciente modificado correctamente ✅'})
 
 
+def _total_aproximado(cursor, clave, sql, params=()):
+    """
+    Total para la paginación. Se cachea TOTAL_CACHE_TTL segundos en cada
+    worker de Gunicorn, así que dos pedidos atendidos por workers distintos
+    pueden informar totales diferentes: la respuesta lo marca como aproximado.
+    """
+    return {
+        'total': total_cacheado(cursor, clave, sql, params),
+        'total_aproximado': True,
+        'total_cache_seg': TOTAL_CACHE_TTL,
+    }
+
+
 @bp_pacientes.route('/api/pacientes', methods=['GET'])
 @login_required
 def api_listar_pacientes():
-    """Devuelve el listado completo de pacientes."""
+    """
+    Devuelve el listado de pacientes ordenado por apellido y nombre,
+    paginado por cursor: ?limit= (50 si no se indica) y ?cursor= para las
+    páginas siguientes. Nunca devuelve la tabla completa.
+    """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT id, dni, nombre, apellido, fecha_nacimiento, sexo, telefono, email
-            FROM pacientes
-            ORDER BY apellido, nombre
-        """)
-        pacientes = cursor.fetchall()
-        return jsonify(pacientes)
+        limite = leer_limite(request.args.get('limit'), defecto=50, maximo=500)
+        try:
+            despues = decodificar_cursor(request.args.get('cursor'), 3)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        filtro = ""
+        params = []
+        if despues:
+            condicion, indices = condicion_despues(["apellido", "nombre", "id"])
+            filtro = f" WHERE {condicion}"
+            params += parametros_despues(indices, despues)
+        cursor.execute(SQL_LISTADO_PACIENTES.format(filtro=filtro), params + [limite + 1])
+
+        pacientes, siguiente = pagina(
+            cursor.fetchall(), limite, lambda p: (p['apellido'], p['nombre'], p['id'])
+        )
+        respuesta = {'pacientes': pacientes, 'siguiente_cursor': siguiente, 'limit': limite}
+        if request.args.get('total') == '1':
+            respuesta.update(_total_aproximado(
+                cursor, 'pacientes', "SELECT COUNT(*) AS total FROM pacientes"
+            ))
+        return jsonify(respuesta)
     except Exception as e:
         print("⚠️ Error en /api/pacientes:", e)
         return jsonify({"error": str(e)}), 500
@@ -209,8 +310,10 @@ def api_eliminar_paciente(id):
         return jsonify({'error': 'Paciente no encontrado'}), 404
 
     cursor.execute("DELETE FROM pacientes WHERE id = %s", (id,))
+    contadores.sumar(cursor, "pacientes", -1)
     conn.commit()
     cursor.close(); conn.close()
+    indice_pacientes.quitar(id)
     return jsonify({'message': 'Paciente eliminado correctamente ✅'})
 
 
@@ -219,29 +322,20 @@ def api_eliminar_paciente(id):
 def buscar_pacientes():
     """Busca pacientes por nombre, apellido, DNI o N° de historia clínica."""
     term = request.args.get('q', '')
+
+    # Paginación por cursor (?cursor= / ?limit=): no depende de la profundidad
+    if 'cursor' in request.args or 'limit' in request.args:
+        return _buscar_pacientes_cursor(term)
+
     page = int(request.args.get('page', 1))
     per_page = 10
 
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    like_term = f"%{term}%"
-
-    cursor.execute("""
-        SELECT COUNT(*) as total 
-        FROM pacientes
-        WHERE dni LIKE %s OR nombre LIKE %s OR apellido LIKE %s OR nro_hc LIKE %s
-    """, (like_term, like_term, like_term, like_term))
-    total = cursor.fetchone()['total']
 
+    # Índice de tokens (prefijo en DNI/HC + palabras de nombre/apellido, sin acentos)
     offset = (page - 1) * per_page
-    cursor.execute("""
-        SELECT id, nro_hc, dni, nombre, apellido 
-        FROM pacientes
-        WHERE dni LIKE %s OR nombre LIKE %s OR apellido LIKE %s OR nro_hc LIKE %s
-        ORDER BY apellido, nombre
-        LIMIT %s OFFSET %s
-    """, (like_term, like_term, like_term, like_term, per_page, offset))
-    results = cursor.fetchall()
+    total, results = buscar_pacientes_indexado(cursor, term, per_page, offset)
 
     cursor.close(); conn.close()
     return jsonify({
@@ -253,6 +347,62 @@ def buscar_pacientes():
     })
 
 
+def _buscar_pacientes_cursor(term):
+    limite = leer_limite(request.args.get('limit'), defecto=10, maximo=100)
+    try:
+        despues = decodificar_cursor(request.args.get('cursor'), 4)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        filas = buscar_pacientes_keyset(cursor, term, limite, despues)
+        results, siguiente = pagina(
+            filas, limite, lambda p: (p['rango'], p['apellido'], p['nombre'], p['id'])
+        )
+        for p in results:
+            p.pop('rango', None)
+
+        respuesta = {'pacientes': results, 'siguiente_cursor': siguiente, 'limit': limite}
+        if request.args.get('total') == '1':
+            consulta = consulta_coincidencias(term)
+            if consulta is None:
+                respuesta.update(_total_aproximado(
+                    cursor, 'pacientes', "SELECT COUNT(*) AS total FROM pacientes"
+                ))
+            else:
+                sql, params = consulta
+                respuesta.update(_total_aproximado(
+                    cursor, f"busqueda:{term.strip().lower()}",
+                    f"SELECT COUNT(*) AS total FROM ({sql}) m", params
+                ))
+        return jsonify(respuesta)
+    finally:
+        cursor.close(); conn.close()
+
+
+@bp_pacientes.route('/api/pacientes/sugerir', methods=['GET'])
+@login_required
+def sugerir_pacientes():
+    """Sugerencias para búsqueda mientras se escribe (índice en memoria del worker)."""
+    term = request.args.get('q', '')
+    try:
+        k = min(max(int(request.args.get('k', 10)), 1), 50)
+    except ValueError:
+        k = 10
+
+    if indice_pacientes.listo:
+        return jsonify({'pacientes': indice_pacientes.sugerir(term, k)})
+
+    # Mientras el índice se construye, se responde desde la base
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    _, results = buscar_pacientes_indexado(cursor, term, k)
+    cursor.close(); conn.close()
+    return jsonify({'pacientes': results})
+
+
 # ==========================================================
 # 🩺 Evoluciones
 # ==========================================================
@@ -276,8 +426,9 @@ def agregar_evolucion(id):
             INSERT INTO evoluciones (paciente_id, fecha, contenido, indicaciones, usuario_id)
             VALUES (%s, %s, %s, %s, %s)
     """, (id, fecha, contenido, indicaciones, current_user.id))
-    conn.commit()
     evolucion_id = cursor.lastrowid
+    contadores.sumar(cursor, "evoluciones")
+    conn.commit()
 
     upload_dir = os.path.join(os.getcwd(), 'uploads', 'evoluciones', str(evolucion_id))
     os.makedirs(upload_dir, exist_ok=True)
@@ -286,6 +437,12 @@ def agregar_evolucion(id):
         if archivo.filename:
             filename = secure_filename(archivo.filename)
             archivo.save(os.path.join(upload_dir, filename))
+            if es_imagen(filename):
+                try:
+                    crear_derivada(os.path.join(upload_dir, filename))
+                except Exception as e:
+                    # Se reintenta al exportar el PDF
+                    print(f"⚠️ No se pudo reducir {filename}: {e}")
             cursor.execute("""
                 INSERT INTO evolucion_archivos (evolucion_id, filename)
                 VALUES (%s, %s)
@@ -305,8 +462,27 @@ def agregar_evolucion(id):
 
     return jsonify({'message': f'Evolución guardada correctamente ✅{msg_extra}'})
 
+def archivos_por_evolucion(cursor, evolucion_ids):
+    """{evolucion_id: [filename, ...]} para varias evoluciones en una sola consulta."""
+    archivos = {}
+    if not evolucion_ids:
+        return archivos
+
+    marcadores = ", ".join(["%s"] * len(evolucion_ids))
+    cursor.execute(f"""
+        SELECT evolucion_id, filename
+        FROM evolucion_archivos
+        WHERE evolucion_id IN ({marcadores})
+        ORDER BY evolucion_id, id
+    """, list(evolucion_ids))
+    for fila in cursor.fetchall():
+        archivos.setdefault(fila['evolucion_id'], []).append(fila['filename'])
+    return archivos
+
+
 @bp_pacientes.route('/api/pacientes/<int:id>/evoluciones', methods=['GET'])
 @login_required
+@limitar_consultas(2)
 def get_evoluciones(id):
     """Obtiene las evoluciones de un paciente, mostrando también el médico y su especialidad."""
     conn = get_connection()
@@ -334,23 +510,96 @@ def get_evoluciones(id):
     
     evoluciones = cursor.fetchall()
 
-    # Adjuntar archivos de cada evolución
+    # Adjuntar archivos de todas las evoluciones (una sola consulta)
+    archivos = archivos_por_evolucion(cursor, [evo['id'] for evo in evoluciones])
     for evo in evoluciones:
-        cursor.execute("""
-            SELECT filename
-            FROM evolucion_archivos
-            WHERE evolucion_id = %s
-        """, (evo['id'],))
-        archivos = cursor.fetchall()
         evo['archivos'] = [{
-            'nombre': a['filename'],
-            'url': f"/api/uploads/evoluciones/{evo['id']}/{a['filename']}"
-        } for a in archivos]
+            'nombre': filename,
+            'url': f"/api/uploads/evoluciones/{evo['id']}/{filename}"
+        } for filename in archivos.get(evo['id'], [])]
 
     cursor.close()
     conn.close()
     return jsonify(evoluciones)
 
+@bp_pacientes.route('/api/pacientes/<int:id>/evoluciones/timeline', methods=['GET'])
+@login_required
+@limitar_consultas(1)
+def get_evoluciones_timeline(id):
+    """
+    Línea de tiempo liviana: resumen de cada evolución (primeros `chars`
+    caracteres, autor, cantidad de adjuntos), paginada por cursor sobre
+    (fecha, id) descendente. El texto completo se pide al endpoint de detalle.
+    """
+    limite = leer_limite(request.args.get('limit'), defecto=20, maximo=100)
+    chars = leer_limite(request.args.get('chars'), defecto=300, maximo=2000)
+    try:
+        despues = decodificar_cursor(request.args.get('cursor'), 2)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filtro = ""
+    params = [chars, chars, chars, chars, id]
+    if despues:
+        condicion, indices = condicion_despues(["e.fecha", "e.id"], descendente=True)
+        filtro = f"AND {condicion}"
+        params += parametros_despues(indices, despues)
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(SQL_TIMELINE_EVOLUCIONES.format(filtro=filtro), params + [limite + 1])
+
+    evoluciones, siguiente = pagina(
+        cursor.fetchall(), limite, lambda e: (e['fecha'].isoformat(), e['id'])
+    )
+    for evo in evoluciones:
+        evo['truncado'] = bool(evo['truncado'])
+
+    cursor.close()
+    conn.close()
+    return jsonify({'evoluciones': evoluciones, 'siguiente_cursor': siguiente, 'limit': limite})
+
+
+@bp_pacientes.route('/api/pacientes/<int:id>/evoluciones/<int:evo_id>', methods=['GET'])
+@login_required
+@limitar_consultas(2)
+def get_evolucion(id, evo_id):
+    """Detalle completo de una evolución (texto, indicaciones y adjuntos)."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT
+            e.id,
+            e.fecha,
+            e.contenido,
+            e.indicaciones,
+            e.creado_en,
+            e.usuario_id,
+            u.nombre AS nombre_usuario,
+            CASE
+                WHEN u.rol = 'director' THEN 'Director'
+                ELSE COALESCE(u.especialidad, 'Sin especificar')
+            END AS especialidad_usuario
+        FROM evoluciones e
+        JOIN usuarios u ON e.usuario_id = u.id
+        WHERE e.id = %s AND e.paciente_id = %s
+    """, (evo_id, id))
+    evo = cursor.fetchone()
+
+    if not evo:
+        cursor.close(); conn.close()
+        return jsonify({"error": "Evolución no encontrada"}), 404
+
+    archivos = archivos_por_evolucion(cursor, [evo_id])
+    evo['archivos'] = [{
+        'nombre': filename,
+        'url': f"/api/uploads/evoluciones/{evo_id}/{filename}"
+    } for filename in archivos.get(evo_id, [])]
+
+    cursor.close(); conn.close()
+    return jsonify(evo)
+
+
 @bp_pacientes.route('/api/uploads/evoluciones/<int:evo_id>/<filename>')
 @login_required
 def uploaded_file(evo_id, filename):
@@ -361,24 +610,36 @@ def uploaded_file(evo_id, filename):
 # ==========================================================
 # 📄 Exportar Historia Clínica en PDF (versión institucional)
 # ==========================================================
-@bp_pacientes.route('/api/pacientes/<int:id>/historia/pdf', methods=['GET'])
-@login_required
-def exportar_historia_pdf(id):
-    """Genera un PDF con toda la historia clínica del paciente, incluyendo adjuntos (imágenes y enlaces)."""
-    from flask import current_app
-    from PIL import Image as PILImage
-
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+def _clave_historia_pdf(cursor, paciente, base_url):
+    """
+    Clave de cache del PDF: hash consolidado de la historia + conteos (por si
+    la historia no llegó a actualizarse tras la última evolución) + encabezado.
+    """
+    id = paciente['id']
+    cursor.execute("""
+        SELECT
+            (SELECT hash_local FROM historias WHERE paciente_id = %s) AS hash_local,
+            COUNT(*) AS evoluciones,
+            COALESCE(MAX(e.id), 0) AS ultima_evolucion,
+            (SELECT COUNT(*)
+             FROM evolucion_archivos a
+             JOIN evoluciones ea ON ea.id = a.evolucion_id
+             WHERE ea.paciente_id = %s) AS archivos
+        FROM evoluciones e
+        WHERE e.paciente_id = %s
+    """, (id, id, id))
+    version = cursor.fetchone()
+
+    return cache_pdf.clave_cache(
+        "historia", id, version['hash_local'], version['evoluciones'],
+        version['ultima_evolucion'], version['archivos'], PLANTILLA_VERSION, base_url,
+        *(paciente.get(c) for c in ('apellido', 'nombre', 'dni', 'cobertura',
+                                    'nro_hc', 'fecha_nacimiento', 'sexo'))
+    )
 
-    # Paciente
-    cursor.execute("SELECT * FROM pacientes WHERE id = %s", (id,))
-    paciente = cursor.fetchone()
-    if not paciente:
-        cursor.close(); conn.close()
-        return jsonify({'error': 'Paciente no encontrado'}), 404
 
-    # Evoluciones
+def _datos_historia_pdf(cursor, id):
+    """Evoluciones (con médico) y adjuntos que van en el PDF de la historia."""
     cursor.execute("""
         SELECT 
             e.id,
@@ -396,215 +657,143 @@ def exportar_historia_pdf(id):
         WHERE e.paciente_id = %s
         ORDER BY e.fecha DESC
     """, (id,))
-
     evoluciones = cursor.fetchall()
+    return evoluciones, archivos_por_evolucion(cursor, [evo["id"] for evo in evoluciones])
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=2*cm,
-        rightMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm
-    )
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name="Right", alignment=TA_RIGHT, fontSize=9, textColor="#666666"))
 
-    style_box = TableStyle([
-        ('BOX', (0,0), (-1,-1), 0.6, colors.lightgrey),
-        ('INNERGRID', (0,0), (-1,-1), 0.3, colors.lightgrey),
-        ('BACKGROUND', (0,0), (-1,-1), colors.whitesmoke),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('RIGHTPADDING', (0,0), (-1,-1), 6),
-        ('TOPPADDING', (0,0), (-1,-1), 4),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-    ])
-
-    elements = []
-    # -------------------------------------------------------
-    # 🔹 ENCABEZADO con logo y título
-    # -------------------------------------------------------
-    logo_path = os.path.join(current_app.root_path, "static", "img", "logo_cau_unsam2.png")
-
-    if os.path.exists(logo_path):
-        # 🔸 Logo apenas más grande
-        logo = Image(logo_path, width=5*cm, height=2*cm)
-    else:
-        logo = Paragraph("<b>CAU UNSAM</b>", styles["Normal"])
-
-    titulo = Paragraph("<b>Centro Asistencial Universitario </b>", styles["Title"])
-
-    # Tabla de dos columnas: título (izquierda) y logo (derecha)
-    encabezado = Table([[titulo, logo]], colWidths=[11*cm, 5*cm])
-    encabezado.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    elements.append(encabezado)
-    elements.append(Spacer(1, 0.1*cm))
+def _opciones_historia_pdf(base_url):
+    return {
+        "logo_path": os.path.join(current_app.root_path, "static", "img", "logo_cau_unsam2.png"),
+        "base_url": base_url,
+        "uploads_dir": os.path.join(os.getcwd(), "uploads", "evoluciones"),
+    }
 
-    # -------------------------------------------------------
-    # 🔹 TÍTULO PRINCIPAL Y DATOS DEL PACIENTE
-    # -------------------------------------------------------
-    elements.append(Paragraph("<b>Historia Clínica</b>", styles["Heading1"]))
-    elements.append(Spacer(1, 0.3*cm))
 
-    datos_paciente = f"""
-        <b>Paciente:</b> {paciente['apellido'].upper()} {paciente['nombre'].upper()}<br/>
-        <b>DNI:</b> {paciente['dni']}<br/>
-        <b>Cobertura:</b> {paciente.get('cobertura', '-')}<br/>
-        <b>N° HC:</b> {paciente['nro_hc']}<br/>
-        <b>Fecha de nacimiento:</b> {paciente.get('fecha_nacimiento', '-') or '-'}<br/>
-        <b>Sexo:</b> {paciente.get('sexo', '-') or '-'}
+@bp_pacientes.route('/api/pacientes/<int:id>/historia/pdf', methods=['GET'])
+@login_required
+def exportar_historia_pdf(id):
     """
-    elements.append(Paragraph(datos_paciente, styles["Normal"]))
-    elements.append(Spacer(1, 0.5*cm))
-    elements.append(Paragraph("<b>Evoluciones:</b>", styles["Heading2"]))
-    elements.append(Spacer(1, 0.3*cm))
-
-    # -------------------------------------------------------
-    # 🔹 EVOLUCIONES CON ARCHIVOS ADJUNTOS
-    # -------------------------------------------------------
-    if not evoluciones:
-        elements.append(Paragraph("No hay evoluciones registradas.", styles["Normal"]))
-    else:
-        for evo in evoluciones:
-            fecha_str = evo["fecha"].strftime("%d/%m/%Y") if hasattr(evo["fecha"], "strftime") else str(evo["fecha"])
-            medico = evo["medico"]
-            especialidad = "Director" if evo["especialidad"] == "director" else evo["especialidad"].capitalize()
-
-            fecha_registro = evo["creado_en"].strftime("%d/%m/%Y %H:%M")
-
-            fila_superior = Table([
-                [
-                    Paragraph(f"<b>Fecha:</b> {fecha_str}", styles["Normal"]),
-                    Paragraph(f"<font size='9' color='gray'>Registrado: {fecha_registro}</font>", styles["Right"])
-                ]
-            ], colWidths=[8*cm, 8*cm])
+    PDF con toda la historia clínica del paciente, incluyendo adjuntos.
+    Se cachea en disco por (paciente, hash_local de la historia, versión de
+    plantilla, encabezado): si nada cambió se sirve el archivo ya generado.
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
 
-            fila_superior.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ]))
+    # Paciente
+    cursor.execute("SELECT * FROM pacientes WHERE id = %s", (id,))
+    paciente = cursor.fetchone()
+    if not paciente:
+        cursor.close(); conn.close()
+        return jsonify({'error': 'Paciente no encontrado'}), 404
 
-            fila_medico = Paragraph(f"<b>Médico:</b> {medico} ({especialidad})", styles["Normal"])
+    base_url = request.host_url.rstrip('/')
+    clave = _clave_historia_pdf(cursor, paciente, base_url)
 
-            fila_contenido = Paragraph(evo["contenido"].replace("\n", "<br/>"), styles["Normal"])
+    ruta = cache_pdf.leer(clave)
+    estado_cache = "HIT"
+    if ruta is None:
+        estado_cache = "MISS"
+        evoluciones, archivos_evoluciones = _datos_historia_pdf(cursor, id)
+        contenido = generar_pdf_historia(
+            paciente, evoluciones, archivos_evoluciones, **_opciones_historia_pdf(base_url)
+        )
+        ruta = cache_pdf.guardar(clave, contenido)
 
-            if evo.get("indicaciones"):
-                fila_indicaciones = Paragraph(f"<b>Indicaciones:</b> {evo['indicaciones'].replace('\n','<br/>')}", styles["Normal"])
-            else:
-                fila_indicaciones = Paragraph("", styles["Normal"])
+    cursor.close(); conn.close()
 
-            # --- ARMADO DEL BLOQUE FINAL ---
-            filas = [
-                [fila_superior],
-                [fila_medico],
-                [fila_contenido], 
-            ]
+    respuesta = send_file(
+        ruta,
+        as_attachment=True,
+        download_name=f"historia_paciente_{id}.pdf",
+        mimetype="application/pdf"
+    )
+    respuesta.headers["X-PDF-Cache"] = estado_cache
+    return respuesta
 
-            if evo.get("indicaciones"):
-                filas.append([fila_indicaciones])
 
-            bloque = Table(filas, colWidths=[16.5*cm])
-            bloque.setStyle(style_box)
+# ==========================================================
+# ⚙️ Exportación asíncrona (pool de procesos)
+# ==========================================================
+def _respuesta_trabajo(trabajo):
+    datos = {
+        'trabajo_id': trabajo['id'],
+        'estado': trabajo['estado'],
+        'url_estado': f"/api/pacientes/{trabajo['paciente_id']}/historia/pdf/trabajos/{trabajo['id']}",
+    }
+    if trabajo['estado'] == trabajos_pdf.LISTO:
+        datos['url_descarga'] = datos['url_estado'] + "/descargar"
+    if trabajo.get('error'):
+        datos['error'] = trabajo['error']
+    return datos
 
-            elements.append(bloque)
-            elements.append(Spacer(1, 0.4*cm))
-            elements.append(Spacer(1, 0.1*cm))
 
-            # 🔸 Buscar archivos adjuntos
-            cursor.execute("""
-                SELECT filename
-                FROM evolucion_archivos
-                WHERE evolucion_id = %s
-            """, (evo["id"],))
-            archivos = cursor.fetchall()
-
-            if archivos:
-                elements.append(Paragraph("<b>Archivos adjuntos:</b>", styles["Heading3"]))
-                for a in archivos:
-                    filename = a["filename"]
-                    ext = filename.lower().split(".")[-1]
-                    file_path = os.path.join(os.getcwd(), "uploads", "evoluciones", str(evo["id"]), filename)
-
-                    if os.path.exists(file_path):
-                        if ext in ["jpg", "jpeg", "png"]:
-                            try:
-                                with PILImage.open(file_path) as im:
-                                    width, height = im.size
-                                    aspect = height / float(width)
-                                    new_width = 12 * cm
-                                    new_height = new_width * aspect
-                                    img = Image(file_path, width=new_width, height=new_height)
-                                    img.hAlign = 'CENTER'
-                                    elements.append(img)
-                                    elements.append(Spacer(1, 0.3*cm))
-                            except Exception as e:
-                                elements.append(Paragraph(f"⚠️ No se pudo mostrar {filename}", styles["Normal"]))
-                        else:
-                            base_url = request.host_url.rstrip('/')
-                            url = f"{base_url}/api/uploads/evoluciones/{evo['id']}/{filename}"
-
-                            elements.append(Paragraph(
-                                f"• <b>{filename}</b> — "
-                                f"<a href='{url}' color='blue'>Haga clic aquí para descargar</a>",
-                                styles['Normal']
-                            ))
-
-                            elements.append(Spacer(1, 0.5*cm))
-
-                        # Salto de página cada 4 evoluciones aprox.
-                        if evoluciones.index(evo) % 4 == 3:
-                            elements.append(PageBreak())
-
-    # -------------------------------------------------------
-    # 🔹 PIE DE PÁGINA
-    # -------------------------------------------------------
-    def footer(canvas, doc):
-        canvas.saveState()
-        canvas.setFont("Helvetica", 8)
-        canvas.setFillColorRGB(0.4, 0.4, 0.4)
+def _trabajo_del_usuario(id, trabajo_id):
+    trabajo = trabajos_pdf.leer_estado(trabajo_id)
+    if not trabajo or trabajo['paciente_id'] != id or trabajo['usuario_id'] != current_user.id:
+        return None
+    return trabajo
 
-        # Texto institucional
-        texto = "Documento emitido por el Sistema de Historia Clínica – Centro Asistencial Universitario UNSAM"
-        canvas.drawString(2 * cm, 1.4 * cm, texto)
 
-        # Fecha y hora de emisión
-        fecha_hora = datetime.now().strftime("%d/%m/%Y - %H:%M")
-        canvas.drawRightString(19 * cm, 1.4 * cm, f"Emitido: {fecha_hora}")
+@bp_pacientes.route('/api/pacientes/<int:id>/historia/pdf/trabajos', methods=['POST'])
+@login_required
+def encolar_historia_pdf(id):
+    """Encola el render del PDF de la historia y devuelve el trabajo para hacer polling."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM pacientes WHERE id = %s", (id,))
+        paciente = cursor.fetchone()
+        if not paciente:
+            return jsonify({'error': 'Paciente no encontrado'}), 404
+
+        base_url = request.host_url.rstrip('/')
+        clave = _clave_historia_pdf(cursor, paciente, base_url)
+        trabajo = trabajos_pdf.crear_trabajo(
+            current_user.id, id, clave, f"historia_paciente_{id}.pdf"
+        )
 
-        # Número de página
-        numero_pagina = canvas.getPageNumber()
-        canvas.drawRightString(19 * cm, 1.0 * cm, f"Página {numero_pagina}")
+        if trabajo['estado'] != trabajos_pdf.LISTO:
+            evoluciones, archivos_evoluciones = _datos_historia_pdf(cursor, id)
+            trabajos_pdf.encolar(
+                trabajo, paciente, evoluciones, archivos_evoluciones, **_opciones_historia_pdf(base_url)
+            )
+        return jsonify(_respuesta_trabajo(trabajo)), 202
+    except Exception as e:
+        print("⚠️ Error encolando PDF de historia:", e)
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close(); conn.close()
 
-        canvas.restoreState()
 
-    # -------------------------------------------------------
-    # 🔹 Páginas con marca de agua + footer
-    # -------------------------------------------------------
-    def first_page(canvas, doc):
-        dibujar_marca_agua(canvas, doc)
-        footer(canvas, doc)
+@bp_pacientes.route('/api/pacientes/<int:id>/historia/pdf/trabajos/<trabajo_id>', methods=['GET'])
+@login_required
+def estado_historia_pdf(id, trabajo_id):
+    """Estado del trabajo: pendiente, procesando, listo o error."""
+    trabajo = _trabajo_del_usuario(id, trabajo_id)
+    if not trabajo:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(_respuesta_trabajo(trabajo))
 
-    def later_pages(canvas, doc):
-        dibujar_marca_agua(canvas, doc)
-        footer(canvas, doc)
 
-    # -------------------------------------------------------
-    # 🔹 CONSTRUCCIÓN FINAL
-    # -------------------------------------------------------
-    doc.build(elements, onFirstPage=first_page, onLaterPages=later_pages )
-    buffer.seek(0)
-    cursor.close(); conn.close()
+@bp_pacientes.route('/api/pacientes/<int:id>/historia/pdf/trabajos/<trabajo_id>/descargar', methods=['GET'])
+@login_required
+def descargar_historia_pdf(id, trabajo_id):
+    trabajo = _trabajo_del_usuario(id, trabajo_id)
+    if not trabajo:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if trabajo['estado'] != trabajos_pdf.LISTO:
+        return jsonify(_respuesta_trabajo(trabajo)), 409
+
+    ruta = cache_pdf.leer(trabajo['clave'])
+    if ruta is None:
+        # El cache lo descartó entre medio: hay que volver a pedirlo
+        return jsonify({'error': 'El PDF ya no está disponible, volvé a generarlo'}), 410
 
     return send_file(
-        buffer,
+        ruta,
         as_attachment=True,
-        download_name=f"historia_paciente_{id}.pdf",
+        download_name=trabajo['nombre_archivo'],
         mimetype="application/pdf"
     )
 
@@ -618,7 +807,6 @@ def exportar_evolucion_pdf(paciente_id, evo_id):
     """Genera un PDF institucional con una sola evolución clínica."""
 
     from flask import current_app
-    from PIL import Image as PILImage
 
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
@@ -752,21 +940,19 @@ def exportar_evolucion_pdf(paciente_id, evo_id):
         for a in archivos:
             nombre = a["filename"]
             file_path = os.path.join("uploads", "evoluciones", str(evo_id), nombre)
-            ext = nombre.lower().split(".")[-1]
 
-            # IMÁGENES
-            if ext in ["jpg", "jpeg", "png"]:
+            # IMÁGENES (versión reducida para PDF)
+            if es_imagen(nombre):
                 try:
-                    with PILImage.open(file_path) as im:
-                        w, h = im.size
-                        aspect = h / w
-                        new_width = 12 * cm
-                        new_height = new_width * aspect
-
-                        img = Image(file_path, width=new_width, height=new_height)
-                        img.hAlign = "CENTER"
-                        elements.append(img)
-                        elements.append(Spacer(1, 0.3*cm))
+                    ruta, w, h = imagen_para_pdf(file_path)
+                    aspect = h / w
+                    new_width = 12 * cm
+                    new_height = new_width * aspect
+
+                    img = Image(ruta, width=new_width, height=new_height)
+                    img.hAlign = "CENTER"
+                    elements.append(img)
+                    elements.append(Spacer(1, 0.3*cm))
                 except:
                     elements.append(Paragraph(f"⚠️ No se pudo mostrar {nombre}", styles["Normal"]))
             else:
@@ -799,26 +985,3 @@ def exportar_evolucion_pdf(paciente_id, evo_id):
         download_name=f"evolucion_{evo_id}.pdf",
         mimetype="application/pdf"
     )
-
-
-def dibujar_marca_agua(canvas, doc):
-    """
-    Dibuja una marca de agua diagonal suave en cada página.
-    """
-    canvas.saveState()
-
-    canvas.setFont("Helvetica-Bold", 50)
-    canvas.setFillColor(Color(0.6, 0.6, 0.6, alpha=0.12))  # gris suave transparente
-
-    # Mover al centro de página
-    width, height = A4
-    canvas.translate(width / 2, height / 2)
-
-    # Rotar texto 45 grados
-    canvas.rotate(35)
-
-    # Dibujar texto centrado
-    texto = "DOCUMENTO CONFIDENCIAL – CAU UNSAM"
-    canvas.drawCentredString(0, 0, texto)
-
-    canvas.restoreState()
\ No newline at end of file
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from datetime import datetime, timedelta, timezone
 from app.database import get_connection
 from app.utils.permisos import requiere_rol
+from app.utils.disponibilidad import AgendaProfesional, a_datetime, planificar_tanda
+from app.utils import contadores
 from app import mail
 from flask_mail import Message
 
@@ -11,69 +13,91 @@ bp_turnos = Blueprint("turnos", __name__)
 # Timezone Argentina FIX
 TZ_ARG = timezone(timedelta(hours=-3))
 
+# Tandas: tope de sesiones y de días hacia adelante en que se buscan lugares
+TANDA_MAX_TURNOS = 100
+TANDA_HORIZONTE_DIAS = 180
+TANDA_HORIZONTE_MAX_DIAS = 365
+
 # ==========================================================
 #  Función auxiliar: Verificar disponibilidad del médico
 # ==========================================================
-def medico_disponible(usuario_id, fecha_inicio, fecha_fin):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+def medico_disponible(cursor, usuario_id, fecha_inicio, fecha_fin):
+    """
+    True si el profesional atiende en ese horario, no está ausente y (salvo
+    las áreas, que admiten superposición) no tiene otro turno.
+    Bloquea la fila del profesional (FOR UPDATE, igual que la tanda): usar
+    el cursor de la transacción que inserta el turno, así dos reservas
+    simultáneas no toman el mismo horario.
+    Para muchos horarios del mismo profesional usar AgendaProfesional directamente.
+    """
+    cursor.execute("SELECT id FROM usuarios WHERE id=%s FOR UPDATE", (usuario_id,))
+    if not cursor.fetchone():
+        return False
+    agenda = AgendaProfesional.cargar(cursor, usuario_id, fecha_inicio, fecha_fin)
+    return agenda is not None and agenda.disponible(fecha_inicio, fecha_fin)
 
-    # 1. Primero averiguamos qué ROL tiene este usuario
-    cursor.execute("SELECT rol FROM usuarios WHERE id = %s", (usuario_id,))
-    user_data = cursor.fetchone()
-    es_area = user_data and user_data['rol'] == 'area'
+# ==========================================================
+#  Ventana del calendario (?start=&end= de FullCalendar)
+# ==========================================================
+# Los turnos duran minutos: con este margen la cota inferior sobre
+# fecha_inicio sigue acotando el recorrido del índice sin perder los turnos
+# que empezaron antes de la ventana y terminan dentro de ella
+CALENDARIO_MARGEN = timedelta(days=1)
+
+
+def filtro_calendario(start=None, end=None):
+    """
+    (filtro SQL sobre t, params) para los turnos que se superponen con
+    [start, end): t.fecha_inicio < end AND t.fecha_fin > start. Cualquiera
+    de los dos extremos puede faltar.
+    """
+    condiciones, params = [], []
+    if start is not None:
+        condiciones += ["t.fecha_fin > %s", "t.fecha_inicio >= %s"]
+        params += [start, start - CALENDARIO_MARGEN]
+    if end is not None:
+        condiciones.append("t.fecha_inicio < %s")
+        params.append(end)
+    return "".join(f" AND {c}" for c in condiciones), params
+
+
+# Calendario de /api/turnos; {rango} es el filtro de filtro_calendario.
+# app.migrar --explain verifica estas mismas consultas contra los índices.
+SQL_CALENDARIO_PROFESIONAL = """
+    SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
+           p.nombre, p.dni, u.nombre AS profesional
+    FROM turnos t
+    JOIN pacientes p ON t.paciente_id = p.id
+    JOIN usuarios u ON t.usuario_id = u.id
+    WHERE t.usuario_id = %s{rango}
+    ORDER BY t.fecha_inicio ASC
+"""
 
-    inicio = datetime.fromisoformat(fecha_inicio)
-    fin = datetime.fromisoformat(fecha_fin)
+SQL_CALENDARIO_GENERAL = """
+    SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
+           p.nombre, p.dni, u.nombre AS profesional
+    FROM turnos t
+    JOIN pacientes p ON t.paciente_id = p.id
+    JOIN usuarios u ON t.usuario_id = u.id
+    WHERE 1 = 1{rango}
+    ORDER BY t.fecha_inicio ASC
+"""
 
-    hora_ini = inicio.strftime("%H:%M:%S")
-    hora_fin = fin.strftime("%H:%M:%S")
+SQL_GRUPOS_DEL_PROFESIONAL = "SELECT grupo_id FROM grupo_miembros WHERE usuario_id = %s"
 
-    # ... (lógica de dias de semana igual que antes) ...
-    dia_semana = inicio.strftime("%A")
-    dias = { "Monday": "Lunes", "Tuesday": "Martes", "Wednesday": "Miércoles", "Thursday": "Jueves", "Friday": "Viernes", "Saturday": "Sábado", "Sunday": "Domingo" }
-    dia_es = dias.get(dia_semana, "Lunes")
 
-    # 2. Chequeamos si TRABAJA ese día (Disponibilidad) - ESTO SIEMPRE SE CHEQUEA
-    cursor.execute("""
-        SELECT 1 FROM disponibilidades
-        WHERE usuario_id = %s
-        AND dia_semana = %s
-        AND %s >= hora_inicio
-        AND %s <= hora_fin
-        AND activo = 1
-    """, (usuario_id, dia_es, hora_ini, hora_fin))
-    disponible = cursor.fetchone()
-
-    # 3. Chequeamos AUSENCIAS (Vacaciones) - ESTO SIEMPRE SE CHEQUEA
-    cursor.execute("""
-        SELECT 1 FROM ausencias
-        WHERE usuario_id = %s
-        AND (%s BETWEEN fecha_inicio AND fecha_fin
-        OR  %s BETWEEN fecha_inicio AND fecha_fin)
-    """, (usuario_id, fecha_inicio, fecha_fin))
-    ausente = cursor.fetchone()
-
-    # 4. Chequeamos SOLAPAMIENTO (Ocupado)
-    # SI ES AREA -> NO CHEQUEAMOS ESTO (puede tener infinitos turnos)
-    ocupado = None
-    if not es_area:
-        cursor.execute("""
-           SELECT 1 FROM turnos
-            WHERE usuario_id = %s
-            AND (
-                (fecha_inicio < %s AND fecha_fin > %s)
-                OR
-                (fecha_inicio < %s AND fecha_fin > %s)
-            )
-        """, (usuario_id, fecha_fin, fecha_inicio, fecha_inicio, fecha_fin))
-        ocupado = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
+def _rango_calendario():
+    """
+    Filtro de filtro_calendario para ?start=&end= de la request. Sin
+    start/end el filtro queda vacío (historial completo, compatibilidad).
+    Lanza ValueError si las fechas no son válidas.
+    """
+    start, end = request.args.get("start"), request.args.get("end")
+    return filtro_calendario(
+        a_datetime(start) if start else None,
+        a_datetime(end) if end else None,
+    )
 
-    # Si es area, 'ocupado' siempre es None (False), así que permite solapamiento
-    return bool(disponible) and not ausente and not ocupado
 
 # ==========================================================
 #  Rutas de Turnos
@@ -86,26 +110,18 @@ def api_turnos():
     cursor = conn.cursor(dictionary=True)
 
     if request.method == 'GET':
-        
+        try:
+            rango, rango_params = _rango_calendario()
+        except ValueError:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Rango de fechas inválido"}), 400
+
         if current_user.rol in ['profesional', 'area']:
-            cursor.execute("""
-                SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
-                       p.nombre, p.dni, u.nombre AS profesional
-                FROM turnos t
-                JOIN pacientes p ON t.paciente_id = p.id
-                JOIN usuarios u ON t.usuario_id = u.id
-                WHERE t.usuario_id = %s
-                ORDER BY t.fecha_inicio ASC
-            """, (current_user.id,))
+            cursor.execute(SQL_CALENDARIO_PROFESIONAL.format(rango=rango),
+                           [current_user.id] + rango_params)
         else:
-            cursor.execute("""
-                SELECT t.id, t.fecha_inicio, t.fecha_fin, t.motivo,
-                       p.nombre, p.dni, u.nombre AS profesional
-                FROM turnos t
-                JOIN pacientes p ON t.paciente_id = p.id
-                JOIN usuarios u ON t.usuario_id = u.id
-                ORDER BY t.fecha_inicio ASC
-            """)
+            cursor.execute(SQL_CALENDARIO_GENERAL.format(rango=rango), rango_params)
 
         turnos = cursor.fetchall()
         cursor.close()
@@ -138,17 +154,25 @@ def api_turnos():
         if not (paciente_id and usuario_id and fecha_inicio and fecha_fin):
             return jsonify({"error": "Campos obligatorios faltantes"}), 400
 
+        # La agenda se indexa por el id entero de la base: "5" tiene que ser 5
+        try:
+            usuario_id = int(usuario_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "usuario_id inválido"}), 400
+
         if current_user.rol == 'profesional' and usuario_id != current_user.id:
             return jsonify({"error": "No puede asignar turnos a otros profesionales"}), 403
         
         try:
-            if not medico_disponible(usuario_id, fecha_inicio, fecha_fin):
+            if not medico_disponible(cursor, usuario_id, fecha_inicio, fecha_fin):
+                conn.rollback()
                 return jsonify({"error": "El profesional no está disponible en esa fecha u horario"}), 400
 
             cursor.execute("""
                 INSERT INTO turnos (paciente_id, usuario_id, fecha_inicio, fecha_fin, motivo)
                 VALUES (%s, %s, %s, %s, %s)
             """, (paciente_id, usuario_id, fecha_inicio, fecha_fin, motivo))
+            contadores.sumar_turnos(cursor, [fecha_inicio])
             conn.commit()
 
             cursor.execute("SELECT email, nombre, apellido FROM pacientes WHERE id = %s", (paciente_id,))
@@ -202,6 +226,130 @@ Equipo CAU UNSAM
             cursor.close()
             conn.close()
 
+# ==========================================================
+#  Huecos libres (profesional y grupo)
+# ==========================================================
+HUECOS_MAX_DIAS = 62
+
+
+def _ventana_huecos():
+    """
+    Lee desde/hasta (fecha o fecha-hora ISO) de la query. Una fecha sola en
+    'hasta' incluye ese día. Nunca devuelve horarios pasados.
+    Devuelve (desde, hasta, duracion) o lanza ValueError.
+    """
+    ahora = datetime.now(TZ_ARG).replace(tzinfo=None, second=0, microsecond=0)
+    desde_txt = request.args.get("desde")
+    hasta_txt = request.args.get("hasta")
+
+    desde = a_datetime(desde_txt) if desde_txt else ahora
+    if hasta_txt:
+        hasta = a_datetime(hasta_txt)
+        if len(hasta_txt) == 10:
+            hasta += timedelta(days=1)
+    else:
+        hasta = desde + timedelta(days=7)
+    desde = max(desde, ahora)
+
+    if hasta <= desde:
+        raise ValueError("El rango de fechas es inválido")
+    if hasta - desde > timedelta(days=HUECOS_MAX_DIAS):
+        raise ValueError(f"El rango no puede superar {HUECOS_MAX_DIAS} días")
+
+    duracion = request.args.get("duracion", type=int)
+    if duracion is not None and not 5 <= duracion <= 480:
+        raise ValueError("La duración debe estar entre 5 y 480 minutos")
+    return desde, hasta, duracion
+
+
+def _huecos_json(agenda, desde, hasta, duracion):
+    return [
+        {
+            "start": i.replace(tzinfo=TZ_ARG).isoformat(),
+            "end": f.replace(tzinfo=TZ_ARG).isoformat(),
+        }
+        for i, f in agenda.huecos(desde, hasta, duracion)
+    ]
+
+
+@bp_turnos.route('/api/turnos/huecos', methods=['GET'])
+@login_required
+@requiere_rol('director', 'profesional', 'administrativo', 'area')
+def huecos_profesional():
+    """Horarios libres de un profesional en [desde, hasta) según su plantilla, ausencias y turnos."""
+    usuario_id = request.args.get("usuario_id", type=int)
+    if not usuario_id:
+        return jsonify({"error": "Falta usuario_id"}), 400
+    try:
+        desde, hasta, duracion = _ventana_huecos()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    agenda = AgendaProfesional.cargar(cursor, usuario_id, desde, hasta)
+    cursor.close()
+    conn.close()
+
+    if agenda is None:
+        return jsonify({"error": "Profesional no encontrado"}), 404
+
+    return jsonify({
+        "usuario_id": usuario_id,
+        "duracion": duracion or agenda.duracion_turno,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "huecos": _huecos_json(agenda, desde, hasta, duracion),
+    })
+
+
+@bp_turnos.route('/api/turnos/grupo/<int:grupo_id>/huecos', methods=['GET'])
+@login_required
+@requiere_rol('director', 'profesional', 'administrativo', 'area')
+def huecos_grupo(grupo_id):
+    """Horarios libres de cada miembro activo del grupo (las agendas se cargan juntas)."""
+    try:
+        desde, hasta, duracion = _ventana_huecos()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT id FROM grupos_profesionales WHERE id = %s", (grupo_id,))
+    if not cursor.fetchone():
+        cursor.close()
+        conn.close()
+        return jsonify({"error": "Grupo no encontrado"}), 404
+
+    cursor.execute("""
+        SELECT u.id, u.nombre, u.especialidad
+        FROM grupo_miembros gm
+        JOIN usuarios u ON u.id = gm.usuario_id
+        WHERE gm.grupo_id = %s AND u.activo = 1
+        ORDER BY u.nombre
+    """, (grupo_id,))
+    miembros = cursor.fetchall()
+    agendas = AgendaProfesional.cargar_varios(cursor, [m["id"] for m in miembros], desde, hasta)
+    cursor.close()
+    conn.close()
+
+    return jsonify({
+        "grupo_id": grupo_id,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "profesionales": [
+            {
+                "usuario_id": m["id"],
+                "nombre": m["nombre"],
+                "especialidad": m["especialidad"],
+                "duracion": duracion or agendas[m["id"]].duracion_turno,
+                "huecos": _huecos_json(agendas[m["id"]], desde, hasta, duracion),
+            }
+            for m in miembros if m["id"] in agendas
+        ],
+    })
+
+
 # ==========================================================
 #  Eliminar turno
 # ==========================================================
@@ -238,6 +386,7 @@ def eliminar_turno(id):
 
     # Proceder a eliminar
     cursor.execute("DELETE FROM turnos WHERE id=%s", (id,))
+    contadores.sumar_turnos(cursor, [turno["fecha_inicio"]], signo=-1)
     conn.commit()
 
     # Enviar mail si el paciente tiene email
@@ -292,7 +441,7 @@ def editar_turno(id):
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("SELECT usuario_id FROM turnos WHERE id=%s", (id,))
+    cursor.execute("SELECT usuario_id, fecha_inicio FROM turnos WHERE id=%s", (id,))
     turno = cursor.fetchone()
     if not turno:
         cursor.close()
@@ -333,6 +482,7 @@ def editar_turno(id):
         SET fecha_inicio=%s, fecha_fin=%s, motivo=%s
         WHERE id=%s
     """, (fecha_inicio, fecha_fin, motivo, id))
+    contadores.mover_turno(cursor, turno["fecha_inicio"], fecha_inicio)
 
     conn.commit()
     cursor.close()
@@ -348,72 +498,113 @@ def editar_turno(id):
 @login_required
 @requiere_rol('director', 'profesional', 'administrativo')
 def crear_turnos_tanda():
+    """
+    Planifica todas las sesiones en memoria contra la agenda del profesional
+    y las inserta con un solo executemany en una transacción.
+    Opcionales: horizonte_dias (búsqueda máxima) y permitir_parcial (crear
+    las que entren aunque no alcancen para `cantidad`).
+    """
+    data = request.get_json() or {}
+    paciente_id = data.get("paciente_id")
+    usuario_id = data.get("usuario_id")
+    motivo = data.get("motivo", "")
+    dias_semana = data.get("dias_semana", [])
+    permitir_parcial = bool(data.get("permitir_parcial", False))
+
     try:
-        data = request.get_json()
-        paciente_id = data.get("paciente_id")
-        usuario_id = data.get("usuario_id")
-        motivo = data.get("motivo", "")
-        fecha_inicial = datetime.fromisoformat(data.get("fecha"))
+        fecha_inicial = a_datetime(data.get("fecha"))
         cantidad = int(data.get("cantidad", 1))
-        dias_semana = data.get("dias_semana", [])
+        horizonte_dias = int(data.get("horizonte_dias", TANDA_HORIZONTE_DIAS))
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({"error": "Fecha, cantidad u horizonte inválidos"}), 400
 
-        if not (paciente_id and usuario_id and fecha_inicial and dias_semana):
-            return jsonify({"error": "Faltan datos requeridos"}), 400
+    if not (paciente_id and usuario_id and dias_semana):
+        return jsonify({"error": "Faltan datos requeridos"}), 400
 
-        if current_user.rol == 'profesional' and usuario_id != current_user.id:
-            return jsonify({"error": "No puede asignar turnos a otros profesionales"}), 403
+    try:
+        usuario_id = int(usuario_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "usuario_id inválido"}), 400
+
+    if not 1 <= cantidad <= TANDA_MAX_TURNOS:
+        return jsonify({"error": f"La cantidad debe estar entre 1 y {TANDA_MAX_TURNOS}"}), 400
+
+    if not 1 <= horizonte_dias <= TANDA_HORIZONTE_MAX_DIAS:
+        return jsonify({"error": f"El horizonte debe estar entre 1 y {TANDA_HORIZONTE_MAX_DIAS} días"}), 400
+
+    if current_user.rol == 'profesional' and usuario_id != current_user.id:
+        return jsonify({"error": "No puede asignar turnos a otros profesionales"}), 403
+
+    dias_map = {
+        "Lunes": 0,
+        "Martes": 1,
+        "Miércoles": 2,
+        "Jueves": 3,
+        "Viernes": 4,
+        "Sábado": 5,
+        "Domingo": 6
+    }
+    dias_indices = {dias_map[d] for d in dias_semana if d in dias_map}
+    if not dias_indices:
+        return jsonify({"error": "Días de la semana inválidos"}), 400
+
+    hasta = fecha_inicial + timedelta(days=horizonte_dias)
 
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT duracion_turno FROM usuarios WHERE id=%s", (usuario_id,))
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # Bloquea al profesional: dos tandas simultáneas no planifican sobre la misma agenda
+        cursor.execute("SELECT duracion_turno FROM usuarios WHERE id=%s FOR UPDATE", (usuario_id,))
         profesional = cursor.fetchone()
 
         if not profesional or not profesional["duracion_turno"]:
+            conn.rollback()
             return jsonify({"error": "El profesional no tiene duración de turno configurada"}), 400
 
-        dur = profesional["duracion_turno"]
-
-        dias_map = {
-            "Lunes": 0,
-            "Martes": 1,
-            "Miércoles": 2,
-            "Jueves": 3,
-            "Viernes": 4,
-            "Sábado": 5,
-            "Domingo": 6
+        agenda = AgendaProfesional.cargar(cursor, usuario_id, fecha_inicial, hasta)
+        sesiones, omitidas = planificar_tanda(
+            agenda, fecha_inicial, profesional["duracion_turno"], cantidad, dias_indices, hasta
+        )
+        reporte = {
+            "solicitados": cantidad,
+            "horizonte_hasta": hasta.date().isoformat(),
+            "omitidas": [{"fecha": f.isoformat(), "motivo": m} for f, m in omitidas],
+            "turnos": [
+                {"start": i.replace(tzinfo=TZ_ARG).isoformat(), "end": f.replace(tzinfo=TZ_ARG).isoformat()}
+                for i, f in sesiones
+            ],
         }
-        dias_indices = [dias_map[d] for d in dias_semana if d in dias_map]
-
-        turnos_creados = 0
-        fecha_actual = fecha_inicial
-
-        while turnos_creados < cantidad:
-            if fecha_actual.weekday() in dias_indices:
-
-                fecha_fin = fecha_actual + timedelta(minutes=dur)
-
-                if not medico_disponible(usuario_id, fecha_actual.isoformat(), fecha_fin.isoformat()):
-                    fecha_actual += timedelta(days=1)
-                    continue
-
-                cursor.execute("""
-                    INSERT INTO turnos (paciente_id, usuario_id, fecha_inicio, fecha_fin, motivo)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (paciente_id, usuario_id, fecha_actual, fecha_fin, motivo))
 
-                turnos_creados += 1
-
-            fecha_actual += timedelta(days=1)
+        if len(sesiones) < cantidad and not permitir_parcial:
+            conn.rollback()
+            reporte["creados"] = 0
+            reporte["error"] = (
+                f"Solo hay lugar para {len(sesiones)} de {cantidad} turnos "
+                f"antes del {hasta:%d/%m/%Y}; no se creó ninguno"
+            )
+            return jsonify(reporte), 409
 
+        if sesiones:
+            cursor.executemany("""
+                INSERT INTO turnos (paciente_id, usuario_id, fecha_inicio, fecha_fin, motivo)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [(paciente_id, usuario_id, i, f, motivo) for i, f in sesiones])
+            contadores.sumar_turnos(cursor, [i for i, _ in sesiones])
         conn.commit()
-        cursor.close()
-        conn.close()
-
-        return jsonify({"message": f"Se crearon {turnos_creados} turnos correctamente ✅"}), 201
 
     except Exception as e:
+        conn.rollback()
         print("Error al crear tanda de turnos:", e)
         return jsonify({"error": "Error al crear tanda de turnos"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    reporte["creados"] = len(sesiones)
+    reporte["message"] = f"Se crearon {len(sesiones)} turnos correctamente ✅"
+    if omitidas:
+        reporte["message"] += f" ({len(omitidas)} fechas omitidas por falta de disponibilidad)"
+    return jsonify(reporte), 201
 
 
 # ==========================================================
@@ -422,10 +613,15 @@ def crear_turnos_tanda():
 @bp_turnos.route("/api/turnos/profesional/<int:usuario_id>", methods=["GET"])
 @login_required
 def turnos_profesional(usuario_id):
+    try:
+        rango, rango_params = _rango_calendario()
+    except ValueError:
+        return jsonify({"error": "Rango de fechas inválido"}), 400
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             t.id,
             t.fecha_inicio,
@@ -438,12 +634,12 @@ def turnos_profesional(usuario_id):
         FROM turnos t
         JOIN pacientes p ON t.paciente_id = p.id
         JOIN usuarios u ON t.usuario_id = u.id
-        WHERE u.id = %s
-    """, (usuario_id,))
+        WHERE t.usuario_id = %s{rango}
+    """, [usuario_id] + rango_params)
 
     individuales = cursor.fetchall()
 
-    cursor.execute("SELECT grupo_id FROM grupo_miembros WHERE usuario_id = %s", (usuario_id,))
+    cursor.execute(SQL_GRUPOS_DEL_PROFESIONAL, (usuario_id,))
     grupos = [g["grupo_id"] for g in cursor.fetchall()]
 
     grupales = []
@@ -463,8 +659,8 @@ def turnos_profesional(usuario_id):
             JOIN usuarios u ON t.usuario_id = u.id
             JOIN grupo_miembros gm ON gm.usuario_id = u.id
             JOIN grupos_profesionales gp ON gp.id = gm.grupo_id
-            WHERE gm.grupo_id IN ({','.join(['%s'] * len(grupos))})
-        """, grupos)
+            WHERE gm.grupo_id IN ({','.join(['%s'] * len(grupos))}){rango}
+        """, grupos + rango_params)
 
         grupales = cursor.fetchall()
 
@@ -494,6 +690,11 @@ def turnos_profesional(usuario_id):
 @bp_turnos.route("/api/turnos/profesional/completo", methods=["GET"])
 @login_required
 def turnos_profesional_completo():
+    try:
+        rango, rango_params = _rango_calendario()
+    except ValueError:
+        return jsonify({"error": "Rango de fechas inválido"}), 400
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
@@ -501,7 +702,7 @@ def turnos_profesional_completo():
 
     #  SI ES DIRECTOR → TRAE TODOS LOS TURNOS
     if es_director:
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT
                 t.id,
                 t.fecha_inicio AS start,
@@ -515,8 +716,9 @@ def turnos_profesional_completo():
             FROM turnos t
             JOIN pacientes p ON p.id = t.paciente_id
             JOIN usuarios u ON u.id = t.usuario_id
+            WHERE 1 = 1{rango}
             ORDER BY t.fecha_inicio ASC
-        """)
+        """, rango_params)
         turnos = cursor.fetchall()
         cursor.close()
         conn.close()
@@ -531,7 +733,7 @@ def turnos_profesional_completo():
     #  SI ES PROFESIONAL → SOLO SUS TURNOS (actúa igual)
     usuario_id = current_user.id
 
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT
             t.id,
             t.fecha_inicio AS start,
@@ -545,13 +747,11 @@ def turnos_profesional_completo():
         FROM turnos t
         JOIN pacientes p ON p.id = t.paciente_id
         JOIN usuarios u ON u.id = t.usuario_id
-        WHERE t.usuario_id = %s
-    """, (usuario_id,))
+        WHERE t.usuario_id = %s{rango}
+    """, [usuario_id] + rango_params)
     individuales = cursor.fetchall()
 
-    cursor.execute("""
-        SELECT grupo_id FROM grupo_miembros WHERE usuario_id = %s
-    """, (usuario_id,))
+    cursor.execute(SQL_GRUPOS_DEL_PROFESIONAL, (usuario_id,))
     grupos_ids = [g["grupo_id"] for g in cursor.fetchall()]
 
     grupales = []
@@ -572,8 +772,8 @@ def turnos_profesional_completo():
             JOIN usuarios u ON u.id = t.usuario_id
             JOIN grupo_miembros gm ON gm.usuario_id = u.id
             JOIN grupos_profesionales gp ON gp.id = gm.grupo_id
-            WHERE gm.grupo_id IN ({','.join(['%s'] * len(grupos_ids))})
-        """, tuple(grupos_ids))
+            WHERE gm.grupo_id IN ({','.join(['%s'] * len(grupos_ids))}){rango}
+        """, grupos_ids + rango_params)
         grupales = cursor.fetchall()
 
     cursor.close()
@@ -592,10 +792,15 @@ def turnos_profesional_completo():
 @bp_turnos.route('/api/turnos/grupo/<int:grupo_id>', methods=['GET'])
 @login_required
 def turnos_por_grupo(grupo_id):
+    try:
+        rango, rango_params = _rango_calendario()
+    except ValueError:
+        return jsonify({"error": "Rango de fechas inválido"}), 400
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             t.id,
             t.fecha_inicio AS start,
@@ -610,9 +815,9 @@ def turnos_por_grupo(grupo_id):
         JOIN pacientes p ON p.id = t.paciente_id
         JOIN usuarios u ON u.id = t.usuario_id
         JOIN grupos_profesionales gp ON gp.id = gm.grupo_id
-        WHERE gm.grupo_id = %s
+        WHERE gm.grupo_id = %s{rango}
         ORDER BY t.fecha_inicio ASC
-    """, (grupo_id,))
+    """, [grupo_id] + rango_params)
 
     turnos = cursor.fetchall()
     cursor.close()
@@ -4,6 +4,8 @@ from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
 from app.database import get_connection
 from app.utils.permisos import requiere_rol
+from app.auth import invalidar_usuario_cache
+from app.utils import contadores
 import os
 from PIL import Image
 import io
@@ -60,6 +62,7 @@ def api_crear_usuario():
         INSERT INTO usuarios (nombre, username, email, password_hash, rol, especialidad)
         VALUES (%s, %s, %s, %s, %s, %s)
     """, (nombre, username, email, password_hash, rol, especialidad))
+    contadores.sumar(cursor, "usuarios")
 
     conn.commit()
     cursor.close()
@@ -197,6 +200,7 @@ def api_usuarios_editar(usuario_id):
     cur.execute(q, tuple(params))
     conn.commit()
     cur.close(); conn.close()
+    invalidar_usuario_cache(usuario_id)
     return jsonify({"message": "Usuario actualizado ✅"})
 
 
@@ -220,6 +224,7 @@ def api_usuarios_eliminar(usuario_id):
     cur.execute("UPDATE usuarios SET activo=0 WHERE id=%s", (usuario_id,))
     conn.commit()
     cur.close(); conn.close()
+    invalidar_usuario_cache(usuario_id)
     return jsonify({"message": "Usuario marcado como inactivo ✅"})
 
 
@@ -237,6 +242,7 @@ def api_usuarios_activar(usuario_id):
     cur.execute("UPDATE usuarios SET activo=1 WHERE id=%s", (usuario_id,))
     conn.commit()
     cur.close(); conn.close()
+    invalidar_usuario_cache(usuario_id)
     return jsonify({"message": "Usuario reactivado ✅"})
 
 
@@ -297,6 +303,7 @@ def actualizar_duracion_turno(usuario_id):
     cursor.execute("UPDATE usuarios SET duracion_turno = %s WHERE id = %s", (nueva_duracion, usuario_id))
     conn.commit()
     cursor.close(); conn.close()
+    invalidar_usuario_cache(usuario_id)
     return jsonify({"message": "Duración actualizada correctamente"})
 
 
@@ -377,6 +384,7 @@ def actualizar_perfil():
                    (nuevo_nombre, nuevo_email, nueva_foto, current_user.id))
     conn.commit()
     conn.close()
+    invalidar_usuario_cache(current_user.id)
     return jsonify({"message": "Perfil actualizado correctamente.", "foto": nueva_foto})
 
 
@@ -390,21 +398,32 @@ def cambiar_password():
 
     if not actual or not nueva or not confirmar:
         return jsonify({"error": "Todos los campos son obligatorios"}), 400
-    if not check_password_hash(current_user.password_hash, actual):
+    # El usuario de sesión no trae el hash: se lee solo para esta verificación
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT password_hash FROM usuarios WHERE id=%s", (current_user.id,))
+    fila = cursor.fetchone()
+    cursor.close()
+
+    if not fila or not check_password_hash(fila["password_hash"], actual):
+        conn.close()
         return jsonify({"error": "Contraseña incorrecta"}), 400
     if not password_valida(nueva):
+        conn.close()
         return jsonify({"error": "La contraseña no es segura"}), 400
     if actual == nueva:
+        conn.close()
         return jsonify({"error": "La nueva contraseña debe ser diferente"}), 400
     if nueva != confirmar:
+        conn.close()
         return jsonify({"error": "Las contraseñas no coinciden"}), 400
 
     nuevo_hash = generate_password_hash(nueva, method="scrypt")
-    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("UPDATE usuarios SET password_hash=%s WHERE id=%s", (nuevo_hash, current_user.id))
     conn.commit()
     conn.close()
+    invalidar_usuario_cache(current_user.id)
     return jsonify({"message": "Contraseña actualizada correctamente"})
 
 
@@ -430,4 +449,5 @@ def borrar_foto():
     cursor.execute("UPDATE usuarios SET foto=NULL WHERE id=%s", (user_id,))
     conn.commit()
     conn.close()
+    invalidar_usuario_cache(user_id)
     return jsonify({"message": "Foto eliminada", "foto": None}), 200
\ No newline at end of file
@@ -0,0 +1,95 @@
+# app/tests/conftest.py
+import re
+import sqlite3
+import pytest
+
+# ==============================================================
+# 🧪 Fixtures comunes
+# ==============================================================
+# Las rutas se prueban contra SQLite en memoria: `get_pool` entrega una
+# conexión que habla el mismo dialecto que mysql.connector (placeholders
+# %s, cursor(dictionary=True)), así que ConexionRequest y el conteo de
+# consultas por request son los reales.
+
+
+class _CursorSqlite:
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    def _fila(self, fila):
+        if fila is None or not self._dictionary:
+            return fila
+        return dict(zip([c[0] for c in self._cursor.description], fila))
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(re.sub(r"%s", "?", sql), tuple(params))
+
+    def executemany(self, sql, filas):
+        self._cursor.executemany(re.sub(r"%s", "?", sql), [tuple(f) for f in filas])
+
+    def fetchone(self):
+        return self._fila(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._fila(f) for f in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionSqlite:
+    """Conexión de prueba con la interfaz que usan las rutas."""
+
+    def __init__(self, esquema=""):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.executescript(esquema)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _CursorSqlite(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        pass
+
+
+class _PoolSqlite:
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def obtener(self, **kwargs):
+        return self._conexion
+
+
+@pytest.fixture
+def flask_app(monkeypatch):
+    from app import app
+    from app.utils.indice_pacientes import indice_pacientes
+
+    # El índice en memoria se construye en un hilo aparte: no hace falta acá
+    monkeypatch.setattr(indice_pacientes, "refrescar_si_vencido", lambda: None)
+    monkeypatch.setitem(app.config, "TESTING", True)
+    monkeypatch.setitem(app.config, "LOGIN_DISABLED", True)
+    return app
+
+
+@pytest.fixture
+def base_sqlite(monkeypatch):
+    """Devuelve una función que arma la base con el esquema dado y la conecta a get_connection."""
+    import app.database as database
+
+    def preparar(esquema):
+        conexion = ConexionSqlite(esquema)
+        monkeypatch.setattr(database, "get_pool", lambda: _PoolSqlite(conexion))
+        return conexion
+
+    return preparar
@@ -0,0 +1,67 @@
+# app/tests/test_benchmark_dashboard.py
+import json
+import pytest
+from app.benchmarks import dashboard
+
+# Lógica del benchmark de regresión que no necesita MySQL: el criterio de
+# regresión, la validación de tamaños y la salida --json.
+
+
+def _medida(consulta, turnos, p50):
+    return {"turnos": turnos, "consulta": consulta, "p50_ms": p50, "p95_ms": p50}
+
+
+def test_regresiones_marca_solo_lo_que_supera_el_umbral():
+    resultados = [
+        _medida("plana", 10000, 2.0), _medida("plana", 1000000, 5.0),
+        _medida("lenta", 10000, 2.0), _medida("lenta", 1000000, 8.0),
+    ]
+
+    assert dashboard.regresiones(resultados, umbral=3.0) == [("lenta", 4.0)]
+
+
+def test_regresiones_compara_el_menor_con_el_mayor_sin_importar_el_orden():
+    resultados = [
+        _medida("lenta", 1000000, 10.0), _medida("lenta", 100000, 9.0), _medida("lenta", 10000, 1.0),
+    ]
+
+    assert dashboard.regresiones(resultados, umbral=3.0) == [("lenta", 10.0)]
+
+
+def test_regresiones_ignora_las_consultas_anteriores():
+    resultados = [_medida("[antes] turnos del día (total)", 10000, 1.0),
+                  _medida("[antes] turnos del día (total)", 1000000, 100.0)]
+
+    assert dashboard.regresiones(resultados, umbral=3.0) == []
+
+
+def test_regresiones_usa_medio_ms_como_piso_del_ruido():
+    # 0.1 → 1.2 ms sería 12x, pero contra el piso de 0.5 ms es 2.4x
+    resultados = [_medida("rápida", 10000, 0.1), _medida("rápida", 1000000, 1.2)]
+
+    assert dashboard.regresiones(resultados, umbral=3.0) == []
+
+
+def test_ejecutar_rechaza_un_tamanio_menor_a_la_semana(monkeypatch):
+    def sin_base():
+        raise AssertionError("no debería conectarse")
+    monkeypatch.setattr(dashboard, "conectar", sin_base)
+
+    with pytest.raises(ValueError, match="al menos 3200"):
+        dashboard.ejecutar(tamanios=(3199, 100000), por_dia=400)
+
+
+def test_main_json_deja_stdout_solo_para_el_json(monkeypatch, capsys):
+    resultados = [_medida("plana", 10000, 1.0), _medida("plana", 100000, 1.0)]
+
+    def ejecutar_falso(salida=None, **kwargs):
+        print("🧱 10000 turnos cargados", file=salida)
+        return resultados
+    monkeypatch.setattr(dashboard, "ejecutar", ejecutar_falso)
+
+    codigo = dashboard.main(["--json"])
+
+    salida = capsys.readouterr()
+    assert codigo == 0
+    assert json.loads(salida.out) == resultados
+    assert "turnos cargados" in salida.err and "estable" in salida.err
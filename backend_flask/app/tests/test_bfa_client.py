@@ -0,0 +1,97 @@
+# app/tests/test_bfa_client.py
+import pytest
+from app.utils import bfa_client
+
+# Lectura de transacciones en batch JSON-RPC contra una sesión HTTP falsa:
+# solo "result": null es "no encontrada"; los errores del nodo se reintentan.
+
+TX_A = "0x" + "a" * 64
+TX_B = "0x" + "b" * 64
+
+
+class _Respuesta:
+    def __init__(self, cuerpo):
+        self._cuerpo = cuerpo
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._cuerpo
+
+
+class _SesionFalsa:
+    """Cada POST responde con la siguiente función de `respuestas` aplicada a las llamadas."""
+
+    def __init__(self, *respuestas):
+        self._respuestas = list(respuestas)
+        self.pedidos = []
+
+    def post(self, url, json, timeout):
+        self.pedidos.append([c["params"][0] for c in json])
+        return _Respuesta(self._respuestas.pop(0)(json))
+
+
+def _tx(llamada):
+    return {"jsonrpc": "2.0", "id": llamada["id"],
+            "result": {"input": "0x" + "ff" * 32, "blockNumber": "0x10"}}
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    def usar(*respuestas):
+        falsa = _SesionFalsa(*respuestas)
+        monkeypatch.setattr(bfa_client, "get_web3", lambda: None)
+        monkeypatch.setattr(bfa_client, "_sesion", falsa)
+        monkeypatch.setattr(bfa_client.time, "sleep", lambda s: None)
+        return falsa
+    return usar
+
+
+def test_result_null_es_no_encontrada(sesion):
+    sesion(lambda llamadas: [
+        _tx(llamadas[0]),
+        {"jsonrpc": "2.0", "id": llamadas[1]["id"], "result": None},
+    ])
+
+    resultado = bfa_client.obtener_transacciones_lote([TX_A, TX_B])
+
+    assert resultado == {TX_A: {"input": "ff" * 32, "bloque": 16}}
+
+
+def test_entrada_con_error_se_reintenta_sola(sesion):
+    falsa = sesion(
+        lambda llamadas: [
+            _tx(llamadas[0]),
+            {"jsonrpc": "2.0", "id": llamadas[1]["id"], "error": {"code": -32005, "message": "rate limited"}},
+        ],
+        lambda llamadas: [_tx(c) for c in llamadas],
+    )
+
+    resultado = bfa_client.obtener_transacciones_lote([TX_A, TX_B])
+
+    assert set(resultado) == {TX_A, TX_B}
+    assert falsa.pedidos == [[TX_A, TX_B], [TX_B]]
+
+
+def test_error_persistente_no_pasa_por_no_encontrada(sesion):
+    def error(llamadas):
+        return [{"jsonrpc": "2.0", "id": c["id"], "error": {"code": -32000, "message": "busy"}} for c in llamadas]
+    sesion(*[error] * bfa_client.BFA_REINTENTOS_RPC)
+
+    with pytest.raises(RuntimeError, match="busy"):
+        bfa_client.obtener_transacciones_lote([TX_A])
+
+
+def test_entrada_faltante_cuenta_como_error(sesion):
+    sesion(*[lambda llamadas: []] * bfa_client.BFA_REINTENTOS_RPC)
+
+    with pytest.raises(RuntimeError, match="sin respuesta"):
+        bfa_client.obtener_transacciones_lote([TX_A])
+
+
+def test_id_que_no_se_pidio_es_un_error(sesion):
+    sesion(lambda llamadas: [{"jsonrpc": "2.0", "id": 99, "result": None}])
+
+    with pytest.raises(RuntimeError, match="id inesperado"):
+        bfa_client.obtener_transacciones_lote([TX_A])
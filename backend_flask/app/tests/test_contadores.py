@@ -0,0 +1,155 @@
+# app/tests/test_contadores.py
+from datetime import date, datetime
+from app.utils import contadores
+
+# Ajustes de los contadores del dashboard y su reconciliación nocturna,
+# contra una base falsa que entiende las consultas de app/utils/contadores.py.
+
+
+class _BaseFalsa:
+    def __init__(self, guardados=None, dias=None, tablas=None, turnos=None):
+        self.guardados = dict(guardados or {})     # contadores: nombre -> valor
+        self.dias = dict(dias or {})               # contadores_turnos_dia: dia -> total
+        self.tablas = dict(tablas or {})           # COUNT(*) real por tabla
+        self.turnos = dict(turnos or {})           # turnos reales por día
+        self.sentencias = []                       # (sql normalizado, params)
+        self.commits = 0
+
+    def cursor(self, dictionary=False):
+        return _CursorFalso(self)
+
+    def commit(self):
+        self.commits += 1
+        self.sentencias.append(("COMMIT", ()))
+
+    def rollback(self):
+        self.sentencias.append(("ROLLBACK", ()))
+
+
+class _CursorFalso:
+    def __init__(self, base):
+        self.base = base
+        self._filas = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.base.sentencias.append((sql, params))
+        b = self.base
+        if sql.startswith("SELECT nombre, valor FROM contadores"):
+            self._filas = [{"nombre": n, "valor": v} for n, v in b.guardados.items()]
+        elif sql.startswith("SELECT dia, total FROM contadores_turnos_dia"):
+            self._filas = [{"dia": d, "total": t} for d, t in b.dias.items()]
+        elif sql.startswith("SELECT valor FROM contadores WHERE"):
+            self._filas = [{"valor": b.guardados[params[0]]}] if params[0] in b.guardados else []
+        elif sql.startswith("SELECT total AS valor FROM contadores_turnos_dia WHERE"):
+            self._filas = [{"valor": b.dias[params[0]]}] if params[0] in b.dias else []
+        elif "GROUP BY DATE(fecha_inicio)" in sql:
+            self._filas = [{"dia": d, "total": t} for d, t in b.turnos.items()]
+        elif sql.startswith("SELECT COUNT(*) AS total FROM turnos WHERE"):
+            self._filas = [{"total": b.turnos.get(params[0], 0)}]
+        elif sql.startswith("SELECT COUNT(*) AS total FROM "):
+            self._filas = [{"total": b.tablas.get(sql.split()[-1], 0)}]
+        elif sql.startswith("INSERT INTO contadores ("):
+            b.guardados[params[0]] = params[1]
+        elif sql.startswith("INSERT INTO contadores_turnos_dia"):
+            b.dias[params[0]] = params[1]
+        else:
+            raise AssertionError(f"Consulta inesperada: {sql}")
+
+    def executemany(self, sql, filas):
+        self.base.sentencias.append((" ".join(sql.split()), list(filas)))
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return self._filas
+
+    def close(self):
+        pass
+
+
+def _ajustes_por_dia(base):
+    return [filas for sql, filas in base.sentencias if "contadores_turnos_dia" in sql]
+
+
+# ----------------------------------------------------------
+# sumar_turnos / mover_turno
+# ----------------------------------------------------------
+def test_sumar_turnos_agrupa_por_dia_con_string_o_datetime():
+    base = _BaseFalsa()
+    contadores.sumar_turnos(base.cursor(), [
+        "2024-03-04T09:00:00", datetime(2024, 3, 4, 15, 30), "2024-03-05T08:00:00-03:00",
+    ])
+
+    assert _ajustes_por_dia(base) == [[(date(2024, 3, 4), 2), (date(2024, 3, 5), 1)]]
+
+
+def test_sumar_turnos_resta_y_no_escribe_sin_fechas():
+    base = _BaseFalsa()
+    contadores.sumar_turnos(base.cursor(), [], signo=-1)
+    contadores.sumar_turnos(base.cursor(), ["2024-03-04T09:00:00"], signo=-1)
+
+    assert _ajustes_por_dia(base) == [[(date(2024, 3, 4), -1)]]
+
+
+def test_mover_turno_en_el_mismo_dia_no_toca_contadores():
+    base = _BaseFalsa()
+    contadores.mover_turno(base.cursor(), datetime(2024, 3, 4, 9), "2024-03-04T17:00:00")
+
+    assert base.sentencias == []
+
+
+def test_mover_turno_a_otro_dia_pasa_el_turno_de_dia():
+    base = _BaseFalsa()
+    contadores.mover_turno(base.cursor(), datetime(2024, 3, 4, 9), "2024-03-06T09:00:00")
+
+    assert _ajustes_por_dia(base) == [[(date(2024, 3, 4), -1)], [(date(2024, 3, 6), 1)]]
+
+
+# ----------------------------------------------------------
+# reconciliar
+# ----------------------------------------------------------
+def test_reconciliar_sin_desvios_no_bloquea_nada():
+    base = _BaseFalsa(
+        guardados={"pacientes": 10, "usuarios": 3, "evoluciones": 40},
+        dias={date(2024, 3, 4): 5},
+        tablas={"pacientes": 10, "usuarios": 3, "evoluciones": 40},
+        turnos={date(2024, 3, 4): 5},
+    )
+
+    assert contadores.reconciliar(base) == []
+    assert not any("FOR UPDATE" in sql for sql, _ in base.sentencias)
+
+
+def test_reconciliar_bloquea_y_corrige_solo_los_que_difieren():
+    base = _BaseFalsa(
+        guardados={"pacientes": 9, "usuarios": 3, "evoluciones": 40},
+        dias={date(2024, 3, 4): 5, date(2024, 3, 5): 2},
+        tablas={"pacientes": 10, "usuarios": 3, "evoluciones": 40},
+        turnos={date(2024, 3, 4): 5, date(2024, 3, 6): 1},
+    )
+
+    correcciones = contadores.reconciliar(base)
+
+    assert correcciones == [("2024-03-05", 2, 0), ("2024-03-06", 0, 1), ("pacientes", 9, 10)]
+    bloqueos = [params[0] for sql, params in base.sentencias if "FOR UPDATE" in sql]
+    assert sorted(map(str, bloqueos)) == ["2024-03-05", "2024-03-06", "pacientes"]
+    # Lectura sin bloqueos + una transacción por contador corregido
+    assert base.commits == 1 + len(bloqueos)
+    assert base.guardados["pacientes"] == 10
+    assert base.dias[date(2024, 3, 5)] == 0 and base.dias[date(2024, 3, 6)] == 1
+
+
+def test_reconciliar_vuelve_a_leer_el_contador_bloqueado():
+    # Después del conteo sin bloqueo, un alta concurrente ajustó el contador
+    base = _BaseFalsa(guardados={"pacientes": 9}, tablas={"pacientes": 10})
+    commit = base.commit
+
+    def commit_con_alta_concurrente():
+        commit()
+        base.guardados["pacientes"] = 10
+    base.commit = commit_con_alta_concurrente
+
+    assert contadores.reconciliar(base) == []
+    assert not any(sql.startswith("INSERT") for sql, _ in base.sentencias)
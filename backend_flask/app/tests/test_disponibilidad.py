@@ -0,0 +1,187 @@
+# app/tests/test_disponibilidad.py
+from datetime import datetime, timedelta
+from app.utils.disponibilidad import Intervalos, AgendaProfesional
+
+# Motor de disponibilidad en memoria: solapamientos, ausencias y bordes de
+# la plantilla semanal, con el mismo criterio que medico_disponible.
+
+LUNES = datetime(2024, 1, 1)        # 2024-01-01 fue lunes
+
+
+def _h(hora, minuto=0, dia=LUNES):
+    return dia.replace(hour=hora, minute=minuto)
+
+
+def _agenda(rol="profesional", duracion=30, plantilla=None):
+    plantilla = plantilla if plantilla is not None else {0: [(timedelta(hours=8), timedelta(hours=12))]}
+    return AgendaProfesional(1, rol, duracion, plantilla, LUNES, LUNES + timedelta(days=7))
+
+
+class _CursorFalso:
+    """Devuelve, en orden, las filas preparadas para cada execute."""
+
+    def __init__(self, respuestas):
+        self._respuestas = list(respuestas)
+        self._filas = []
+
+    def execute(self, sql, params=()):
+        self._filas = self._respuestas.pop(0)
+
+    def fetchall(self):
+        return self._filas
+
+
+# ----------------------------------------------------------
+# Intervalos
+# ----------------------------------------------------------
+def test_intervalos_solapa_abierto_no_cuenta_bordes():
+    intervalos = Intervalos([(_h(9), _h(10))])
+
+    assert intervalos.solapa(_h(9, 30), _h(9, 45))
+    assert intervalos.solapa(_h(8, 30), _h(9, 1))
+    assert not intervalos.solapa(_h(8), _h(9))
+    assert not intervalos.solapa(_h(10), _h(11))
+
+
+def test_intervalos_solapa_con_bordes_cuenta_el_contacto():
+    intervalos = Intervalos([(_h(9), _h(10))])
+
+    assert intervalos.solapa(_h(8), _h(9), bordes=True)
+    assert intervalos.solapa(_h(10), _h(11), bordes=True)
+    assert not intervalos.solapa(_h(10, 1), _h(11), bordes=True)
+
+
+def test_intervalos_intervalo_largo_tapa_a_los_siguientes():
+    # El máximo acumulado de fin detecta un intervalo largo que empezó antes
+    intervalos = Intervalos([(_h(8), _h(12)), (_h(8, 30), _h(8, 45))])
+
+    assert intervalos.solapa(_h(11), _h(11, 30))
+
+
+def test_intervalos_agregar_y_agregar_varios_mantienen_el_orden():
+    intervalos = Intervalos([(_h(11), _h(12))])
+    intervalos.agregar(_h(9), _h(10))
+    intervalos.agregar_varios([(_h(10), _h(10, 30)), (_h(8), _h(8, 30))])
+
+    assert [i for i, _ in intervalos] == [_h(8), _h(9), _h(10), _h(11)]
+    assert intervalos.solapa(_h(10, 15), _h(10, 20))
+    assert not intervalos.solapa(_h(10, 30), _h(11))
+
+
+# ----------------------------------------------------------
+# AgendaProfesional
+# ----------------------------------------------------------
+def test_agenda_guarda_la_ventana():
+    agenda = _agenda()
+
+    assert agenda.desde == LUNES
+    assert agenda.hasta == LUNES + timedelta(days=7)
+
+
+def test_plantilla_bordes_inclusivos():
+    agenda = _agenda()
+
+    assert agenda.disponible(_h(8), _h(8, 30))
+    assert agenda.disponible(_h(11, 30), _h(12))
+    assert agenda.motivo_no_disponible(_h(7, 45), _h(8, 15)) == "fuera_de_horario"
+    assert agenda.motivo_no_disponible(_h(11, 45), _h(12, 15)) == "fuera_de_horario"
+    # Martes sin franjas en la plantilla
+    martes = LUNES + timedelta(days=1)
+    assert agenda.motivo_no_disponible(_h(9, dia=martes), _h(9, 30, dia=martes)) == "fuera_de_horario"
+
+
+def test_ausencia_bloquea_incluso_tocando_el_borde():
+    agenda = _agenda()
+    agenda.ausencias.agregar(_h(10), _h(11))
+
+    assert agenda.motivo_no_disponible(_h(10, 15), _h(10, 45)) == "ausencia"
+    assert agenda.motivo_no_disponible(_h(9, 30), _h(10)) == "ausencia"
+    assert agenda.motivo_no_disponible(_h(11), _h(11, 30)) == "ausencia"
+    assert agenda.disponible(_h(9), _h(9, 30))
+
+
+def test_turno_superpuesto_ocupa_pero_el_contiguo_no():
+    agenda = _agenda()
+    agenda.reservar(_h(9), _h(9, 30))
+
+    assert agenda.motivo_no_disponible(_h(9, 15), _h(9, 45)) == "ocupado"
+    assert agenda.disponible(_h(9, 30), _h(10))
+    assert agenda.disponible(_h(8, 30), _h(9))
+
+
+def test_area_admite_turnos_superpuestos():
+    agenda = _agenda(rol="area")
+    agenda.reservar(_h(9), _h(9, 30))
+
+    assert agenda.disponible(_h(9), _h(9, 30))
+
+
+def test_cargar_varios_usa_la_ventana_pedida():
+    desde, hasta = LUNES, LUNES + timedelta(days=7)
+    cursor = _CursorFalso([
+        [{"id": 1, "rol": "profesional", "duracion_turno": 30}],
+        [{"usuario_id": 1, "dia_semana": "Lunes", "hora_inicio": timedelta(hours=8),
+          "hora_fin": timedelta(hours=12)}],
+        [{"usuario_id": 1, "fecha_inicio": _h(10), "fecha_fin": _h(11)}],
+        [{"usuario_id": 1, "fecha_inicio": _h(9), "fecha_fin": _h(9, 30)}],
+    ])
+
+    agenda = AgendaProfesional.cargar_varios(cursor, [1], desde, hasta)[1]
+
+    assert (agenda.desde, agenda.hasta) == (desde, hasta)
+    assert agenda.motivo_no_disponible(_h(10, 15), _h(10, 45)) == "ausencia"
+    assert agenda.motivo_no_disponible(_h(9), _h(9, 30)) == "ocupado"
+    assert agenda.disponible(_h(8), _h(8, 30))
+
+
+# ----------------------------------------------------------
+# Huecos
+# ----------------------------------------------------------
+def test_huecos_despues_de_una_ausencia_siguen_la_grilla():
+    agenda = _agenda()
+    agenda.ausencias.agregar(_h(10, 30), _h(11, 15))
+
+    inicios = [i for i, _ in agenda.huecos(_h(8), _h(12))]
+
+    # 10:00–10:30 toca el inicio de la ausencia; después sigue 11:30, no 11:16
+    assert inicios == [_h(8), _h(8, 30), _h(9), _h(9, 30), _h(11, 30)]
+
+
+def test_huecos_no_empiezan_donde_termina_una_ausencia():
+    # Las ausencias son cerradas: 11:00 no es reservable (ver disponible)
+    agenda = _agenda()
+    agenda.ausencias.agregar(_h(10), _h(11))
+
+    huecos = agenda.huecos(_h(8), _h(12))
+
+    assert [i for i, _ in huecos][-1] == _h(11, 30)
+    assert all(agenda.disponible(i, f) for i, f in huecos)
+
+
+def test_huecos_despues_de_un_turno_fuera_de_grilla():
+    agenda = _agenda()
+    agenda.reservar(_h(9), _h(9, 45))
+
+    inicios = [i for i, _ in agenda.huecos(_h(8), _h(12))]
+
+    assert _h(9, 46) not in inicios
+    assert inicios[:3] == [_h(8), _h(8, 30), _h(10)]
+
+
+def test_huecos_desde_ahora_arrancan_en_la_grilla():
+    agenda = _agenda()
+    ahora = _h(9, 7).replace(second=42, microsecond=5)
+
+    huecos = agenda.huecos(ahora, _h(12))
+
+    assert huecos[0] == (_h(9, 30), _h(10))
+    assert all(i.minute in (0, 30) and i.second == 0 for i, _ in huecos)
+
+
+def test_huecos_turno_en_grilla_deja_el_siguiente_contiguo():
+    agenda = _agenda()
+    agenda.reservar(_h(9), _h(9, 30))
+
+    inicios = [i for i, _ in agenda.huecos(_h(8), _h(10))]
+
+    assert inicios == [_h(8), _h(8, 30), _h(9, 30)]
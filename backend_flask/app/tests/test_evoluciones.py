@@ -0,0 +1,57 @@
+# app/tests/test_evoluciones.py
+import pytest
+
+# Garantía de cantidad de consultas (@limitar_consultas): el listado de
+# evoluciones usa las mismas consultas con 1 o con N evoluciones.
+
+ESQUEMA = """
+    CREATE TABLE usuarios (id INTEGER PRIMARY KEY, nombre TEXT, rol TEXT, especialidad TEXT);
+    CREATE TABLE evoluciones (
+        id INTEGER PRIMARY KEY, paciente_id INTEGER, fecha TEXT, contenido TEXT,
+        indicaciones TEXT, creado_en TEXT, usuario_id INTEGER
+    );
+    CREATE TABLE evolucion_archivos (id INTEGER PRIMARY KEY, evolucion_id INTEGER, filename TEXT);
+    INSERT INTO usuarios VALUES (1, 'Ana', 'profesional', 'Kinesiología');
+"""
+
+
+def _cargar(conexion, paciente_id, cantidad, adjuntos=2):
+    cursor = conexion.cursor()
+    for i in range(cantidad):
+        cursor.execute("""
+            INSERT INTO evoluciones (paciente_id, fecha, contenido, indicaciones, creado_en, usuario_id)
+            VALUES (%s, %s, %s, %s, %s, 1)
+        """, (paciente_id, f"2024-01-{i + 1:02d}", f"Evolución {i}", "", "2024-01-01"))
+        evolucion_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO evolucion_archivos (evolucion_id, filename) VALUES (%s, %s)",
+            [(evolucion_id, f"adjunto_{evolucion_id}_{j}.pdf") for j in range(adjuntos)],
+        )
+    conexion.commit()
+
+
+@pytest.mark.parametrize("cantidad", [1, 25])
+def test_listado_usa_consultas_constantes(flask_app, base_sqlite, cantidad):
+    conexion = base_sqlite(ESQUEMA)
+    _cargar(conexion, paciente_id=7, cantidad=cantidad)
+
+    respuesta = flask_app.test_client().get("/api/pacientes/7/evoluciones")
+
+    assert respuesta.status_code == 200
+    evoluciones = respuesta.get_json()
+    assert len(evoluciones) == cantidad
+    assert all(len(evo["archivos"]) == 2 for evo in evoluciones)
+    assert respuesta.headers["X-DB-Queries"] == "2"
+
+
+def test_consultas_no_dependen_de_la_cantidad(flask_app, base_sqlite):
+    conexion = base_sqlite(ESQUEMA)
+    _cargar(conexion, paciente_id=1, cantidad=1)
+    _cargar(conexion, paciente_id=2, cantidad=40, adjuntos=3)
+
+    cliente = flask_app.test_client()
+    una = cliente.get("/api/pacientes/1/evoluciones")
+    muchas = cliente.get("/api/pacientes/2/evoluciones")
+
+    assert len(muchas.get_json()) == 40
+    assert una.headers["X-DB-Queries"] == muchas.headers["X-DB-Queries"]
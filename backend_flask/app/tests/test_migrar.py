@@ -0,0 +1,20 @@
+# app/tests/test_migrar.py
+from app import migrar
+from app.routes import turnos_routes
+
+# Las consultas de --explain salen de las constantes de las rutas: que estén
+# completas (un parámetro por %s) y que sigan a los cambios de las rutas.
+
+
+def test_consultas_calientes_tienen_un_parametro_por_marcador():
+    for consulta in migrar.consultas_calientes():
+        assert consulta["sql"].count("%s") == len(consulta["params"]), consulta["nombre"]
+        assert "{" not in consulta["sql"], consulta["nombre"]
+
+
+def test_consultas_calientes_usan_el_sql_de_las_rutas(monkeypatch):
+    monkeypatch.setattr(turnos_routes, "SQL_CALENDARIO_GENERAL", "SELECT 1 FROM turnos t WHERE 1 = 1{rango}")
+
+    calendario = next(c for c in migrar.consultas_calientes() if c["nombre"] == "calendario general")
+
+    assert calendario["sql"].startswith("SELECT 1 FROM turnos t WHERE 1 = 1 AND t.fecha_fin > %s")
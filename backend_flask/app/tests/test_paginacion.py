@@ -0,0 +1,49 @@
+# app/tests/test_paginacion.py
+import pytest
+from app.utils import paginacion
+
+# Caché de totales por worker: acotada (LRU) aunque cada búsqueda sea una clave nueva.
+
+
+class _CursorConteo:
+    def __init__(self, total=7):
+        self.total = total
+        self.consultas = 0
+
+    def execute(self, sql, params=()):
+        self.consultas += 1
+
+    def fetchone(self):
+        return {"total": self.total}
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    monkeypatch.setattr(paginacion, "_totales", paginacion.OrderedDict())
+    monkeypatch.setattr(paginacion, "TOTAL_CACHE_MAX", 3)
+
+
+def test_total_cacheado_reutiliza_el_conteo():
+    cursor = _CursorConteo()
+
+    assert paginacion.total_cacheado(cursor, "busqueda:ana", "SQL") == 7
+    assert paginacion.total_cacheado(cursor, "busqueda:ana", "SQL") == 7
+    assert cursor.consultas == 1
+
+
+def test_total_cacheado_no_crece_sin_limite():
+    cursor = _CursorConteo()
+    for i in range(50):
+        paginacion.total_cacheado(cursor, f"busqueda:{i}", "SQL")
+
+    assert list(paginacion._totales) == ["busqueda:47", "busqueda:48", "busqueda:49"]
+
+
+def test_total_cacheado_descarta_la_menos_usada():
+    cursor = _CursorConteo()
+    for clave in ("a", "b", "c"):
+        paginacion.total_cacheado(cursor, clave, "SQL")
+    paginacion.total_cacheado(cursor, "a", "SQL")      # hit: pasa al final
+    paginacion.total_cacheado(cursor, "d", "SQL")
+
+    assert list(paginacion._totales) == ["c", "a", "d"]
@@ -0,0 +1,87 @@
+# app/tests/test_turnos.py
+from datetime import datetime, timedelta
+from app.routes.turnos_routes import medico_disponible, filtro_calendario
+from app.tests.conftest import ConexionSqlite
+
+# La reserva individual bloquea al profesional en su propia transacción
+# antes de mirar la agenda, igual que la tanda.
+
+LUNES = datetime(2024, 1, 1, 9)
+
+
+class _CursorGuion:
+    """Responde cada execute con las filas preparadas y guarda el SQL."""
+
+    def __init__(self, respuestas):
+        self._respuestas = list(respuestas)
+        self._filas = []
+        self.sentencias = []
+
+    def execute(self, sql, params=()):
+        self.sentencias.append(" ".join(sql.split()))
+        self._filas = self._respuestas.pop(0)
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return self._filas
+
+
+def _respuestas_agenda(turnos=()):
+    return [
+        [{"id": 5, "rol": "profesional", "duracion_turno": 30}],
+        [{"usuario_id": 5, "dia_semana": "Lunes", "hora_inicio": timedelta(hours=8),
+          "hora_fin": timedelta(hours=12)}],
+        [],
+        [{"usuario_id": 5, "fecha_inicio": i, "fecha_fin": f} for i, f in turnos],
+    ]
+
+
+def test_bloquea_al_profesional_antes_de_leer_la_agenda():
+    cursor = _CursorGuion([[{"id": 5}]] + _respuestas_agenda())
+
+    assert medico_disponible(cursor, 5, LUNES, LUNES + timedelta(minutes=30))
+    assert cursor.sentencias[0] == "SELECT id FROM usuarios WHERE id=%s FOR UPDATE"
+
+
+def test_turno_superpuesto_no_esta_disponible():
+    ocupado = [(LUNES, LUNES + timedelta(minutes=30))]
+    cursor = _CursorGuion([[{"id": 5}]] + _respuestas_agenda(ocupado))
+
+    assert not medico_disponible(cursor, 5, LUNES + timedelta(minutes=15), LUNES + timedelta(minutes=45))
+
+
+def test_profesional_inexistente_no_esta_disponible():
+    cursor = _CursorGuion([[]])
+
+    assert not medico_disponible(cursor, 99, LUNES, LUNES + timedelta(minutes=30))
+    assert len(cursor.sentencias) == 1
+
+
+# ----------------------------------------------------------
+# Ventana del calendario
+# ----------------------------------------------------------
+def _ids_en_ventana(start, end):
+    conexion = ConexionSqlite("""
+        CREATE TABLE turnos (id INTEGER PRIMARY KEY, fecha_inicio TEXT, fecha_fin TEXT);
+        INSERT INTO turnos VALUES
+            (1, '2024-01-07 23:30:00', '2024-01-08 00:30:00'),   -- empieza antes, termina adentro
+            (2, '2024-01-08 09:00:00', '2024-01-08 09:30:00'),   -- adentro
+            (3, '2024-01-14 23:45:00', '2024-01-15 00:15:00'),   -- empieza adentro, termina después
+            (4, '2024-01-07 09:00:00', '2024-01-07 09:30:00'),   -- antes
+            (5, '2024-01-15 00:00:00', '2024-01-15 00:30:00');   -- justo en end (excluido)
+    """)
+    filtro, params = filtro_calendario(start, end)
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT t.id FROM turnos t WHERE 1 = 1{filtro} ORDER BY t.id",
+                   [p.isoformat(" ") for p in params])
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def test_calendario_incluye_los_turnos_que_se_superponen():
+    assert _ids_en_ventana(datetime(2024, 1, 8), datetime(2024, 1, 15)) == [1, 2, 3]
+
+
+def test_calendario_sin_extremos_no_filtra():
+    assert filtro_calendario() == ("", [])
@@ -0,0 +1,168 @@
+# app/utils/anclaje_bfa.py
+import json
+from app.utils.bfa_client import registrar_hash_en_bfa
+from app.utils.merkle import construir_arbol, raiz, prueba_inclusion, verificar_prueba
+
+# ==============================================================
+# ⛓️ Anclaje en lote de historias en la BFA (árbol de Merkle)
+# ==============================================================
+# Junta los hash_local que todavía no están anclados, arma un árbol de
+# Merkle y publica solo la raíz en una transacción. Cada historia guarda
+# su prueba de inclusión, así que la verificación de pertenencia es local
+# y solo hace falta leer una transacción por lote.
+# Desde la API el anclaje se encola (estado 'solicitado') y lo publica el
+# worker BFA; `flask anclar-historias` lo hace en el momento.
+
+ANCLAJE_LOTE_MAX = 5000
+_LOCK_NOMBRE = "hc_anclaje_bfa"
+
+_SQL_PENDIENTES = """
+    SELECT id, hash_local
+    FROM historias
+    WHERE hash_local IS NOT NULL
+      AND (hash_anclado IS NULL OR hash_anclado <> hash_local)
+    ORDER BY id
+    LIMIT %s
+"""
+
+
+def solicitar_anclaje(conn, usuario_id=None):
+    """
+    Encola un anclaje para el worker BFA (no habla con el nodo). Si ya hay
+    uno solicitado devuelve ese mismo; None si no hay historias pendientes.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT * FROM anclajes_bfa WHERE estado = 'solicitado' ORDER BY id LIMIT 1
+        """)
+        anclaje = cursor.fetchone()
+        if anclaje:
+            return anclaje
+
+        cursor.execute(_SQL_PENDIENTES, (1,))
+        if not cursor.fetchall():
+            return None
+
+        cursor.execute("""
+            INSERT INTO anclajes_bfa (estado, usuario_id) VALUES ('solicitado', %s)
+        """, (usuario_id,))
+        anclaje_id = cursor.lastrowid
+        conn.commit()
+        cursor.execute("SELECT * FROM anclajes_bfa WHERE id = %s", (anclaje_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def procesar_solicitudes(conn, publicar=registrar_hash_en_bfa):
+    """Worker: publica los anclajes solicitados desde la API. Devuelve cuántos publicó."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM anclajes_bfa WHERE estado = 'solicitado' ORDER BY id")
+    solicitudes = [fila[0] for fila in cursor.fetchall()]
+    cursor.close()
+
+    publicados = 0
+    for anclaje_id in solicitudes:
+        try:
+            if anclar_pendientes(conn, publicar=publicar, anclaje_id=anclaje_id):
+                publicados += 1
+        except Exception as e:
+            # anclar_pendientes ya dejó el anclaje en 'error' con el motivo
+            print(f"⚠️ Anclaje {anclaje_id}: no se pudo publicar ({e})")
+    return publicados
+
+
+def anclar_pendientes(conn, limite=ANCLAJE_LOTE_MAX, publicar=registrar_hash_en_bfa, anclaje_id=None):
+    """
+    Ancla hasta `limite` historias cuyo hash_local cambió desde el último
+    anclaje. Con `anclaje_id` completa ese anclaje solicitado en lugar de
+    crear uno nuevo. Devuelve el anclaje publicado (dict) o None si no
+    había pendientes o si otro proceso ya está anclando.
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT GET_LOCK(%s, 0) AS ok", (_LOCK_NOMBRE,))
+    if not cursor.fetchone()["ok"]:
+        cursor.close()
+        return None
+
+    try:
+        if anclaje_id is not None:
+            # Otro worker pudo haberlo tomado antes de que consiguiéramos el lock
+            cursor.execute("SELECT estado FROM anclajes_bfa WHERE id = %s", (anclaje_id,))
+            fila = cursor.fetchone()
+            if not fila or fila["estado"] != "solicitado":
+                return None
+
+        cursor.execute(_SQL_PENDIENTES, (limite,))
+        pendientes = cursor.fetchall()
+        if not pendientes:
+            if anclaje_id is not None:
+                # Nada que publicar (lo ancló otro lote): se cierra sin transacción
+                cursor.execute("""
+                    UPDATE anclajes_bfa SET estado = 'publicado', cantidad = 0 WHERE id = %s
+                """, (anclaje_id,))
+                conn.commit()
+            return None
+
+        hojas = [h["hash_local"] for h in pendientes]
+        niveles = construir_arbol(hojas)
+        raiz_hex = raiz(niveles)
+
+        if anclaje_id is None:
+            cursor.execute("""
+                INSERT INTO anclajes_bfa (raiz, cantidad, estado)
+                VALUES (%s, %s, 'pendiente')
+            """, (raiz_hex, len(hojas)))
+            anclaje_id = cursor.lastrowid
+        else:
+            cursor.execute("""
+                UPDATE anclajes_bfa SET raiz = %s, cantidad = %s, estado = 'pendiente'
+                WHERE id = %s
+            """, (raiz_hex, len(hojas), anclaje_id))
+        conn.commit()
+
+        try:
+            tx_hash = publicar(raiz_hex)
+        except Exception as e:
+            cursor.execute("""
+                UPDATE anclajes_bfa SET estado = 'error', error = %s WHERE id = %s
+            """, (str(e)[:500], anclaje_id))
+            conn.commit()
+            raise
+
+        cursor.execute("""
+            UPDATE anclajes_bfa SET estado = 'publicado', tx_hash = %s WHERE id = %s
+        """, (tx_hash, anclaje_id))
+        cursor.executemany("""
+            UPDATE historias
+            SET anclaje_id = %s, prueba_merkle = %s, hash_anclado = %s, tx_hash = %s
+            WHERE id = %s
+        """, [
+            (anclaje_id, json.dumps(prueba_inclusion(niveles, i)), h["hash_local"], tx_hash, h["id"])
+            for i, h in enumerate(pendientes)
+        ])
+        conn.commit()
+
+        print(f"⛓️ Anclaje {anclaje_id}: {len(hojas)} historias, raíz {raiz_hex[:12]}..., tx {tx_hash}")
+        return {
+            "anclaje_id": anclaje_id,
+            "raiz": raiz_hex,
+            "cantidad": len(hojas),
+            "tx_hash": tx_hash,
+        }
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NOMBRE,))
+        cursor.fetchall()
+        cursor.close()
+
+
+def verificar_inclusion(historia, hash_actual, raiz_publicada):
+    """
+    Verificación local de una historia anclada por lote:
+    el hash actual debe ser el anclado y la prueba debe llevar a la raíz publicada.
+    """
+    if not historia.get("prueba_merkle") or hash_actual != historia.get("hash_anclado"):
+        return False
+    prueba = json.loads(historia["prueba_merkle"])
+    return verificar_prueba(hash_actual, prueba, raiz_publicada)
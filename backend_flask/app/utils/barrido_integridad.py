@@ -0,0 +1,225 @@
+# app/utils/barrido_integridad.py
+import os
+import time
+from app.database import get_connection
+from app.utils.verificacion_bfa import verificar_historias, guardar_auditorias
+
+# ==============================================================
+# 🧹 Barrido de integridad de todas las historias
+# ==============================================================
+# Recorre historias con tx_hash en tramos por id (keyset), recalcula las
+# cadenas en el mismo proceso, compara contra la caché de transacciones (o
+# batch RPC para lo que falta) y guarda las auditorías con executemany.
+# El avance queda en barridos_integridad para consultarlo mientras corre.
+# El recálculo es secuencial a propósito: cuesta ~15 µs por evolución, casi
+# todo json.dumps (con el GIL tomado, así que hilos no ayudan), y un pool de
+# procesos tendría que serializar el contenido de cada evolución, que es
+# más caro que hashearlo. El tiempo del barrido lo ponen la lectura de
+# historia_cadena/evoluciones y el RPC.
+# Corre en el programador o por CLI, nunca en un worker web: la API solo
+# deja el barrido 'solicitado' y el programador lo toma en su próxima vuelta.
+
+BARRIDO_LOTE = int(os.getenv("BARRIDO_LOTE", "500"))
+_LOCK_NOMBRE = "hc_barrido_integridad"
+
+_CONTADORES = ("valida", "modificada", "sin_tx", "tx_no_encontrada")
+
+
+def _cerrar_colgados(conn, cursor):
+    """Un barrido 'en_curso' sin nadie con el lock quedó colgado (proceso caído)."""
+    cursor.execute("SELECT IS_USED_LOCK(%s) AS usado", (_LOCK_NOMBRE,))
+    if not cursor.fetchone()["usado"]:
+        cursor.execute("""
+            UPDATE barridos_integridad
+            SET estado = 'error', error = 'Interrumpido', finalizado_en = NOW()
+            WHERE estado = 'en_curso' AND actualizado_en < NOW() - INTERVAL 1 MINUTE
+        """)
+        conn.commit()
+
+
+def _total_historias(cursor):
+    cursor.execute("SELECT COUNT(*) AS total FROM historias WHERE tx_hash IS NOT NULL")
+    return cursor.fetchone()["total"]
+
+
+def iniciar_barrido(conn, usuario, origen="manual"):
+    """Crea el registro del barrido y devuelve su id, o None si ya hay uno en curso."""
+    cursor = conn.cursor(dictionary=True)
+    _cerrar_colgados(conn, cursor)
+
+    cursor.execute("SELECT id FROM barridos_integridad WHERE estado = 'en_curso' LIMIT 1")
+    if cursor.fetchone():
+        cursor.close()
+        return None
+
+    cursor.execute("""
+        INSERT INTO barridos_integridad (estado, origen, usuario, total, iniciado_en)
+        VALUES ('en_curso', %s, %s, %s, NOW())
+    """, (origen, usuario, _total_historias(cursor)))
+    barrido_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    return barrido_id
+
+
+def solicitar_barrido(conn, usuario):
+    """
+    Deja un barrido 'solicitado' para el programador (la API no lo ejecuta).
+    Devuelve (id, creado): si ya había uno solicitado o en curso, ese id y False.
+    """
+    cursor = conn.cursor(dictionary=True)
+    _cerrar_colgados(conn, cursor)
+
+    cursor.execute("""
+        SELECT id FROM barridos_integridad
+        WHERE estado IN ('solicitado', 'en_curso')
+        ORDER BY id LIMIT 1
+    """)
+    existente = cursor.fetchone()
+    if existente:
+        cursor.close()
+        return existente["id"], False
+
+    cursor.execute("""
+        INSERT INTO barridos_integridad (estado, origen, usuario, iniciado_en)
+        VALUES ('solicitado', 'manual', %s, NOW())
+    """, (usuario,))
+    barrido_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    return barrido_id, True
+
+
+def tomar_solicitado(conn):
+    """Programador: pasa a 'en_curso' el barrido solicitado más viejo y devuelve su id (o None)."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _cerrar_colgados(conn, cursor)
+        cursor.execute("SELECT id FROM barridos_integridad WHERE estado = 'en_curso' LIMIT 1")
+        if cursor.fetchone():
+            return None
+        cursor.execute("""
+            SELECT id FROM barridos_integridad WHERE estado = 'solicitado' ORDER BY id LIMIT 1
+        """)
+        fila = cursor.fetchone()
+        if not fila:
+            return None
+
+        cursor.execute("""
+            UPDATE barridos_integridad
+            SET estado = 'en_curso', total = %s, iniciado_en = NOW()
+            WHERE id = %s AND estado = 'solicitado'
+        """, (_total_historias(cursor), fila["id"]))
+        tomado = cursor.rowcount == 1
+        conn.commit()
+        return fila["id"] if tomado else None
+    finally:
+        cursor.close()
+
+
+def ejecutar_barrido(barrido_id, lote=BARRIDO_LOTE):
+    """Procesa el barrido hasta el final con su propia conexión (programador o CLI)."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT GET_LOCK(%s, 0) AS ok", (_LOCK_NOMBRE,))
+    if not cursor.fetchone()["ok"]:
+        _finalizar(conn, barrido_id, "error", "Ya hay otro barrido en curso")
+        cursor.close()
+        conn.close()
+        return
+
+    cursor.execute("SELECT usuario FROM barridos_integridad WHERE id = %s", (barrido_id,))
+    usuario = cursor.fetchone()["usuario"]
+
+    inicio = time.monotonic()
+    procesadas = 0
+    try:
+        ultimo_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, paciente_id, resumen, tx_hash, anclaje_id, prueba_merkle, hash_anclado
+                FROM historias
+                WHERE id > %s AND tx_hash IS NOT NULL
+                ORDER BY id
+                LIMIT %s
+            """, (ultimo_id, lote))
+            historias = cursor.fetchall()
+            if not historias:
+                break
+
+            resultados = verificar_historias(conn, historias)
+            guardar_auditorias(conn, resultados, usuario)
+
+            cuentas = {c: 0 for c in _CONTADORES}
+            for r in resultados:
+                cuentas[r["estado"]] += 1
+            ultimo_id = historias[-1]["id"]
+            procesadas += len(historias)
+
+            cursor.execute("""
+                UPDATE barridos_integridad
+                SET procesadas = procesadas + %s, validas = validas + %s,
+                    modificadas = modificadas + %s, sin_tx = sin_tx + %s,
+                    tx_no_encontradas = tx_no_encontradas + %s, ultimo_id = %s
+                WHERE id = %s
+            """, (len(historias), cuentas["valida"], cuentas["modificada"], cuentas["sin_tx"],
+                  cuentas["tx_no_encontrada"], ultimo_id, barrido_id))
+            conn.commit()
+
+            velocidad = procesadas / max(time.monotonic() - inicio, 0.001)
+            print(f"🧹 Barrido {barrido_id}: {procesadas} historias ({velocidad:.0f}/s)")
+
+        _finalizar(conn, barrido_id, "completado")
+        print(f"✅ Barrido {barrido_id} completado: {procesadas} historias en {time.monotonic() - inicio:.1f}s")
+    except Exception as e:
+        conn.rollback()
+        _finalizar(conn, barrido_id, "error", str(e)[:500])
+        print(f"❌ Barrido {barrido_id} interrumpido: {e}")
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NOMBRE,))
+        cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+
+def _finalizar(conn, barrido_id, estado, error=None):
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE barridos_integridad
+        SET estado = %s, error = %s, finalizado_en = NOW()
+        WHERE id = %s
+    """, (estado, error, barrido_id))
+    conn.commit()
+    cursor.close()
+
+
+def estado_barrido(cursor, barrido_id=None, limite=20):
+    """
+    Un barrido (por id) o los últimos `limite`, con porcentaje, velocidad
+    (historias/s) y tiempo restante estimado.
+    """
+    sql = """
+        SELECT *, TIMESTAMPDIFF(SECOND, iniciado_en, COALESCE(finalizado_en, NOW())) AS segundos
+        FROM barridos_integridad
+    """
+    if barrido_id is not None:
+        cursor.execute(sql + " WHERE id = %s", (barrido_id,))
+    else:
+        cursor.execute(sql + " ORDER BY id DESC LIMIT %s", (limite,))
+
+    barridos = cursor.fetchall()
+    for b in barridos:
+        segundos = max(b["segundos"] or 0, 1)
+        velocidad = b["procesadas"] / segundos
+        if b["estado"] == "solicitado":
+            b["porcentaje"] = 0.0
+        else:
+            b["porcentaje"] = round(100 * b["procesadas"] / b["total"], 1) if b["total"] else 100.0
+        b["historias_por_segundo"] = round(velocidad, 1)
+        b["eta_segundos"] = (
+            int((b["total"] - b["procesadas"]) / velocidad)
+            if b["estado"] == "en_curso" and velocidad > 0 else None
+        )
+    if barrido_id is not None:
+        return barridos[0] if barridos else None
+    return barridos
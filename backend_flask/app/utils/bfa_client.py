@@ -1,7 +1,11 @@
 # app/utils/bfa_client.py
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
-import os, time
+from web3.exceptions import TransactionNotFound
+import os, time, threading
+from contextlib import nullcontext
+import requests
+from requests.adapters import HTTPAdapter
 
 # ==============================================================
 # 🌐 Configuración de conexión con el nodo BFA
@@ -9,68 +13,317 @@ import os, time
 BFA_URL = os.getenv("BFA_URL", "http://bfa-node:8545")
 ADDRESS = os.getenv("ADDRESS_BFA")
 CHAIN_ID = int(os.getenv("BFA_CHAIN_ID", "1337"))
+# "http" = nodo BFA real; "eth-tester" = cadena en memoria del proceso (benchmarks / pruebas sin red)
+BFA_BACKEND = os.getenv("BFA_BACKEND", "http")
+BFA_TIMEOUT = int(os.getenv("BFA_TIMEOUT", "10"))        # segundos por request RPC
+BFA_REINTENTOS_RPC = 3                                    # intentos por batch con entradas en error
+GAS_PRICE_TTL = 30                                        # segundos
+
+DESTINO = "0x000000000000000000000000000000000000dEaD"
+
+_web3 = None
+_web3_pid = None
+_sesion = None
+_web3_lock = threading.Lock()
+_envio_en_orden = nullcontext()   # eth-tester: Lock (ver _crear_web3_eth_tester)
+
 
 # ==============================================================
-# 🧱 Función principal: registrar hash en la blockchain BFA
+# 🔌 Cliente Web3 compartido (uno por proceso)
 # ==============================================================
-def registrar_hash_en_bfa(hash_hex):
+def get_web3():
     """
-    Publica un hash (SHA256) en la Blockchain Federal Argentina (modo test).
-    El hash se almacena en el campo 'input' de una transacción autoinvocada.
-    Reintenta automáticamente si hay error 'underpriced' o 'already known'.
+    Devuelve el cliente Web3 del proceso: una sola sesión HTTP keep-alive y
+    el middleware POA inyectado una vez (o la cadena eth-tester si
+    BFA_BACKEND=eth-tester). Se recrea tras un fork.
     """
-    web3 = Web3(Web3.HTTPProvider(BFA_URL))
+    global _web3, _web3_pid, _sesion
+    pid = os.getpid()
+    if _web3 is None or _web3_pid != pid:
+        with _web3_lock:
+            if _web3 is None or _web3_pid != pid:
+                if BFA_BACKEND == "eth-tester":
+                    web3, sesion = _crear_web3_eth_tester(), None
+                else:
+                    web3, sesion = _crear_web3_http()
+                _web3 = web3
+                _sesion = sesion
+                _web3_pid = pid
+                _gestor_nonce.resincronizar()
+                _gas_limites.clear()
+    return _web3
+
+
+def _crear_web3_http():
+    sesion = requests.Session()
+    sesion.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+    sesion.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+    web3 = Web3(Web3.HTTPProvider(
+        BFA_URL, session=sesion, request_kwargs={"timeout": BFA_TIMEOUT}
+    ))
     web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    return web3, sesion
+
 
+def _crear_web3_eth_tester():
+    """Cadena eth-tester en memoria: mina cada transacción al instante y trae cuentas desbloqueadas."""
+    global ADDRESS, CHAIN_ID, _envio_en_orden
+    from web3 import EthereumTesterProvider
+
+    # py-evm no es thread-safe: las llamadas al proveedor se serializan
+    proveedor = EthereumTesterProvider()
+    lock, make_request = threading.Lock(), proveedor.make_request
+
+    def make_request_serializado(method, params):
+        with lock:
+            return make_request(method, params)
+
+    proveedor.make_request = make_request_serializado
+    # Sin mempool: un nonce adelantado se rechaza en lugar de quedar en cola,
+    # así que nonce y envío van juntos (en el nodo real los envíos son paralelos)
+    _envio_en_orden = threading.Lock()
+    web3 = Web3(proveedor)
+    ADDRESS = web3.eth.accounts[0]
+    CHAIN_ID = web3.eth.chain_id
+    return web3
+
+
+def conectar():
+    """Cliente Web3 listo para usar o ConnectionError si el nodo no responde."""
+    web3 = get_web3()
     if not web3.is_connected():
         raise ConnectionError(f"❌ No se pudo conectar al nodo BFA en {BFA_URL}")
+    return web3
+
+
+# ==============================================================
+# 🔢 Nonces locales
+# ==============================================================
+class GestorNonce:
+    """
+    Asigna nonces consecutivos sin consultar al nodo en cada envío.
+    Se sincroniza con el nodo (transacciones 'pending') la primera vez y
+    cada vez que un envío falla por un problema de nonce.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._siguiente = None
+
+    def tomar(self, web3, cuenta):
+        with self.lock:
+            if self._siguiente is None:
+                self._siguiente = web3.eth.get_transaction_count(cuenta, "pending")
+            nonce = self._siguiente
+            self._siguiente += 1
+            return nonce
+
+    def resincronizar(self):
+        with self.lock:
+            self._siguiente = None
+
+
+_gestor_nonce = GestorNonce()
+_gas_price = (0.0, None)   # (expira_en, valor)
+
+
+def _precio_gas(web3):
+    global _gas_price
+    ahora = time.monotonic()
+    if _gas_price[0] > ahora:
+        return _gas_price[1]
+    valor = web3.eth.gas_price or web3.to_wei("1", "gwei")
+    _gas_price = (ahora + GAS_PRICE_TTL, valor)
+    return valor
+
+
+_gas_limites = {}          # largo de data -> gas estimado
+
+
+def _gas_intrinseco(data):
+    """Gas de una transferencia sin contrato: 21000 + 4/16 por byte de data (cero / no cero)."""
+    return 21000 + sum(4 if b == 0 else 16 for b in data)
+
+
+def _limite_gas(web3, cuenta, data):
+    """
+    Gas para enviar `data` a DESTINO. Se estima una vez por largo de data
+    con todos los bytes no nulos (el peor caso del gas intrínseco) y queda
+    cacheado; si el nodo no puede estimar se usa el gas intrínseco.
+    """
+    limite = _gas_limites.get(len(data))
+    if limite is None:
+        try:
+            limite = web3.eth.estimate_gas({
+                "from": cuenta, "to": DESTINO, "value": 0, "data": b"\xff" * len(data)
+            })
+        except Exception as e:
+            print(f"⚠️ No se pudo estimar el gas ({e}); se usa el intrínseco")
+            return _gas_intrinseco(data)
+        _gas_limites[len(data)] = limite
+    return limite
+
+
+# ==============================================================
+# 🧱 Función principal: registrar hash en la blockchain BFA
+# ==============================================================
+def registrar_hash_en_bfa(hash_hex):
+    """
+    Publica un hash (SHA256) en la Blockchain Federal Argentina (modo test).
+    El hash va en el campo 'input' de una transacción sin valor a DESTINO.
+    Reintenta automáticamente si hay error 'underpriced' o de nonce.
+    """
+    web3 = conectar()
 
     cuenta = Web3.to_checksum_address(ADDRESS)
-    nonce = web3.eth.get_transaction_count(cuenta)
-    base_gas_price = web3.eth.gas_price or web3.to_wei("1", "gwei")
+    data = web3.to_bytes(hexstr=hash_hex)
+    base_gas_price = _precio_gas(web3)
+    gas = _limite_gas(web3, cuenta, data)
 
     # Intentamos hasta 3 veces
     for intento in range(3):
         gas_price = base_gas_price + web3.to_wei(intento, "gwei")
 
-        tx = {
-            "nonce": nonce,
-            "to": "0x000000000000000000000000000000000000dEaD",
-            "value": 0,
-            "data": web3.to_bytes(hexstr=hash_hex),
-            "gasPrice": gas_price,
-            "chainId": CHAIN_ID,
-            "from": cuenta
-        }
-
-        try:
-            estimated_gas = web3.eth.estimate_gas(tx)
-            tx["gas"] = max(estimated_gas, 21000)
-        except Exception:
-            tx["gas"] = 50000
-
         try:
-            # ✅ Enviar directamente al nodo (sin firmar manualmente)
-            tx_hash = web3.eth.send_transaction(tx)
+            # Solo la asignación del nonce es exclusiva (GestorNonce); el envío
+            # (RPC al nodo) corre en paralelo. _envio_en_orden solo serializa con eth-tester
+            with _envio_en_orden:
+                tx = {
+                    "nonce": _gestor_nonce.tomar(web3, cuenta),
+                    "to": DESTINO,
+                    "value": 0,
+                    "data": data,
+                    "gas": gas,
+                    "gasPrice": gas_price,
+                    "chainId": CHAIN_ID,
+                    "from": cuenta
+                }
+                # ✅ Enviar directamente al nodo (sin firmar manualmente)
+                tx_hash = web3.eth.send_transaction(tx)
             tx_hex = web3.to_hex(tx_hash)
-            print(f"✅ Transacción enviada a BFA: {tx_hex} (gasPrice={gas_price})")
+            print(f"✅ Transacción enviada a BFA: {tx_hex} (nonce={tx['nonce']}, gasPrice={gas_price})")
             return tx_hex
 
         except Exception as e:
+            # El nonce local ya no es confiable (quedó un hueco o se repitió):
+            # se vuelve a pedir al nodo, que ya cuenta los envíos en vuelo
+            _gestor_nonce.resincronizar()
             msg = str(e)
             if "already known" in msg:
                 print("⚠️ El hash ya se encuentra registrado en la Blockchain BFA.")
                 return "already_known"
-            elif "underpriced" in msg or "replacement transaction underpriced" in msg:
-                print(f"⚠️ Transacción rechazada por underpriced, reintentando con mayor gas... intento {intento+1}")
-                time.sleep(1)
+            elif "underpriced" in msg or "nonce too low" in msg:
+                print(f"⚠️ Transacción rechazada ({msg}), reintentando... intento {intento+1}")
                 continue
             else:
                 print(f"❌ Error al enviar transacción: {msg}")
                 raise
 
     # Si fallan los 3 intentos:
-    raise RuntimeError("❌ No se pudo enviar la transacción tras 3 intentos consecutivos (underpriced).")
+    raise RuntimeError("❌ No se pudo enviar la transacción tras 3 intentos consecutivos.")
+
+
+# ==============================================================
+# 🔎 Lectura del hash publicado en una transacción
+# ==============================================================
+def obtener_input_tx(tx_hash):
+    """Devuelve el campo input de la transacción como hex sin '0x'."""
+    tx = get_web3().eth.get_transaction(tx_hash)
+    return input_de_tx(tx)
+
+
+def input_de_tx(tx):
+    """Payload de una transacción: el nodo lo devuelve en 'input', eth-tester en 'data'."""
+    return normalizar_input(tx.get("input", tx.get("data")))
+
+
+def normalizar_input(input_data):
+    if isinstance(input_data, (bytes, bytearray)) or hasattr(input_data, "hex"):
+        input_data = input_data.hex()
+    input_data = str(input_data)
+    return input_data[2:] if input_data.startswith("0x") else input_data
+
+
+def obtener_transacciones_lote(tx_hashes):
+    """
+    Pide varias transacciones en un solo POST (batch JSON-RPC de
+    eth_getTransactionByHash) por la sesión compartida.
+    Devuelve {tx_hash: {"input", "bloque"}}; las que el nodo no conoce
+    ("result": null) no aparecen y "bloque" es None si la transacción sigue
+    pendiente. Las entradas con "error" (o sin respuesta) se vuelven a pedir
+    y, si siguen fallando, se lanza RuntimeError: un problema del nodo no
+    puede pasar por "transacción no encontrada".
+    """
+    tx_hashes = list(tx_hashes)
+    if not tx_hashes:
+        return {}
+
+    web3 = get_web3()
+    if _sesion is None:
+        # Backend sin HTTP (eth-tester): no hay batch, se piden de a una
+        return _transacciones_de_a_una(web3, tx_hashes)
+
+    resultado = {}
+    pendientes = dict(enumerate(tx_hashes))     # id JSON-RPC -> tx_hash
+    for intento in range(BFA_REINTENTOS_RPC):
+        if intento:
+            time.sleep(0.5 * intento)
+        errores = _batch_transacciones(pendientes, resultado)
+        if not errores:
+            return resultado
+        pendientes = {i: pendientes[i] for i in errores}
+        print(f"⚠️ {len(errores)} transacciones con error en el batch RPC, reintentando... intento {intento + 1}")
+
+    raise RuntimeError(
+        f"❌ El nodo BFA devolvió error para {len(errores)} transacciones: {next(iter(errores.values()))}"
+    )
+
+
+def _batch_transacciones(pendientes, resultado):
+    """
+    Un POST con las transacciones `pendientes` ({id: tx_hash}); completa
+    `resultado` y devuelve {id: error} de las que no tuvieron respuesta válida.
+    """
+    llamadas = [
+        {"jsonrpc": "2.0", "id": i, "method": "eth_getTransactionByHash", "params": [h]}
+        for i, h in pendientes.items()
+    ]
+    resp = _sesion.post(BFA_URL, json=llamadas, timeout=BFA_TIMEOUT)
+    resp.raise_for_status()
+    respuestas = resp.json()
+    if not isinstance(respuestas, list):
+        raise RuntimeError(f"❌ El nodo BFA no aceptó el batch RPC: {respuestas}")
+
+    errores = dict.fromkeys(pendientes, "sin respuesta del nodo")
+    for r in respuestas:
+        rid = r.get("id") if isinstance(r, dict) else None
+        if rid not in errores:
+            raise RuntimeError(f"❌ Respuesta del batch RPC con id inesperado: {r}")
+        if "error" in r or "result" not in r:
+            errores[rid] = r.get("error", "respuesta sin result")
+            continue
+        del errores[rid]
+        tx = r["result"]
+        if tx is None:
+            continue    # el nodo no conoce la transacción
+        bloque = tx.get("blockNumber")
+        resultado[pendientes[rid]] = {
+            "input": input_de_tx(tx),
+            "bloque": int(bloque, 16) if bloque else None,
+        }
+    return errores
+
+
+def _transacciones_de_a_una(web3, tx_hashes):
+    resultado = {}
+    for h in tx_hashes:
+        try:
+            tx = web3.eth.get_transaction(h)
+        except TransactionNotFound:
+            continue
+        resultado[h] = {"input": input_de_tx(tx), "bloque": tx.get("blockNumber")}
+    return resultado
 
 
 # ==============================================================
@@ -78,7 +331,5 @@ def registrar_hash_en_bfa(hash_hex):
 # ==============================================================
 def verificar_hash_en_bfa(hash_local):
     """Simula la verificación del hash en la BFA (modo test)."""
-    w3 = Web3(Web3.HTTPProvider(BFA_URL))
-    if not w3.is_connected():
-        raise ConnectionError(f"❌ No se pudo conectar al nodo BFA en {BFA_URL}")
+    conectar()
     return hash_local
@@ -0,0 +1,203 @@
+# app/utils/busqueda.py
+import re
+import unicodedata
+from app.utils.paginacion import condicion_despues, parametros_despues
+
+# ==============================================================
+# 🔎 Búsqueda de pacientes por tokens
+# ==============================================================
+# Cada paciente tiene sus palabras de nombre/apellido normalizadas
+# (minúsculas, sin acentos) en la tabla pacientes_tokens. La búsqueda
+# hace rangos por prefijo sobre la PK (token, paciente_id), así que el
+# costo depende de cuántos pacientes coinciden y no del tamaño de la tabla.
+
+MAX_LARGO_TOKEN = 40
+MAX_TERMINOS = 6
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin acentos ni diéresis (ñ → n)."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokenizar(texto):
+    """Palabras alfanuméricas normalizadas ('María José' → ['maria', 'jose'])."""
+    return [t[:MAX_LARGO_TOKEN] for t in re.findall(r"[a-z0-9]+", normalizar_texto(texto))]
+
+
+def _escapar_like(valor):
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ==============================================================
+# Mantenimiento del índice
+# ==============================================================
+def indexar_paciente(cursor, paciente_id, nombre, apellido):
+    """(Re)genera los tokens de un paciente. No hace commit."""
+    cursor.execute("DELETE FROM pacientes_tokens WHERE paciente_id = %s", (paciente_id,))
+    tokens = set(tokenizar(nombre)) | set(tokenizar(apellido))
+    if tokens:
+        cursor.executemany(
+            "INSERT INTO pacientes_tokens (token, paciente_id) VALUES (%s, %s)",
+            [(t, paciente_id) for t in sorted(tokens)]
+        )
+
+
+def reindexar_todos(conn, lote=1000):
+    """Reconstruye pacientes_tokens completo (carga inicial o reparación)."""
+    lectura = conn.cursor(dictionary=True)
+    escritura = conn.cursor()
+    escritura.execute("DELETE FROM pacientes_tokens")
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        lectura.execute("""
+            SELECT id, nombre, apellido FROM pacientes
+            WHERE id > %s ORDER BY id LIMIT %s
+        """, (ultimo_id, lote))
+        filas = lectura.fetchall()
+        if not filas:
+            break
+
+        valores = []
+        for p in filas:
+            tokens = set(tokenizar(p["nombre"])) | set(tokenizar(p["apellido"]))
+            valores.extend((t, p["id"]) for t in sorted(tokens))
+        if valores:
+            escritura.executemany(
+                "INSERT INTO pacientes_tokens (token, paciente_id) VALUES (%s, %s)", valores
+            )
+        conn.commit()
+
+        ultimo_id = filas[-1]["id"]
+        total += len(filas)
+
+    lectura.close()
+    escritura.close()
+    return total
+
+
+# ==============================================================
+# Consulta
+# ==============================================================
+def consulta_coincidencias(texto):
+    """
+    Arma el SELECT (paciente_id, rango) de los pacientes que coinciden con `texto`.
+    rango 0 = prefijo de DNI / N° HC, 1 = todas las palabras exactas, 2 = por prefijo.
+    Devuelve (sql, params) o None si el texto no tiene nada buscable.
+    """
+    crudo = (texto or "").strip()
+    terminos = list(dict.fromkeys(tokenizar(crudo)))[:MAX_TERMINOS]
+    if not crudo or not terminos:
+        return None
+
+    partes = []
+    params = []
+
+    # DNI / N° HC por prefijo (usan los índices únicos de pacientes)
+    documento = re.sub(r"[\s.\-]", "", crudo)
+    if documento:
+        prefijo = _escapar_like(documento) + "%"
+        partes.append("SELECT id AS paciente_id, 0 AS rango FROM pacientes WHERE dni LIKE %s")
+        partes.append("SELECT id AS paciente_id, 0 AS rango FROM pacientes WHERE nro_hc LIKE %s")
+        params += [prefijo, prefijo]
+
+    # Nombre / apellido: cada término debe ser prefijo de alguna palabra
+    por_termino = []
+    for i, termino in enumerate(terminos):
+        por_termino.append(f"""
+            SELECT paciente_id, {i} AS termino, MAX(token = %s) AS exacto
+            FROM pacientes_tokens
+            WHERE token LIKE %s
+            GROUP BY paciente_id
+        """)
+        params += [termino, termino + "%"]
+
+    partes.append(f"""
+        SELECT paciente_id, IF(SUM(exacto) = %s, 1, 2) AS rango
+        FROM ({" UNION ALL ".join(por_termino)}) pt
+        GROUP BY paciente_id
+        HAVING COUNT(*) = %s
+    """)
+    params += [len(terminos), len(terminos)]
+
+    sql = f"""
+        SELECT paciente_id, MIN(rango) AS rango
+        FROM ({" UNION ALL ".join(partes)}) c
+        GROUP BY paciente_id
+    """
+    return sql, params
+
+
+def buscar_pacientes(cursor, texto, limite, offset=0):
+    """Devuelve (total, filas) ordenadas por relevancia y luego apellido, nombre."""
+    consulta = consulta_coincidencias(texto)
+
+    if consulta is None:
+        cursor.execute("SELECT COUNT(*) AS total FROM pacientes")
+        total = cursor.fetchone()["total"]
+        cursor.execute("""
+            SELECT id, nro_hc, dni, nombre, apellido
+            FROM pacientes
+            ORDER BY apellido, nombre, id
+            LIMIT %s OFFSET %s
+        """, (limite, offset))
+        return total, cursor.fetchall()
+
+    sql, params = consulta
+    cursor.execute(f"SELECT COUNT(*) AS total FROM ({sql}) m", params)
+    total = cursor.fetchone()["total"]
+
+    cursor.execute(f"""
+        SELECT p.id, p.nro_hc, p.dni, p.nombre, p.apellido
+        FROM ({sql}) m
+        JOIN pacientes p ON p.id = m.paciente_id
+        ORDER BY m.rango, p.apellido, p.nombre, p.id
+        LIMIT %s OFFSET %s
+    """, params + [limite, offset])
+    return total, cursor.fetchall()
+
+
+def buscar_pacientes_keyset(cursor, texto, limite, despues=None):
+    """
+    Igual que buscar_pacientes pero paginado por cursor sobre
+    (rango, apellido, nombre, id). `despues` son esos valores de la última
+    fila de la página anterior. Trae limite+1 filas para saber si hay más.
+    """
+    consulta = consulta_coincidencias(texto)
+
+    if consulta is None:
+        sql = ("SELECT 0 AS rango, id, nro_hc, dni, nombre, apellido, fecha_nacimiento, sexo, telefono "
+               "FROM pacientes")
+        params = []
+        if despues:
+            condicion, indices = condicion_despues(["apellido", "nombre", "id"])
+            sql += f" WHERE {condicion}"
+            params += parametros_despues(indices, despues[1:])
+        sql += " ORDER BY apellido, nombre, id LIMIT %s"
+        cursor.execute(sql, params + [limite + 1])
+        return cursor.fetchall()
+
+    sql, params = consulta
+    filtro = ""
+    params = list(params)
+    if despues:
+        condicion, indices = condicion_despues(["m.rango", "p.apellido", "p.nombre", "p.id"])
+        filtro = f"WHERE {condicion}"
+        params += parametros_despues(indices, despues)
+
+    cursor.execute(f"""
+        SELECT m.rango, p.id, p.nro_hc, p.dni, p.nombre, p.apellido,
+               p.fecha_nacimiento, p.sexo, p.telefono
+        FROM ({sql}) m
+        JOIN pacientes p ON p.id = m.paciente_id
+        {filtro}
+        ORDER BY m.rango, p.apellido, p.nombre, p.id
+        LIMIT %s
+    """, params + [limite + 1])
+    return cursor.fetchall()
@@ -0,0 +1,94 @@
+# app/utils/cache_pdf.py
+import os
+import hashlib
+import tempfile
+
+# ==============================================================
+# 💾 Cache en disco de PDFs generados
+# ==============================================================
+# Los archivos se nombran por el hash de su clave (contenido de la historia
+# + versión de plantilla), así que un PDF cacheado nunca queda desactualizado:
+# si algo cambia, cambia la clave. La carpeta se comparte entre workers.
+# Al superar PDF_CACHE_MAX_MB se borran los menos usados (mtime más viejo).
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(os.getcwd(), "cache", "pdf"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "500"))
+
+
+def clave_cache(*partes):
+    """Hash estable de las partes que determinan el contenido del PDF."""
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def _ruta(clave):
+    return os.path.join(PDF_CACHE_DIR, clave[:2], f"{clave}.pdf")
+
+
+def leer(clave):
+    """Ruta del PDF cacheado o None. Marca el archivo como usado (LRU por mtime)."""
+    ruta = _ruta(clave)
+    try:
+        os.utime(ruta)
+    except OSError:
+        return None
+    return ruta
+
+
+def guardar(clave, contenido):
+    """Escribe el PDF de forma atómica (tmp + os.replace) y devuelve su ruta."""
+    ruta = _ruta(clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    try:
+        recortar()
+    except OSError as e:
+        print(f"⚠️ No se pudo recortar el cache de PDFs: {e}")
+    return ruta
+
+
+def recortar(max_bytes=None):
+    """Borra los PDFs usados hace más tiempo hasta quedar bajo el límite."""
+    max_bytes = PDF_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+
+    archivos = []
+    total = 0
+    for raiz, _, nombres in os.walk(PDF_CACHE_DIR):
+        for nombre in nombres:
+            if not nombre.endswith(".pdf"):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((st.st_mtime, st.st_size, ruta))
+            total += st.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    borrados = 0
+    for _, tamanio, ruta in sorted(archivos):
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        total -= tamanio
+        borrados += 1
+        if total <= max_bytes:
+            break
+    return borrados
@@ -0,0 +1,155 @@
+# app/utils/cadena_hash.py
+import json
+import hashlib
+
+# ==============================================================
+# ⛓️ Cadena de hashes de la historia clínica
+# ==============================================================
+# Cada evolución se hashea una sola vez al entrar en la historia:
+#     h_evo = sha256(JSON de {id, paciente_id, fecha, contenido, usuario_id})
+#     h_n   = sha256(h_{n-1} + h_evo)        (h_0 = GENESIS)
+# Se encadena en orden de id (inserción). historias.hash_local guarda el
+# último h_n: agregar una evolución cuesta O(1) y el hash sigue cubriendo
+# toda la historia, porque cambiar cualquier evolución cambia h_n.
+
+GENESIS = "0" * 64
+VERSION_CADENA = "cadena-v1"
+
+COLUMNAS_EVOLUCION = "id, paciente_id, fecha, contenido, usuario_id"
+
+
+def hash_evolucion(evo):
+    """Mismo formato que usa la verificación de evoluciones individuales."""
+    data = {
+        "id": evo["id"],
+        "paciente_id": evo["paciente_id"],
+        "fecha": str(evo["fecha"]),
+        "contenido": evo["contenido"],
+        "usuario_id": evo["usuario_id"],
+    }
+    resumen_json = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(resumen_json.encode()).hexdigest()
+
+
+def encadenar(hash_anterior, hash_evo):
+    return hashlib.sha256((hash_anterior + hash_evo).encode()).hexdigest()
+
+
+def resumen_cadena(cantidad, ultima_evolucion_id, hash_cadena):
+    """Lo que se guarda en historias.resumen (tamaño fijo, no crece con la historia)."""
+    return json.dumps({
+        "version": VERSION_CADENA,
+        "evoluciones": cantidad,
+        "ultima_evolucion": ultima_evolucion_id,
+        "hash": hash_cadena,
+    }, sort_keys=True)
+
+
+def es_resumen_legado(resumen):
+    """True si historias.resumen tiene el formato viejo (lista completa de evoluciones)."""
+    try:
+        return isinstance(json.loads(resumen or ""), list)
+    except ValueError:
+        return False
+
+
+def extender_cadena(cursor, paciente_id):
+    """
+    Agrega a historia_cadena las evoluciones del paciente que todavía no
+    están encadenadas (normalmente una sola). No hace commit.
+    Devuelve (hash_cadena, cantidad, ultima_evolucion_id) o None si no hay evoluciones.
+    El cursor debe ser dictionary=True.
+    """
+    # Serializa los appends concurrentes del mismo paciente
+    cursor.execute("SELECT id FROM pacientes WHERE id = %s FOR UPDATE", (paciente_id,))
+
+    cursor.execute("""
+        SELECT posicion, evolucion_id, hash_cadena
+        FROM historia_cadena
+        WHERE paciente_id = %s
+        ORDER BY posicion DESC
+        LIMIT 1
+    """, (paciente_id,))
+    ultimo = cursor.fetchone()
+
+    posicion = ultimo["posicion"] if ultimo else 0
+    hash_cadena = ultimo["hash_cadena"] if ultimo else GENESIS
+    ultima_evolucion = ultimo["evolucion_id"] if ultimo else 0
+
+    cursor.execute(f"""
+        SELECT {COLUMNAS_EVOLUCION}
+        FROM evoluciones
+        WHERE paciente_id = %s AND id > %s
+        ORDER BY id
+    """, (paciente_id, ultima_evolucion))
+    nuevas = cursor.fetchall()
+
+    if not nuevas and not ultimo:
+        return None
+
+    eslabones = []
+    for evo in nuevas:
+        posicion += 1
+        h_evo = hash_evolucion(evo)
+        hash_cadena = encadenar(hash_cadena, h_evo)
+        ultima_evolucion = evo["id"]
+        eslabones.append((paciente_id, posicion, evo["id"], h_evo, hash_cadena))
+
+    if eslabones:
+        cursor.executemany("""
+            INSERT INTO historia_cadena (paciente_id, posicion, evolucion_id, hash_evolucion, hash_cadena)
+            VALUES (%s, %s, %s, %s, %s)
+        """, eslabones)
+
+    return hash_cadena, posicion, ultima_evolucion
+
+
+def recalcular_cadena(cursor, paciente_id):
+    """
+    Recalcula la cadena desde el contenido actual de las evoluciones y la
+    compara con la guardada (para verificación; es O(n)).
+    Devuelve {"hash", "cantidad", "integra", "primera_diferencia"}.
+    """
+    return recalcular_cadenas(cursor, [paciente_id])[paciente_id]
+
+
+def recalcular_cadenas(cursor, paciente_ids):
+    """Igual que recalcular_cadena para varios pacientes con una sola consulta."""
+    eslabones = leer_eslabones(cursor, paciente_ids)
+    return {pid: verificar_eslabones(filas) for pid, filas in eslabones.items()}
+
+
+def leer_eslabones(cursor, paciente_ids):
+    """{paciente_id: [eslabones con la evolución actual]} en orden de posición."""
+    eslabones = {pid: [] for pid in paciente_ids}
+    if not eslabones:
+        return eslabones
+
+    marcadores = ", ".join(["%s"] * len(eslabones))
+    cursor.execute(f"""
+        SELECT c.paciente_id AS paciente_cadena, c.posicion, c.hash_evolucion, c.hash_cadena,
+               e.id, e.paciente_id, e.fecha, e.contenido, e.usuario_id
+        FROM historia_cadena c
+        LEFT JOIN evoluciones e ON e.id = c.evolucion_id
+        WHERE c.paciente_id IN ({marcadores})
+        ORDER BY c.paciente_id, c.posicion
+    """, list(eslabones))
+    for fila in cursor:
+        eslabones[fila["paciente_cadena"]].append(fila)
+    return eslabones
+
+
+def verificar_eslabones(filas):
+    """
+    Rehace la cadena de un paciente y la compara con la guardada.
+    No toca la base (se puede correr en otro proceso).
+    """
+    r = {"hash": None, "cantidad": 0, "integra": True, "primera_diferencia": None}
+    for fila in filas:
+        h_evo = hash_evolucion(fila) if fila["id"] is not None else ""
+        r["hash"] = encadenar(r["hash"] or GENESIS, h_evo)
+        r["cantidad"] += 1
+        if r["integra"] and (h_evo != fila["hash_evolucion"] or r["hash"] != fila["hash_cadena"]):
+            r["integra"] = False
+            r["primera_diferencia"] = fila["posicion"]
+    return r
@@ -0,0 +1,31 @@
+# app/utils/consultas.py
+from functools import wraps
+from flask import current_app, make_response
+from app.database import consultas_del_request
+
+
+def limitar_consultas(maximo):
+    """
+    Decorador: garantiza que el endpoint ejecute a lo sumo `maximo` consultas,
+    sin importar cuántas filas devuelva (evita regresiones N+1).
+    Agrega el header X-DB-Queries. Si se supera el límite se registra un
+    aviso; en debug/testing además se corta con AssertionError.
+    Uso:
+        @limitar_consultas(2)
+    """
+    def wrapper(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            antes = consultas_del_request()
+            respuesta = make_response(f(*args, **kwargs))
+            usadas = consultas_del_request() - antes
+
+            respuesta.headers["X-DB-Queries"] = str(usadas)
+            if usadas > maximo:
+                mensaje = f"{f.__name__} ejecutó {usadas} consultas (máximo {maximo})"
+                print(f"⚠️ {mensaje}")
+                if current_app.debug or current_app.testing:
+                    raise AssertionError(mensaje)
+            return respuesta
+        return decorated_function
+    return wrapper
@@ -0,0 +1,156 @@
+# app/utils/contadores.py
+from collections import Counter
+from datetime import timedelta
+from app.utils.disponibilidad import a_datetime
+
+# ==============================================================
+# 🔢 Contadores materializados del dashboard
+# ==============================================================
+# Totales (pacientes, usuarios, evoluciones) en `contadores` y turnos por
+# día en `contadores_turnos_dia`. Las rutas que crean o borran filas los
+# ajustan con el mismo cursor, antes de su commit: si la operación se
+# deshace, el ajuste también. `reconciliar` los recalcula desde las tablas
+# (lo corre el programador todas las noches) y corrige cualquier desvío,
+# bloqueando solo el contador que corrige y solo mientras lo corrige.
+
+TOTALES = ("pacientes", "usuarios", "evoluciones")
+
+
+def sumar(cursor, nombre, delta=1):
+    cursor.execute("""
+        INSERT INTO contadores (nombre, valor) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+    """, (nombre, delta))
+
+
+def sumar_turnos(cursor, fechas_inicio, signo=1):
+    """Suma (o resta con signo=-1) un turno por cada fecha de inicio, agrupado por día."""
+    por_dia = Counter(a_datetime(f).date() for f in fechas_inicio)
+    if not por_dia:
+        return
+    cursor.executemany("""
+        INSERT INTO contadores_turnos_dia (dia, total) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+    """, [(dia, signo * n) for dia, n in sorted(por_dia.items())])
+
+
+def mover_turno(cursor, inicio_anterior, inicio_nuevo):
+    """Un turno reprogramado: pasa del día anterior al nuevo (si cambió de día)."""
+    if a_datetime(inicio_anterior).date() != a_datetime(inicio_nuevo).date():
+        sumar_turnos(cursor, [inicio_anterior], signo=-1)
+        sumar_turnos(cursor, [inicio_nuevo])
+
+
+def leer(cursor, dia):
+    """{pacientes, usuarios, evoluciones, turnos_hoy} en una sola consulta por clave primaria."""
+    cursor.execute("""
+        SELECT nombre, valor FROM contadores
+        UNION ALL
+        SELECT 'turnos_hoy', total FROM contadores_turnos_dia WHERE dia = %s
+    """, (dia,))
+    valores = {f["nombre"]: int(f["valor"]) for f in cursor.fetchall()}
+    return {nombre: valores.get(nombre, 0) for nombre in TOTALES + ("turnos_hoy",)}
+
+
+def turnos_por_dia(cursor, desde, hasta):
+    """[{dia, total}] de los días en [desde, hasta) que tienen turnos."""
+    cursor.execute("""
+        SELECT dia, total FROM contadores_turnos_dia
+        WHERE dia >= %s AND dia < %s AND total <> 0
+        ORDER BY dia ASC
+    """, (desde, hasta))
+    return cursor.fetchall()
+
+
+def _contar(cursor, clave):
+    """Valor real de un contador: COUNT de su tabla o turnos de ese día (por rango, usa índice)."""
+    if clave in TOTALES:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {clave}")
+    else:
+        cursor.execute("""
+            SELECT COUNT(*) AS total FROM turnos
+            WHERE fecha_inicio >= %s AND fecha_inicio < %s
+        """, (clave, clave + timedelta(days=1)))
+    return cursor.fetchone()["total"]
+
+
+def _corregir(conn, clave):
+    """
+    Corrige un contador en su propia transacción: bloquea solo su fila,
+    vuelve a contar y la ajusta. Devuelve (antes, ahora) o None si ya coincidía.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if clave in TOTALES:
+            cursor.execute("SELECT valor FROM contadores WHERE nombre = %s FOR UPDATE", (clave,))
+        else:
+            cursor.execute("SELECT total AS valor FROM contadores_turnos_dia WHERE dia = %s FOR UPDATE", (clave,))
+        fila = cursor.fetchone()
+        antes = fila["valor"] if fila else 0
+        # El conteo va después del bloqueo: los ajustes que esperaban esta fila
+        # ya están confirmados y los que lleguen se aplican sobre el valor nuevo
+        ahora = _contar(cursor, clave)
+
+        if antes == ahora:
+            conn.commit()
+            return None
+        if clave in TOTALES:
+            cursor.execute("""
+                INSERT INTO contadores (nombre, valor) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+            """, (clave, ahora))
+        else:
+            cursor.execute("""
+                INSERT INTO contadores_turnos_dia (dia, total) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE total = VALUES(total)
+            """, (clave, ahora))
+        conn.commit()
+        return antes, ahora
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def reconciliar(conn):
+    """
+    Recalcula todos los contadores desde las tablas y corrige los que no
+    coinciden. Los conteos completos se hacen sin bloquear nada; solo los
+    contadores que difieren se corrigen, de a uno por transacción, con su
+    fila bloqueada y un conteo nuevo de esa tabla o ese día (ver _corregir).
+    Las altas y bajas concurrentes esperan como mucho a una corrección.
+    Devuelve [(contador, antes, ahora)].
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT nombre, valor FROM contadores")
+        guardados = {f["nombre"]: f["valor"] for f in cursor.fetchall()}
+        cursor.execute("SELECT dia, total FROM contadores_turnos_dia")
+        guardados.update({f["dia"]: f["total"] for f in cursor.fetchall()})
+
+        reales = {}
+        for nombre in TOTALES:
+            reales[nombre] = _contar(cursor, nombre)
+        cursor.execute("""
+            SELECT DATE(fecha_inicio) AS dia, COUNT(*) AS total
+            FROM turnos
+            GROUP BY DATE(fecha_inicio)
+        """)
+        reales.update({f["dia"]: f["total"] for f in cursor.fetchall()})
+        # Cierra la lectura: cada corrección arranca con una vista nueva
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    correcciones = []
+    for clave in set(guardados) | set(reales):
+        if guardados.get(clave, 0) == reales.get(clave, 0):
+            continue
+        corregido = _corregir(conn, clave)
+        if corregido:
+            correcciones.append((str(clave),) + corregido)
+    return sorted(correcciones)
@@ -0,0 +1,265 @@
+# app/utils/disponibilidad.py
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from app.utils.busqueda import normalizar_texto
+
+# ==============================================================
+# 📅 Motor de disponibilidad de profesionales
+# ==============================================================
+# Carga una sola vez, para una ventana de fechas, la plantilla semanal
+# (disponibilidades), las ausencias y los turnos tomados del profesional,
+# y responde "¿está libre este horario?" en memoria.
+
+DIAS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+
+# Consultas de cargar_varios; {marcadores} es un %s por profesional.
+# app.migrar --explain verifica estas mismas consultas contra los índices.
+SQL_PLANTILLA = """
+    SELECT usuario_id, dia_semana, hora_inicio, hora_fin
+    FROM disponibilidades
+    WHERE usuario_id IN ({marcadores}) AND activo = 1
+"""
+SQL_AUSENCIAS_VENTANA = """
+    SELECT usuario_id, fecha_inicio, fecha_fin FROM ausencias
+    WHERE usuario_id IN ({marcadores}) AND fecha_inicio <= %s AND fecha_fin >= %s
+"""
+SQL_TURNOS_VENTANA = """
+    SELECT usuario_id, fecha_inicio, fecha_fin FROM turnos
+    WHERE usuario_id IN ({marcadores}) AND fecha_inicio < %s AND fecha_fin > %s
+"""
+
+
+def a_datetime(valor):
+    """ISO string / datetime → datetime naive (la base guarda hora local sin zona)."""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.replace(tzinfo=None)
+
+
+class Intervalos:
+    """Intervalos [inicio, fin] ordenados por inicio, con máximo acumulado de fin para consultar solapamientos."""
+
+    def __init__(self, pares=()):
+        pares = sorted(pares)
+        self.inicios = [i for i, _ in pares]
+        self.fines = [f for _, f in pares]
+        self.max_fin = []
+        self._recalcular(0)
+
+    def _recalcular(self, desde):
+        del self.max_fin[desde:]
+        for f in self.fines[desde:]:
+            self.max_fin.append(max(self.max_fin[-1], f) if self.max_fin else f)
+
+    def agregar(self, inicio, fin):
+        i = bisect_right(self.inicios, inicio)
+        self.inicios.insert(i, inicio)
+        self.fines.insert(i, fin)
+        self._recalcular(i)
+
+    def agregar_varios(self, pares):
+        """Carga masiva: un solo ordenamiento en lugar de insertar de a uno."""
+        pares = sorted(list(self) + list(pares))
+        self.inicios = [i for i, _ in pares]
+        self.fines = [f for _, f in pares]
+        self._recalcular(0)
+
+    def solapa(self, inicio, fin, bordes=False):
+        """
+        True si algún intervalo se superpone con [inicio, fin).
+        Con bordes=True también cuenta tocarse en un extremo (intervalos cerrados).
+        """
+        if bordes:
+            n = bisect_right(self.inicios, fin)
+            return n > 0 and self.max_fin[n - 1] >= inicio
+        n = bisect_left(self.inicios, fin)
+        return n > 0 and self.max_fin[n - 1] > inicio
+
+    def __iter__(self):
+        return iter(zip(self.inicios, self.fines))
+
+
+class AgendaProfesional:
+    """Disponibilidad de un profesional en la ventana [desde, hasta)."""
+
+    def __init__(self, usuario_id, rol, duracion_turno, plantilla, desde, hasta):
+        self.usuario_id = usuario_id
+        self.rol = rol
+        self.duracion_turno = duracion_turno
+        self.plantilla = plantilla          # {weekday: [(hora_inicio, hora_fin) como timedelta]}
+        self.desde = desde
+        self.hasta = hasta
+        self.ausencias = Intervalos()
+        self.ocupados = Intervalos()
+
+    @property
+    def es_area(self):
+        # Las áreas pueden tener turnos superpuestos
+        return self.rol == "area"
+
+    @classmethod
+    def cargar(cls, cursor, usuario_id, desde, hasta):
+        """Lee usuario, plantilla, ausencias y turnos de la ventana (4 consultas). None si el usuario no existe."""
+        return cls.cargar_varios(cursor, [usuario_id], desde, hasta).get(usuario_id)
+
+    @classmethod
+    def cargar_varios(cls, cursor, usuario_ids, desde, hasta):
+        """{usuario_id: AgendaProfesional} para varios profesionales con las mismas 4 consultas."""
+        usuario_ids = list(dict.fromkeys(usuario_ids))
+        if not usuario_ids:
+            return {}
+        marcadores = ", ".join(["%s"] * len(usuario_ids))
+        desde, hasta = a_datetime(desde), a_datetime(hasta)
+
+        cursor.execute(f"""
+            SELECT id, rol, duracion_turno FROM usuarios WHERE id IN ({marcadores})
+        """, usuario_ids)
+        agendas = {
+            u["id"]: cls(u["id"], u["rol"], u["duracion_turno"], {}, desde, hasta)
+            for u in cursor.fetchall()
+        }
+        if not agendas:
+            return agendas
+        ids = list(agendas)
+        marcadores = ", ".join(["%s"] * len(ids))
+
+        cursor.execute(SQL_PLANTILLA.format(marcadores=marcadores), ids)
+        for d in cursor.fetchall():
+            dia = normalizar_texto(d["dia_semana"])
+            if dia in DIAS:
+                agendas[d["usuario_id"]].plantilla.setdefault(DIAS.index(dia), []).append(
+                    (d["hora_inicio"], d["hora_fin"])
+                )
+        for agenda in agendas.values():
+            for franjas in agenda.plantilla.values():
+                franjas.sort()
+
+        nuevos_a, nuevos_t = {}, {}
+        cursor.execute(SQL_AUSENCIAS_VENTANA.format(marcadores=marcadores), ids + [hasta, desde])
+        for a in cursor.fetchall():
+            nuevos_a.setdefault(a["usuario_id"], []).append((a["fecha_inicio"], a["fecha_fin"]))
+
+        cursor.execute(SQL_TURNOS_VENTANA.format(marcadores=marcadores), ids + [hasta, desde])
+        for t in cursor.fetchall():
+            nuevos_t.setdefault(t["usuario_id"], []).append((t["fecha_inicio"], t["fecha_fin"]))
+
+        for uid, agenda in agendas.items():
+            agenda.ausencias.agregar_varios(nuevos_a.get(uid, []))
+            if not agenda.es_area:
+                agenda.ocupados.agregar_varios(nuevos_t.get(uid, []))
+        return agendas
+
+    def franjas(self, fecha):
+        """Franjas de atención [(inicio, fin)] de un día según la plantilla semanal."""
+        base = datetime.combine(fecha, datetime.min.time())
+        return [(base + i, base + f) for i, f in self.plantilla.get(fecha.weekday(), [])]
+
+    def en_plantilla(self, inicio, fin):
+        return any(i <= inicio and fin <= f for i, f in self.franjas(inicio.date()))
+
+    def disponible(self, inicio, fin):
+        """Mismo criterio que medico_disponible: dentro de la plantilla, sin ausencia y sin turno superpuesto."""
+        return self.motivo_no_disponible(inicio, fin) is None
+
+    def motivo_no_disponible(self, inicio, fin):
+        """None si el horario está libre; si no 'fuera_de_horario', 'ausencia' u 'ocupado'."""
+        inicio, fin = a_datetime(inicio), a_datetime(fin)
+        if not self.en_plantilla(inicio, fin):
+            return "fuera_de_horario"
+        if self.ausencias.solapa(inicio, fin, bordes=True):
+            return "ausencia"
+        if not self.es_area and self.ocupados.solapa(inicio, fin):
+            return "ocupado"
+        return None
+
+    def reservar(self, inicio, fin):
+        """Marca el horario como ocupado (para planificar varios turnos seguidos)."""
+        if not self.es_area:
+            self.ocupados.agregar(a_datetime(inicio), a_datetime(fin))
+
+    # ----------------------------------------------------------
+    # Huecos libres (barrido de la plantilla contra lo ocupado)
+    # ----------------------------------------------------------
+    def bloqueos(self, desde, hasta):
+        """Ausencias y turnos que tocan [desde, hasta), ordenados y fusionados."""
+        # Las ausencias son cerradas (tocar su borde ya bloquea, igual que en disponible)
+        pares = [(i - _EPSILON, f + _EPSILON) for i, f in self.ausencias if i <= hasta and f >= desde]
+        if not self.es_area:
+            pares += [(i, f) for i, f in self.ocupados if i < hasta and f > desde]
+        pares.sort()
+
+        fusionados = []
+        for i, f in pares:
+            if fusionados and i <= fusionados[-1][1]:
+                fusionados[-1][1] = max(fusionados[-1][1], f)
+            else:
+                fusionados.append([i, f])
+        return fusionados
+
+    def huecos(self, desde, hasta, duracion=None):
+        """
+        Horarios libres de `duracion` minutos (por defecto duracion_turno) en
+        [desde, hasta): franjas de la plantilla menos ausencias y turnos, en
+        una sola pasada sobre ambas listas ordenadas. Los huecos caen en la
+        grilla de la franja (inicio de la franja + múltiplos de la duración),
+        también después de un bloqueo o si `desde` no está en la grilla.
+        """
+        desde, hasta = a_datetime(desde), a_datetime(hasta)
+        paso = timedelta(minutes=duracion or self.duracion_turno)
+        bloqueos = self.bloqueos(desde, hasta)
+
+        libres = []
+        j = 0
+        dia = desde.date()
+        while dia <= hasta.date():
+            for base, fin in self.franjas(dia):
+                ini, fin = _alinear(max(base, desde), base, paso), min(fin, hasta)
+                # Los bloqueos que terminan antes de esta franja no sirven para las siguientes
+                while j < len(bloqueos) and bloqueos[j][1] <= ini:
+                    j += 1
+
+                actual, k = ini, j
+                while actual < fin:
+                    if k < len(bloqueos) and bloqueos[k][0] <= actual:
+                        actual = max(actual, _alinear(bloqueos[k][1], base, paso))
+                        k += 1
+                        continue
+                    limite = min(fin, bloqueos[k][0]) if k < len(bloqueos) else fin
+                    while actual + paso <= limite:
+                        libres.append((actual, actual + paso))
+                        actual += paso
+                    actual = limite
+            dia += timedelta(days=1)
+        return libres
+
+
+def planificar_tanda(agenda, primera, duracion, cantidad, dias_semana, hasta):
+    """
+    Reparte `cantidad` sesiones a la misma hora que `primera`, en los días de
+    la semana indicados (0 = lunes), sin pasar de `hasta`. Todo en memoria:
+    cada sesión planificada se reserva en la agenda.
+    Devuelve (sesiones [(inicio, fin)], omitidas [(fecha, motivo)]).
+    """
+    sesiones, omitidas = [], []
+    paso = timedelta(minutes=duracion)
+    actual = a_datetime(primera)
+    while len(sesiones) < cantidad and actual + paso <= hasta:
+        if actual.weekday() in dias_semana:
+            motivo = agenda.motivo_no_disponible(actual, actual + paso)
+            if motivo:
+                omitidas.append((actual.date(), motivo))
+            else:
+                sesiones.append((actual, actual + paso))
+                agenda.reservar(actual, actual + paso)
+        actual += timedelta(days=1)
+    return sesiones, omitidas
+
+
+_EPSILON = timedelta(microseconds=1)
+
+
+def _alinear(momento, origen, paso):
+    """Primer punto de la grilla origen + n·paso que no es anterior a `momento`."""
+    if momento <= origen:
+        return origen
+    return origen - ((origen - momento) // paso) * paso
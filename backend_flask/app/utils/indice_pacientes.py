@@ -0,0 +1,254 @@
+# app/utils/indice_pacientes.py
+import os
+import re
+import sys
+import time
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from app.utils.busqueda import normalizar_texto, tokenizar
+
+# ==============================================================
+# ⚡ Índice en memoria para sugerencias de pacientes (typeahead)
+# ==============================================================
+# Uno por worker. Guarda arreglos ordenados de claves normalizadas
+# (palabras de apellido/nombre, DNI y N° HC) y resuelve prefijos con
+# bisect, sin ir a MySQL. Las altas/bajas/modificaciones de este worker
+# lo actualizan al instante; cada PACIENTES_INDICE_TTL segundos se
+# reconstruye en segundo plano para tomar cambios hechos por otros workers.
+
+PACIENTES_INDICE_TTL = int(os.getenv("PACIENTES_INDICE_TTL", "900"))
+MAX_ESCANEO = 5000
+CAMPOS = ("dni", "nro_hc", "apellido", "nombre")
+
+
+def _clave_documento(valor):
+    return re.sub(r"[^a-z0-9]", "", normalizar_texto(valor))
+
+
+def _claves_paciente(nro_hc, dni, nombre, apellido):
+    return {
+        "dni": [_clave_documento(dni)] if dni else [],
+        "nro_hc": [_clave_documento(nro_hc)] if nro_hc else [],
+        "apellido": sorted(set(tokenizar(apellido))),
+        "nombre": sorted(set(tokenizar(nombre))),
+    }
+
+
+def _palabras(claves):
+    return tuple(sys.intern(p) for p in claves["apellido"] + claves["nombre"])
+
+
+class _Campo:
+    """Arreglo ordenado de claves con el id de paciente en paralelo."""
+
+    def __init__(self, pares=()):
+        pares = sorted(pares)
+        self.claves = [sys.intern(c) for c, _ in pares]
+        self.ids = array("i", (i for _, i in pares))
+
+    def rango(self, prefijo):
+        ini = bisect_left(self.claves, prefijo)
+        fin = bisect_left(self.claves, prefijo + "\uffff", ini)
+        return ini, fin
+
+    def agregar(self, clave, paciente_id):
+        pos = bisect_right(self.claves, clave)
+        self.claves.insert(pos, sys.intern(clave))
+        self.ids.insert(pos, paciente_id)
+
+    def quitar(self, clave, paciente_id):
+        ini = bisect_left(self.claves, clave)
+        fin = bisect_right(self.claves, clave, ini)
+        for pos in range(ini, fin):
+            if self.ids[pos] == paciente_id:
+                del self.claves[pos]
+                del self.ids[pos]
+                return
+
+
+class IndicePacientes:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._campos = {c: _Campo() for c in CAMPOS}
+        self._pacientes = {}        # id -> (nro_hc, dni, nombre, apellido, palabras)
+        self._listo = False
+        self._construido_en = 0.0
+        self._construyendo = False
+        self._pendientes = None     # cambios recibidos mientras se reconstruye
+
+    # ----------------------------------------------------------
+    # Construcción
+    # ----------------------------------------------------------
+    @property
+    def listo(self):
+        return self._listo
+
+    def construir(self, conn):
+        """Carga completa desde `pacientes` y reemplaza el índice actual."""
+        with self._lock:
+            self._pendientes = []
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, nro_hc, dni, nombre, apellido FROM pacientes")
+            pacientes = {}
+            pares = {c: [] for c in CAMPOS}
+            for pid, nro_hc, dni, nombre, apellido in cursor:
+                claves = _claves_paciente(nro_hc, dni, nombre, apellido)
+                pacientes[pid] = (nro_hc, dni, nombre, apellido, _palabras(claves))
+                for campo, valores in claves.items():
+                    pares[campo].extend((c, pid) for c in valores)
+            cursor.close()
+
+            campos = {c: _Campo(pares[c]) for c in CAMPOS}
+        except Exception as e:
+            # El índice vigente ya recibió esos cambios: se descartan para que
+            # guardar/quitar no sigan acumulándolos
+            with self._lock:
+                descartados, self._pendientes = len(self._pendientes), None
+            print(f"⚠️ Falló la reconstrucción del índice de pacientes ({e}); "
+                  f"se descartan {descartados} cambios pendientes")
+            raise
+
+        with self._lock:
+            self._campos = campos
+            self._pacientes = pacientes
+            pendientes, self._pendientes = self._pendientes, None
+            for operacion, args in pendientes:
+                operacion(*args)
+            self._listo = True
+            self._construido_en = time.monotonic()
+        return len(pacientes)
+
+    def construir_en_segundo_plano(self):
+        """Dispara una (re)construcción si no hay otra en curso."""
+        with self._lock:
+            if self._construyendo:
+                return
+            self._construyendo = True
+
+        def tarea():
+            from app.database import get_connection
+            try:
+                conn = get_connection()
+                try:
+                    total = self.construir(conn)
+                finally:
+                    conn.close()
+                print(f"⚡ Índice de pacientes en memoria listo ({total} pacientes, pid {os.getpid()})")
+            except Exception as e:
+                print(f"⚠️ No se pudo construir el índice de pacientes: {e}")
+            finally:
+                with self._lock:
+                    self._construyendo = False
+
+        threading.Thread(target=tarea, name="indice-pacientes", daemon=True).start()
+
+    def refrescar_si_vencido(self):
+        if not self._listo or time.monotonic() - self._construido_en > PACIENTES_INDICE_TTL:
+            self.construir_en_segundo_plano()
+
+    # ----------------------------------------------------------
+    # Actualizaciones incrementales
+    # ----------------------------------------------------------
+    def _quitar(self, paciente_id):
+        datos = self._pacientes.pop(paciente_id, None)
+        if datos is None:
+            return
+        for campo, claves in _claves_paciente(*datos[:4]).items():
+            for clave in claves:
+                self._campos[campo].quitar(clave, paciente_id)
+
+    def _guardar(self, paciente_id, nro_hc, dni, nombre, apellido):
+        self._quitar(paciente_id)
+        claves = _claves_paciente(nro_hc, dni, nombre, apellido)
+        self._pacientes[paciente_id] = (nro_hc, dni, nombre, apellido, _palabras(claves))
+        for campo, valores in claves.items():
+            for clave in valores:
+                self._campos[campo].agregar(clave, paciente_id)
+
+    def guardar(self, paciente_id, nro_hc, dni, nombre, apellido):
+        """Alta o modificación de un paciente."""
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((self._guardar, (paciente_id, nro_hc, dni, nombre, apellido)))
+            self._guardar(paciente_id, nro_hc, dni, nombre, apellido)
+
+    def quitar(self, paciente_id):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((self._quitar, (paciente_id,)))
+            self._quitar(paciente_id)
+
+    # ----------------------------------------------------------
+    # Consulta
+    # ----------------------------------------------------------
+    def sugerir(self, texto, k=10):
+        """
+        Top-k pacientes cuyo DNI/HC empieza con el texto, o cuyas palabras
+        de apellido/nombre empiezan con cada término buscado.
+        Orden: DNI, N° HC, apellido, nombre (alfabético dentro de cada grupo).
+        """
+        terminos = list(dict.fromkeys(tokenizar(texto)))
+        documento = _clave_documento(texto)
+        if not terminos:
+            return []
+
+        resultado = []
+        vistos = set()
+
+        def cumple_terminos(pid):
+            palabras = self._pacientes[pid][4]
+            return all(any(p.startswith(t) for p in palabras) for t in terminos)
+
+        def recorrer(campo, prefijo, filtrar):
+            indice = self._campos[campo]
+            ini, fin = indice.rango(prefijo)
+            for pos in range(ini, min(fin, ini + MAX_ESCANEO)):
+                pid = indice.ids[pos]
+                if pid in vistos or (filtrar and not cumple_terminos(pid)):
+                    continue
+                vistos.add(pid)
+                resultado.append(pid)
+                if len(resultado) >= k:
+                    return True
+            return False
+
+        def tamanio(termino):
+            return sum(fin - ini for ini, fin in (self._campos[c].rango(termino) for c in ("apellido", "nombre")))
+
+        with self._lock:
+            completo = bool(documento) and (
+                recorrer("dni", documento, False) or recorrer("nro_hc", documento, False)
+            )
+            if not completo:
+                # El término más selectivo guía el recorrido; el resto se filtra
+                guia = min(terminos, key=tamanio)
+                filtrar = len(terminos) > 1
+                if not recorrer("apellido", guia, filtrar):
+                    recorrer("nombre", guia, filtrar)
+
+            return [
+                {
+                    "id": pid,
+                    "nro_hc": self._pacientes[pid][0],
+                    "dni": self._pacientes[pid][1],
+                    "nombre": self._pacientes[pid][2],
+                    "apellido": self._pacientes[pid][3],
+                }
+                for pid in resultado
+            ]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "listo": self._listo,
+                "pacientes": len(self._pacientes),
+                "claves": {c: len(self._campos[c].claves) for c in CAMPOS},
+                "antiguedad_seg": round(time.monotonic() - self._construido_en, 1) if self._listo else None,
+            }
+
+
+# Instancia única por proceso (worker)
+indice_pacientes = IndicePacientes()
@@ -0,0 +1,64 @@
+# app/utils/merkle.py
+import hashlib
+
+# ==============================================================
+# 🌳 Árbol de Merkle (SHA-256) para anclar muchos hashes en una sola tx
+# ==============================================================
+# Hojas y nodos internos llevan prefijos distintos (0x00 / 0x01) para que
+# un nodo interno no pueda hacerse pasar por hoja. Si un nivel tiene un
+# nodo impar, sube sin cambios al nivel siguiente (no se duplica).
+# La prueba de inclusión es la lista de hermanos desde la hoja a la raíz:
+# [["I", hash], ["D", hash], ...] según el hermano esté a la izquierda o derecha.
+
+
+def _sha(datos):
+    return hashlib.sha256(datos).digest()
+
+
+def hash_hoja(hash_hex):
+    return _sha(b"\x00" + bytes.fromhex(hash_hex))
+
+
+def hash_nodo(izquierdo, derecho):
+    return _sha(b"\x01" + izquierdo + derecho)
+
+
+def construir_arbol(hojas_hex):
+    """Devuelve los niveles del árbol (niveles[0] = hojas, niveles[-1] = [raíz])."""
+    if not hojas_hex:
+        raise ValueError("No hay hojas para armar el árbol")
+
+    niveles = [[hash_hoja(h) for h in hojas_hex]]
+    while len(niveles[-1]) > 1:
+        actual = niveles[-1]
+        siguiente = [hash_nodo(actual[i], actual[i + 1]) for i in range(0, len(actual) - 1, 2)]
+        if len(actual) % 2:
+            siguiente.append(actual[-1])
+        niveles.append(siguiente)
+    return niveles
+
+
+def raiz(niveles):
+    return niveles[-1][0].hex()
+
+
+def prueba_inclusion(niveles, indice):
+    prueba = []
+    for nivel in niveles[:-1]:
+        hermano = indice ^ 1
+        if hermano < len(nivel):
+            prueba.append(["I" if hermano < indice else "D", nivel[hermano].hex()])
+        indice //= 2
+    return prueba
+
+
+def verificar_prueba(hash_hex, prueba, raiz_hex):
+    """True si `hash_hex` forma parte del árbol cuya raíz es `raiz_hex`."""
+    try:
+        actual = hash_hoja(hash_hex)
+        for lado, hermano_hex in prueba:
+            hermano = bytes.fromhex(hermano_hex)
+            actual = hash_nodo(hermano, actual) if lado == "I" else hash_nodo(actual, hermano)
+    except (ValueError, TypeError):
+        return False
+    return actual.hex() == (raiz_hex or "").lower()
@@ -0,0 +1,99 @@
+# app/utils/paginacion.py
+import base64
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# ==============================================================
+# 📄 Paginación por cursor (keyset)
+# ==============================================================
+# El cursor es la clave de orden de la última fila entregada, codificada
+# en base64. La página siguiente se pide con WHERE (clave) > (cursor), que
+# usa el índice: el costo por página no depende de la profundidad.
+
+TOTAL_CACHE_TTL = 60     # segundos
+TOTAL_CACHE_MAX = 1000   # claves por worker (cada búsqueda distinta es una clave)
+
+_totales = OrderedDict()     # LRU: clave -> (expira_en, total)
+_totales_lock = threading.Lock()
+
+
+def codificar_cursor(valores):
+    texto = json.dumps(list(valores), default=str, ensure_ascii=False)
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor, cantidad):
+    """Devuelve la lista de valores del cursor o None si viene vacío. ValueError si es inválido."""
+    if not cursor:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ValueError("Cursor inválido")
+    return valores
+
+
+def leer_limite(valor, defecto=20, maximo=100):
+    try:
+        return min(max(int(valor), 1), maximo)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def condicion_despues(columnas, descendente=False):
+    """
+    WHERE equivalente a (c1, c2, ..., cn) > (%s, ..., %s) escrito con OR/AND
+    para que MySQL lo resuelva como rango sobre el índice compuesto
+    (con descendente=True usa < para recorrer ORDER BY ... DESC).
+    Devuelve (sql, indices) donde indices dice qué valor del cursor va en cada %s.
+    """
+    op = "<" if descendente else ">"
+    sql = f"{columnas[-1]} {op} %s"
+    indices = [len(columnas) - 1]
+    for i in range(len(columnas) - 2, -1, -1):
+        sql = f"{columnas[i]} {op} %s OR ({columnas[i]} = %s AND ({sql}))"
+        indices = [i, i] + indices
+    return f"({sql})", indices
+
+
+def parametros_despues(indices, valores):
+    return [valores[i] for i in indices]
+
+
+def pagina(filas, limite, clave):
+    """
+    Recorta una consulta hecha con LIMIT limite+1.
+    Devuelve (filas, siguiente_cursor o None).
+    """
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, codificar_cursor(clave(filas[-1]))
+    return filas, None
+
+
+def total_cacheado(cursor, clave, sql, params=()):
+    """
+    COUNT(*) cacheado TOTAL_CACHE_TTL segundos (por worker): total aproximado
+    y barato. Guarda como mucho TOTAL_CACHE_MAX claves y descarta la menos usada.
+    """
+    ahora = time.monotonic()
+    with _totales_lock:
+        entrada = _totales.get(clave)
+        if entrada and entrada[0] > ahora:
+            _totales.move_to_end(clave)
+            return entrada[1]
+
+    cursor.execute(sql, params)
+    fila = cursor.fetchone()
+    total = fila["total"] if isinstance(fila, dict) else fila[0]
+
+    with _totales_lock:
+        _totales[clave] = (ahora + TOTAL_CACHE_TTL, total)
+        _totales.move_to_end(clave)
+        while len(_totales) > TOTAL_CACHE_MAX:
+            _totales.popitem(last=False)
+    return total
@@ -0,0 +1,172 @@
+# app/utils/trabajos_pdf.py
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.utils import cache_pdf
+
+_DIR_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _DIR_APP not in sys.path:
+    sys.path.append(_DIR_APP)   # los hijos heredan sys.path del proceso padre
+
+from generacion_pdf import generar_pdf_historia   # como paquete de primer nivel, sin app
+
+# ==============================================================
+# ⚙️ Trabajos de exportación de PDF en segundo plano
+# ==============================================================
+# El worker de Gunicorn lee los datos de la base y encola el render en un
+# pool de procesos acotado, así un PDF grande no bloquea el worker ni
+# compite por el GIL. El estado de cada trabajo se guarda como JSON en
+# disco para que cualquier worker pueda responder el polling.
+# El resultado queda en el cache de PDFs (cache_pdf) con su clave.
+#
+# Los procesos hijos (spawn) importan el módulo de la función que ejecutan.
+# Por eso el render se toma de generacion_pdf importado como paquete de
+# primer nivel: el hijo recibe datos planos, devuelve los bytes y nunca
+# pasa por app/__init__.py (importar la app entera tarda ~2,5 s y arma
+# Flask, blueprints, mail y web3 en cada hijo). Estado y cache se escriben
+# en el proceso del worker, al terminar el futuro.
+
+PDF_PROCESOS = int(os.getenv("PDF_PROCESOS", "2"))              # por worker
+PDF_TRABAJOS_DIR = os.getenv("PDF_TRABAJOS_DIR", os.path.join(cache_pdf.PDF_CACHE_DIR, "trabajos"))
+PDF_TRABAJOS_TTL = int(os.getenv("PDF_TRABAJOS_TTL", "3600"))   # segundos
+
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+LISTO = "listo"
+ERROR = "error"
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool del proceso actual (se crea de nuevo tras un fork de Gunicorn)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_PROCESOS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def _descartar_pool():
+    """Un proceso murió: el pool queda inutilizable y se recrea en el próximo uso."""
+    global _pool
+    with _pool_lock:
+        if _pool_pid == os.getpid():
+            _pool = None
+
+
+# ----------------------------------------------------------
+# Estado en disco
+# ----------------------------------------------------------
+def _ruta_estado(trabajo_id):
+    return os.path.join(PDF_TRABAJOS_DIR, f"{trabajo_id}.json")
+
+
+def _escribir_estado(trabajo_id, **cambios):
+    os.makedirs(PDF_TRABAJOS_DIR, exist_ok=True)
+    estado = leer_estado(trabajo_id) or {"id": trabajo_id}
+    estado.update(cambios, actualizado_en=time.time())
+
+    fd, tmp = tempfile.mkstemp(dir=PDF_TRABAJOS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(estado, f)
+    os.replace(tmp, _ruta_estado(trabajo_id))
+    return estado
+
+
+def leer_estado(trabajo_id):
+    """Estado del trabajo o None si no existe (o el id no es válido)."""
+    try:
+        uuid.UUID(hex=trabajo_id)
+    except (TypeError, ValueError):
+        return None
+    try:
+        with open(_ruta_estado(trabajo_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def limpiar_vencidos():
+    """Borra los estados de trabajos terminados hace más de PDF_TRABAJOS_TTL."""
+    limite = time.time() - PDF_TRABAJOS_TTL
+    try:
+        nombres = os.listdir(PDF_TRABAJOS_DIR)
+    except OSError:
+        return
+    for nombre in nombres:
+        ruta = os.path.join(PDF_TRABAJOS_DIR, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------------
+# API
+# ----------------------------------------------------------
+def crear_trabajo(usuario_id, paciente_id, clave, nombre_archivo):
+    """Registra el trabajo. Si el PDF ya está en cache queda LISTO directamente."""
+    limpiar_vencidos()
+    trabajo_id = uuid.uuid4().hex
+    estado = LISTO if cache_pdf.leer(clave) else PENDIENTE
+    return _escribir_estado(
+        trabajo_id,
+        estado=estado,
+        usuario_id=usuario_id,
+        paciente_id=paciente_id,
+        clave=clave,
+        nombre_archivo=nombre_archivo,
+        creado_en=time.time(),
+    )
+
+
+def encolar(trabajo, paciente, evoluciones, archivos_evoluciones, **opciones):
+    """Manda el render al pool de procesos; el resultado se guarda al terminar."""
+    trabajo_id = trabajo["id"]
+    # Antes de encolar: el futuro puede terminar (y marcar LISTO) enseguida
+    trabajo = _escribir_estado(trabajo_id, estado=PROCESANDO)
+    args = (generar_pdf_historia, paciente, evoluciones, archivos_evoluciones)
+    try:
+        try:
+            futuro = _get_pool().submit(*args, **opciones)
+        except BrokenProcessPool:
+            _descartar_pool()
+            futuro = _get_pool().submit(*args, **opciones)
+    except Exception as e:
+        _escribir_estado(trabajo_id, estado=ERROR, error=str(e))
+        raise
+
+    def al_terminar(f):
+        error = f.exception()
+        if error is None:
+            try:
+                cache_pdf.guardar(trabajo["clave"], f.result())
+                _escribir_estado(trabajo_id, estado=LISTO)
+                return
+            except Exception as e:
+                error = e
+        elif isinstance(error, BrokenProcessPool):
+            # El proceso murió (p. ej. falta de memoria): el pool queda inutilizable
+            _descartar_pool()
+        _escribir_estado(trabajo_id, estado=ERROR, error=str(error) or type(error).__name__)
+        print(f"⚠️ Falló el trabajo de PDF {trabajo_id}: {error}")
+
+    futuro.add_done_callback(al_terminar)
+    return trabajo
@@ -0,0 +1,122 @@
+# app/utils/verificacion_bfa.py
+import os
+from app.utils.hashing import generar_hash
+from app.utils.bfa_client import obtener_transacciones_lote
+from app.utils.cadena_hash import es_resumen_legado, leer_eslabones, verificar_eslabones
+from app.utils.anclaje_bfa import verificar_inclusion
+
+# ==============================================================
+# 🔎 Verificación de historias contra la BFA (con caché de transacciones)
+# ==============================================================
+# Una transacción minada no cambia nunca, así que su campo input se guarda
+# en bfa_tx_cache y no se vuelve a pedir al nodo. Lo que falta se pide en
+# batch JSON-RPC (un POST cada BFA_LOTE_RPC transacciones). Las pendientes
+# (sin bloque) no se cachean.
+
+BFA_LOTE_RPC = int(os.getenv("BFA_LOTE_RPC", "100"))
+VERIFICACION_LOTE_MAX = 500
+
+
+def _es_tx_hash(valor):
+    return isinstance(valor, str) and valor.startswith("0x") and len(valor) == 66
+
+
+def inputs_de_tx(conn, tx_hashes):
+    """Devuelve {tx_hash: input (hex sin 0x)} usando la caché y, si falta, el nodo."""
+    pendientes = list(dict.fromkeys(h for h in tx_hashes if _es_tx_hash(h)))
+    if not pendientes:
+        return {}
+
+    cursor = conn.cursor(dictionary=True)
+    marcadores = ", ".join(["%s"] * len(pendientes))
+    cursor.execute(f"""
+        SELECT tx_hash, input_hex FROM bfa_tx_cache
+        WHERE tx_hash IN ({marcadores})
+    """, pendientes)
+    inputs = {f["tx_hash"]: f["input_hex"] for f in cursor.fetchall()}
+
+    faltantes = [h for h in pendientes if h not in inputs]
+    nuevas = []
+    for i in range(0, len(faltantes), BFA_LOTE_RPC):
+        txs = obtener_transacciones_lote(faltantes[i:i + BFA_LOTE_RPC])
+        for tx_hash, tx in txs.items():
+            inputs[tx_hash] = tx["input"]
+            if tx["bloque"] is not None:
+                nuevas.append((tx_hash, tx["input"], tx["bloque"]))
+
+    if nuevas:
+        cursor.executemany("""
+            INSERT IGNORE INTO bfa_tx_cache (tx_hash, input_hex, bloque)
+            VALUES (%s, %s, %s)
+        """, nuevas)
+        conn.commit()
+    cursor.close()
+    return inputs
+
+
+def verificar_historias(conn, historias):
+    """
+    Verifica un lote de historias (filas con id, paciente_id, resumen, tx_hash,
+    anclaje_id, prueba_merkle, hash_anclado) con una consulta para las cadenas
+    y un batch RPC para las transacciones que no están en caché.
+    """
+    cursor = conn.cursor(dictionary=True)
+    pacientes_cadena = list(dict.fromkeys(
+        h["paciente_id"] for h in historias if not es_resumen_legado(h.get("resumen") or "")
+    ))
+    eslabones = leer_eslabones(cursor, pacientes_cadena)
+    cursor.close()
+
+    cadenas = {pid: verificar_eslabones(eslabones[pid]) for pid in pacientes_cadena}
+
+    inputs = inputs_de_tx(conn, [h["tx_hash"] for h in historias if h.get("tx_hash")])
+
+    resultados = []
+    for h in historias:
+        resumen = h.get("resumen") or ""
+        if es_resumen_legado(resumen):
+            hash_local = generar_hash(resumen)
+        else:
+            hash_local = cadenas[h["paciente_id"]]["hash"]
+
+        hash_bfa = inputs.get(h.get("tx_hash"))
+        if not h.get("tx_hash"):
+            estado, valido = "sin_tx", False
+        elif hash_bfa is None:
+            estado, valido = "tx_no_encontrada", False
+        else:
+            if h.get("anclaje_id"):
+                valido = verificar_inclusion(h, hash_local, hash_bfa)
+            else:
+                valido = (hash_local == hash_bfa)
+            estado = "valida" if valido else "modificada"
+
+        resultados.append({
+            "historia_id": h["id"],
+            "paciente_id": h["paciente_id"],
+            "tx_hash": h.get("tx_hash"),
+            "anclaje_id": h.get("anclaje_id"),
+            "hash_local": hash_local,
+            "hash_bfa": hash_bfa,
+            "valido": valido,
+            "estado": estado,
+        })
+    return resultados
+
+
+def guardar_auditorias(conn, resultados, usuario):
+    """Inserta en auditorias_blockchain los resultados que tienen transacción."""
+    filas = [
+        (r["historia_id"], r["hash_local"], r["hash_bfa"], int(r["valido"]), usuario)
+        for r in resultados if r["hash_bfa"] is not None
+    ]
+    if not filas:
+        return 0
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO auditorias_blockchain (historia_id, hash_local, hash_bfa, valido, usuario)
+        VALUES (%s, %s, %s, %s, %s)
+    """, filas)
+    conn.commit()
+    cursor.close()
+    return len(filas)
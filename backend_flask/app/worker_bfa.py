@@ -0,0 +1,130 @@
+# app/worker_bfa.py
+"""
+Worker de publicación en la BFA (outbox).
+
+Los endpoints no hablan con el nodo: insertan un registro en bfa_outbox (o
+un anclaje 'solicitado' en anclajes_bfa) y responden al instante. Este
+proceso toma los pendientes, los publica con reintentos y backoff, y deja
+el tx_hash en la historia.
+
+Uso:
+    python -m app.worker_bfa            # loop continuo
+    python -m app.worker_bfa --una-vez  # procesa lo pendiente y termina
+"""
+import os
+import sys
+import time
+from app.database import get_connection
+from app.utils.bfa_client import registrar_hash_en_bfa
+from app.utils.anclaje_bfa import procesar_solicitudes
+
+BFA_WORKER_INTERVALO = float(os.getenv("BFA_WORKER_INTERVALO", "2"))   # segundos entre sondeos
+BFA_WORKER_LOTE = int(os.getenv("BFA_WORKER_LOTE", "20"))
+BFA_MAX_INTENTOS = int(os.getenv("BFA_MAX_INTENTOS", "8"))
+BFA_BACKOFF_MAX = 600                  # segundos
+BFA_PROCESANDO_VENCE = 300             # un registro 'procesando' más viejo que esto se reintenta
+
+
+def _backoff(intentos):
+    return min(5 * 2 ** (intentos - 1), BFA_BACKOFF_MAX)
+
+
+def tomar_pendientes(conn, limite=BFA_WORKER_LOTE):
+    """
+    Reserva registros listos para publicar. SKIP LOCKED permite correr
+    varios workers sin que dos tomen el mismo registro.
+    """
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT id, historia_id, hash, intentos
+        FROM bfa_outbox
+        WHERE (estado = 'pendiente' AND proximo_intento <= NOW())
+           OR (estado = 'procesando' AND actualizado_en < NOW() - INTERVAL %s SECOND)
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (BFA_PROCESANDO_VENCE, limite))
+    filas = cursor.fetchall()
+    if filas:
+        marcadores = ", ".join(["%s"] * len(filas))
+        cursor.execute(f"""
+            UPDATE bfa_outbox SET estado = 'procesando'
+            WHERE id IN ({marcadores})
+        """, [f["id"] for f in filas])
+    conn.commit()
+    cursor.close()
+    return filas
+
+
+def publicar(conn, registro, publicar_hash=registrar_hash_en_bfa):
+    """Publica un registro del outbox y guarda el resultado. Devuelve True si se publicó."""
+    cursor = conn.cursor()
+    try:
+        tx_hash = publicar_hash(registro["hash"])
+    except Exception as e:
+        intentos = registro["intentos"] + 1
+        estado = "error" if intentos >= BFA_MAX_INTENTOS else "pendiente"
+        cursor.execute("""
+            UPDATE bfa_outbox
+            SET estado = %s, intentos = %s, error = %s,
+                proximo_intento = NOW() + INTERVAL %s SECOND
+            WHERE id = %s
+        """, (estado, intentos, str(e)[:500], _backoff(intentos), registro["id"]))
+        conn.commit()
+        cursor.close()
+        print(f"⚠️ Outbox {registro['id']}: intento {intentos} falló ({e})")
+        return False
+
+    cursor.execute("""
+        UPDATE bfa_outbox
+        SET estado = 'publicado', tx_hash = %s, error = NULL, intentos = intentos + 1
+        WHERE id = %s
+    """, (tx_hash, registro["id"]))
+    # Publicación individual: deja de depender de un lote Merkle
+    cursor.execute("""
+        UPDATE historias
+        SET tx_hash = %s, fecha = NOW(),
+            hash_anclado = %s, anclaje_id = NULL, prueba_merkle = NULL
+        WHERE id = %s
+    """, (tx_hash, registro["hash"], registro["historia_id"]))
+    conn.commit()
+    cursor.close()
+    print(f"✅ Outbox {registro['id']}: historia {registro['historia_id']} publicada (tx {tx_hash})")
+    return True
+
+
+def procesar_pendientes():
+    """Una pasada: publica todo lo que esté listo. Devuelve cuántos registros tomó."""
+    conn = get_connection()
+    try:
+        tomados = 0
+        while True:
+            registros = tomar_pendientes(conn)
+            if not registros:
+                break
+            tomados += len(registros)
+            for registro in registros:
+                publicar(conn, registro)
+
+        # Anclajes en lote pedidos desde POST /api/blockchain/anclar
+        tomados += procesar_solicitudes(conn)
+        return tomados
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    print(f"⛓️ Worker BFA iniciado (pid {os.getpid()})")
+    while True:
+        try:
+            procesar_pendientes()
+        except Exception as e:
+            print(f"❌ Error en el worker BFA: {e}")
+        if "--una-vez" in argv:
+            return
+        time.sleep(BFA_WORKER_INTERVALO)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,20 @@ SET time_zone = '-3:00';
 -- ==============================================
 --  ELIMINAR TABLAS (solo para entorno de desarrollo)
 -- ==============================================
+DROP TABLE IF EXISTS schema_migraciones;
+DROP TABLE IF EXISTS contadores;
+DROP TABLE IF EXISTS contadores_turnos_dia;
 DROP TABLE IF EXISTS auditorias_blockchain;
+DROP TABLE IF EXISTS barridos_integridad;
+DROP TABLE IF EXISTS historia_cadena;
+DROP TABLE IF EXISTS anclajes_bfa;
+DROP TABLE IF EXISTS bfa_outbox;
+DROP TABLE IF EXISTS bfa_tx_cache;
 DROP TABLE IF EXISTS historias;
 DROP TABLE IF EXISTS turnos;
 DROP TABLE IF EXISTS evolucion_archivos;
 DROP TABLE IF EXISTS evoluciones;
+DROP TABLE IF EXISTS pacientes_tokens;
 DROP TABLE IF EXISTS pacientes;
 DROP TABLE IF EXISTS usuarios;
 DROP TABLE IF EXISTS ausencias;
@@ -81,6 +90,21 @@ CREATE TABLE pacientes (
   DEFAULT CHARSET=utf8mb4
   COLLATE=utf8mb4_unicode_ci;
 
+-- ==============================================
+-- ÍNDICE DE BÚSQUEDA DE PACIENTES
+-- Palabras de nombre/apellido normalizadas (minúsculas, sin acentos).
+-- Se mantiene desde la API; `flask reindexar-pacientes` lo reconstruye.
+-- ==============================================
+CREATE TABLE pacientes_tokens (
+    token VARCHAR(40) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    paciente_id INT NOT NULL,
+    PRIMARY KEY (token, paciente_id),
+    KEY idx_pacientes_tokens_paciente (paciente_id),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
 -- ==============================================
 -- TABLA DE HISTORIAS CLÍNICAS (actualizada para blockchain)
 -- ==============================================
@@ -92,12 +116,86 @@ CREATE TABLE historias (
     resumen LONGTEXT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci,
     hash_local CHAR(64) DEFAULT NULL,        -- Hash SHA-256 del contenido
     tx_hash VARCHAR(100) DEFAULT NULL,       -- Hash de la transacción en BFA
+    hash_anclado CHAR(64) DEFAULT NULL,      -- hash_local al momento de publicarlo
+    anclaje_id INT DEFAULT NULL,             -- Lote Merkle (NULL = tx individual)
+    prueba_merkle TEXT DEFAULT NULL,         -- Prueba de inclusión (JSON)
     FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
     FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
 ) ENGINE=InnoDB
   DEFAULT CHARSET=utf8mb4
   COLLATE=utf8mb4_unicode_ci;
 
+-- ==============================================
+-- ANCLAJES EN LOTE (raíz Merkle publicada en BFA)
+-- ==============================================
+CREATE TABLE anclajes_bfa (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    raiz CHAR(64) DEFAULT NULL,
+    cantidad INT NOT NULL DEFAULT 0,
+    estado ENUM('solicitado', 'pendiente', 'publicado', 'error') NOT NULL DEFAULT 'pendiente',
+    tx_hash VARCHAR(100) DEFAULT NULL,
+    error VARCHAR(500) DEFAULT NULL,
+    usuario_id INT DEFAULT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_anclajes_estado (estado)
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+-- ==============================================
+-- OUTBOX DE PUBLICACIONES EN BFA (lo procesa app/worker_bfa.py)
+-- ==============================================
+CREATE TABLE bfa_outbox (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    historia_id INT NOT NULL,
+    hash CHAR(64) NOT NULL,
+    usuario_id INT DEFAULT NULL,
+    estado ENUM('pendiente', 'procesando', 'publicado', 'error') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    tx_hash VARCHAR(100) DEFAULT NULL,
+    error VARCHAR(500) DEFAULT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_outbox_estado (estado, proximo_intento),
+    KEY idx_outbox_historia (historia_id),
+    FOREIGN KEY (historia_id) REFERENCES historias(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+-- ==============================================
+-- CACHÉ DE TRANSACCIONES BFA (input de tx ya minadas, inmutable)
+-- ==============================================
+CREATE TABLE bfa_tx_cache (
+    tx_hash CHAR(66) PRIMARY KEY,
+    input_hex TEXT NOT NULL,
+    bloque BIGINT NOT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+-- ==============================================
+-- CADENA DE HASHES DE LA HISTORIA (un eslabón por evolución)
+-- ==============================================
+-- hash_cadena = sha256(hash_cadena anterior + hash_evolucion);
+-- historias.hash_local guarda el último eslabón.
+CREATE TABLE historia_cadena (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    paciente_id INT NOT NULL,
+    posicion INT NOT NULL,
+    evolucion_id INT NOT NULL,
+    hash_evolucion CHAR(64) NOT NULL,
+    hash_cadena CHAR(64) NOT NULL,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY idx_cadena_paciente_posicion (paciente_id, posicion),
+    UNIQUE KEY idx_cadena_evolucion (evolucion_id),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
 -- ==============================================
 -- TABLA DE EVOLUCIONES
 -- ==============================================
@@ -109,6 +207,7 @@ CREATE TABLE evoluciones (
     indicaciones TEXT,
     usuario_id INT NOT NULL,
     creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_evoluciones_paciente_fecha (paciente_id, fecha, id),
     FOREIGN KEY (paciente_id) REFERENCES pacientes(id),
     FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
 ) ENGINE=InnoDB
@@ -216,12 +315,66 @@ CREATE TABLE auditorias_blockchain (
   DEFAULT CHARSET=utf8mb4
   COLLATE=utf8mb4_unicode_ci;
 
+-- ==============================================
+-- BARRIDOS DE INTEGRIDAD (verificación de todas las historias contra BFA)
+-- ==============================================
+CREATE TABLE barridos_integridad (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    estado ENUM('solicitado', 'en_curso', 'completado', 'error') NOT NULL DEFAULT 'en_curso',
+    origen ENUM('manual', 'programado') NOT NULL DEFAULT 'manual',
+    usuario VARCHAR(100) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    procesadas INT NOT NULL DEFAULT 0,
+    validas INT NOT NULL DEFAULT 0,
+    modificadas INT NOT NULL DEFAULT 0,
+    sin_tx INT NOT NULL DEFAULT 0,
+    tx_no_encontradas INT NOT NULL DEFAULT 0,
+    ultimo_id INT NOT NULL DEFAULT 0,
+    error VARCHAR(500) DEFAULT NULL,
+    iniciado_en DATETIME NOT NULL,
+    finalizado_en DATETIME DEFAULT NULL,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+-- ==============================================
+-- CONTADORES DEL DASHBOARD (materializados, ver app/utils/contadores.py)
+-- ==============================================
+CREATE TABLE contadores (
+    nombre VARCHAR(40) PRIMARY KEY,
+    valor BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE contadores_turnos_dia (
+    dia DATE PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB
+  DEFAULT CHARSET=utf8mb4
+  COLLATE=utf8mb4_unicode_ci;
+
 -- ==============================================
 -- ÍNDICES
 -- ==============================================
 CREATE INDEX idx_pacientes_dni ON pacientes (dni);
 CREATE INDEX idx_pacientes_nombre ON pacientes (nombre);
-CREATE INDEX idx_pacientes_apellido ON pacientes (apellido);
+-- (apellido, nombre) + PK implícita: sirve al ORDER BY y a la paginación por cursor
+CREATE INDEX idx_pacientes_apellido_nombre ON pacientes (apellido, nombre);
+-- Calendarios por ventana: turnos de un profesional (o de todos) en [start, end);
+-- con fecha_fin el motor de disponibilidad resuelve solapamientos sin leer la fila
+CREATE INDEX idx_turnos_usuario_inicio_fin ON turnos (usuario_id, fecha_inicio, fecha_fin);
+CREATE INDEX idx_turnos_inicio ON turnos (fecha_inicio);
+-- Resto de las consultas frecuentes (ver backend_flask/app/migraciones/)
+CREATE INDEX idx_ausencias_usuario_inicio_fin ON ausencias (usuario_id, fecha_inicio, fecha_fin);
+CREATE INDEX idx_ausencias_fin ON ausencias (fecha_fin);
+CREATE INDEX idx_ausencias_inicio ON ausencias (fecha_inicio);
+CREATE INDEX idx_disponibilidades_usuario_dia ON disponibilidades (usuario_id, dia_semana, activo, hora_inicio, hora_fin);
+CREATE INDEX idx_grupo_miembros_usuario ON grupo_miembros (usuario_id, grupo_id);
+CREATE INDEX idx_auditorias_historia_fecha ON auditorias_blockchain (historia_id, fecha);
+CREATE INDEX idx_auditorias_fecha ON auditorias_blockchain (fecha);
 
 -- ==============================================
 -- USUARIO ADMINISTRADOR INICIAL
@@ -234,6 +387,12 @@ WHERE NOT EXISTS (
     SELECT 1 FROM usuarios WHERE username = 'admin'
 );
 
+-- Valores iniciales de los contadores (incluye al admin)
+INSERT INTO contadores (nombre, valor)
+SELECT 'pacientes', COUNT(*) FROM pacientes
+UNION ALL SELECT 'usuarios', COUNT(*) FROM usuarios
+UNION ALL SELECT 'evoluciones', COUNT(*) FROM evoluciones;
+
 -- ==============================================
 -- USUARIO DE APLICACIÓN (no root)
 -- ==============================================
@@ -3,8 +3,18 @@ import api from "@/api/axios";
 const API_URL = 'http://localhost:5000/api'; // ✅ Tu Flask corre aquí
 
 export default {
-    getPacientes() {
-        return api.get('/pacientes', { withCredentials: true });
+    // Paginado por cursor: pasar el siguiente_cursor de la respuesta anterior
+    getPacientes({ cursor = null, limit = 50, total = false } = {}) {
+        const params = { limit };
+        if (cursor) params.cursor = cursor;
+        if (total) params.total = 1;
+        return api.get('/pacientes', { params, withCredentials: true });
+    },
+    buscarPacientes(q, { cursor = null, limit = 50, total = false } = {}) {
+        const params = { q, limit };
+        if (cursor) params.cursor = cursor;
+        if (total) params.total = 1;
+        return api.get('/pacientes/buscar', { params, withCredentials: true });
     },
     crearPaciente(data) {
         return api.post('/pacientes', data, { withCredentials: true });